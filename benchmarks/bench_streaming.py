@@ -0,0 +1,159 @@
+"""
+Microbenchmark: decoding long Ollama generations.
+
+Compares the previous process_streaming_response (buffer + whole-buffer json.loads,
+quadratic in stream length) with the incremental decoder in src/utils/streaming_utils.py.
+
+    python -m benchmarks.bench_streaming [--tokens 1000 4000 16000] [--chunk-size 256]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+
+from src.utils.streaming_utils import process_streaming_response
+
+
+def response(text: str, chunk_size: int) -> httpx.Response:
+    """
+    A streamed httpx response delivering `text` in network-sized byte chunks.
+    """
+    data = text.encode()
+
+    async def body():
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+
+    return httpx.Response(200, content=body())
+
+
+def generation(tokens: int, garbled_every: int = 0) -> str:
+    """
+    An Ollama chat stream of `tokens` chunks; with `garbled_every`, every nth line is
+    truncated the way an interrupted proxy write would leave it.
+    """
+    lines = []
+    for i in range(tokens):
+        line = json.dumps({"model": "bench", "message": {"role": "assistant", "content": f" token{i}"}, "done": False})
+        lines.append(line[:-5] if garbled_every and i % garbled_every == garbled_every - 1 else line)
+    lines.append(json.dumps({"model": "bench", "message": {"content": ""}, "done": True, "eval_count": tokens}))
+    return "\n".join(lines) + "\n"
+
+
+async def legacy_process_streaming_response(response):
+    """
+    The implementation the incremental decoder replaced, kept verbatim for comparison.
+    """
+    buffer = ""
+    async for line in response.aiter_lines():
+        if not line.strip():
+            continue  # Skip empty lines
+        
+        # Add line to buffer
+        buffer += line + "\n"
+        
+        # Try to parse complete JSON objects from buffer
+        while buffer:
+            try:
+                # Find the end of a complete JSON object
+                json_data = json.loads(buffer.strip())
+                buffer = ""  # Reset buffer on successful parse
+                
+                # Extract content from the response
+                if "message" in json_data and "content" in json_data["message"]:
+                    content = json_data["message"]["content"]
+                    if content:  # Only yield non-empty content
+                        yield content
+                elif "response" in json_data:  # Alternative response format
+                    content = json_data["response"]
+                    if content:
+                        yield content
+                break
+                
+            except json.JSONDecodeError as e:
+                # If JSON is incomplete, try to find a complete object
+                lines = buffer.strip().split('\n')
+                parsed_any = False
+                
+                for i, line in enumerate(lines):
+                    if line.strip():
+                        try:
+                            json_data = json.loads(line.strip())
+                            # Extract content
+                            if "message" in json_data and "content" in json_data["message"]:
+                                content = json_data["message"]["content"]
+                                if content:
+                                    yield content
+                            elif "response" in json_data:
+                                content = json_data["response"]
+                                if content:
+                                    yield content
+                            parsed_any = True
+                        except json.JSONDecodeError:
+                            continue
+                
+                # Keep remaining unparsed lines in buffer
+                if parsed_any:
+                    # Remove parsed lines, keep the rest
+                    remaining_lines = []
+                    for line in lines:
+                        try:
+                            json.loads(line.strip())
+                        except:
+                            remaining_lines.append(line)
+                    buffer = '\n'.join(remaining_lines)
+                else:
+                    # Wait for more data
+                    break
+
+
+async def legacy_collect(response):
+    answer = ""
+    async for content in legacy_process_streaming_response(response):
+        answer += content
+    return answer
+
+
+async def collect(response):
+    chunks = []
+    async for content in process_streaming_response(response, {}):
+        chunks.append(content)
+    return "".join(chunks)
+
+
+async def timed(collector, text: str, chunk_size: int, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        answer = await collector(response(text, chunk_size))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, answer
+
+
+async def main(token_counts, chunk_size: int, repeat: int, garbled_every: int):
+    print(f"{'stream':>8} {'tokens':>8} {'legacy ms':>10} {'decoder ms':>11} {'speedup':>8}")
+    for label, garbled in (("clean", 0), ("garbled", garbled_every)):
+        for tokens in token_counts:
+            text = generation(tokens, garbled)
+            legacy, legacy_answer = await timed(legacy_collect, text, chunk_size, repeat)
+            current, answer = await timed(collect, text, chunk_size, repeat)
+            if not garbled:
+                assert answer == legacy_answer
+            print(f"{label:>8} {tokens:>8} {legacy * 1000:>10.1f} {current * 1000:>11.1f} {legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 4000, 16000])
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--garbled-every", type=int, default=1000)
+    args = parser.parse_args()
+    # Garbled lines are expected here
+    logging.getLogger("src.utils.streaming_utils").setLevel(logging.ERROR)
+    asyncio.run(main(args.tokens, args.chunk_size, args.repeat, args.garbled_every))
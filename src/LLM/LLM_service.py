@@ -9,32 +9,35 @@ from dotenv import load_dotenv
 import httpx
 from motor.motor_asyncio import AsyncIOMotorClient
 from src.utils.streaming_utils import process_streaming_response
+from src.LLM.llm_client import DEEPSEEK_API_URL, LLM_API_URL
+from src.LLM.llm_router import llm_router
+from src.LLM.model_manager import model_manager
+from src.LLM.response_cache import LLM_QUESTION_CACHE_TTL_SECONDS, analysis_ttl, llm_response_cache, replay_chunks
+from src.LLM.semantic_cache import semantic_cache
+from src.LLM.prompt_builder import PROMPT_TOKEN_BUDGET_DEEPTHINKING, PROMPT_TOKEN_BUDGET_LLM, compile_prompt, count_tokens
 from src.utils.validate_stock_data_utils import validate_stock_data
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Stage 1 drafts the analysis, stage 2 (DeepThinking) refines it
+LLM_MODEL = "gemma3:4b"
+DEEPSEEK_MODEL = "deepseek-r1:7b"
+
 # MongoDB setup
 client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
 db = client.tradely
 
 
-def perform_analysis(stock_data: dict) -> str:
+def build_analysis_prompt(stock_data: dict):
     """
-    Perform analysis on the stock data and return a formatted prompt.
+    The stage 1 prompt: instructions plus a compact summary of the stock data that fits
+    PROMPT_TOKEN_BUDGET_LLM (see src/LLM/prompt_builder.py).
     """
-    
-    # Define the sections to analyze
-    sections = [
-        "Price Data",
-        "Technical Indicators", 
-        "Market Sentiment",
-        "Financial Metrics",
-        "Risk Factors"
-    ]
-    
-    analysis = f"""
-    Goal: Conduct a concise financial analysis of {stock_data.get('metadata', {}).get('symbol', 'UNKNOWN')} based on recent market trends, historical data, and technical indicators.
+    metadata = stock_data.get('metadata') or {}
+    symbol = str(metadata.get('ticker') or metadata.get('symbol') or 'UNKNOWN').upper()
+    instructions = f"""
+    Goal: Conduct a concise financial analysis of {symbol} based on recent market trends, historical data, and technical indicators.
 
     Return Format:
         - Summary: A brief overview of the stock's current trend.
@@ -48,67 +51,85 @@ def perform_analysis(stock_data: dict) -> str:
         - Keep the response concise, focusing on actionable insights without exceeding 2000 words.
 
     Context:
-        - Stock Data: {stock_data}
         - Technical Indicators: Provide insights based on available technical data.
         - Sentiment Analysis: Summarize the sentiment around recent news articles.
         - Macroeconomic Trends: Highlight broader economic influences impacting this stock.
+        - This is a preliminary Artificial Intelligence (AI) analysis. Please consult a financial advisor for investment decisions.
+    """
+    return compile_prompt(instructions, stock_data, PROMPT_TOKEN_BUDGET_LLM)
+
+
+def perform_analysis(stock_data: dict) -> str:
+    """
+    Perform analysis on the stock data and return a formatted prompt.
+    """
+    return build_analysis_prompt(stock_data).text
+
+
+async def _stream_chat(url: str, payload: dict, stats: dict = None, cache_ttl: float = None):
     """
+    POST a chat request to the least busy model server with the model and yield content
+    chunks as the model produces them. `stats` receives the timings and token counts of
+    the final chunk. With a `cache_ttl`, identical requests within that many seconds are
+    served from the response cache.
+    """
+    async def generate(generation_stats):
+        keep_alive = model_manager.keep_alive(payload["model"])
+        async with llm_router.stream_post(url, {**payload, "stream": True, "keep_alive": keep_alive}) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise RuntimeError(f"Error {response.status_code}: {response.text}")
+            async for content in process_streaming_response(response, generation_stats):
+                yield content
+        model_manager.observe(payload["model"], generation_stats)
 
-    for section in sections:
-        data = stock_data.get(section.lower().replace(" ", "_"), "No data available")
-        analysis += f"\n{section}: {data}"
-    
-    analysis += "\nThis is a preliminary Artificial Intelligence (AI) analysis. Please consult a financial advisor for investment decisions."
-    return analysis
+    async for content in llm_response_cache.stream(payload, generate, stats, cache_ttl):
+        yield content
 
 
-async def send_prompt_to_llm(prompt: str, model="gemma3:4b") -> str:
+async def stream_prompt_to_llm(prompt: str, model=LLM_MODEL, stats: dict = None, cache_ttl: float = None, options: dict = None):
     """
-    Send the formatted prompt to the LLM asynchronously and return the response.
+    Send the formatted prompt to the LLM and yield its response as it is generated.
     """
-    url = os.getenv("LLM_API_URL", "http://localhost:11434/api/chat")
     payload = {
         "model": model,
         "messages": [{"role": "user", "content": prompt}]
     }
+    if options:
+        payload["options"] = options
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, timeout=1000.0)
-
-            if response.status_code == 200:
-                llm_response = ""
-                async for content in process_streaming_response(response):
-                    # Print each chunk as it arrives
-                    print(content, end="", flush=True)
-                    llm_response += content
-                return llm_response
-            else:
-                raise RuntimeError(
-                    f"Error {response.status_code}: {response.text}")
+        async for content in _stream_chat(LLM_API_URL, payload, stats=stats, cache_ttl=cache_ttl):
+            yield content
     except httpx.RequestError as e:
         raise RuntimeError(f"HTTP request failed: {str(e)}")
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Failed to send prompt to LLM: {str(e)}")
 
 
-async def send_to_deepseek(llm_response, stock_data=None, model='deepseek-r1:7b'):
+async def send_prompt_to_llm(prompt: str, model=LLM_MODEL, cache_ttl: float = None) -> str:
     """
-    Send the LLM response to the DeepThinking model for final analysis.
+    Send the formatted prompt to the LLM asynchronously and return the response.
     """
-    url = "http://localhost:11434/api/chat"
-    payload = {
-    "model": model,
-    "messages": [
-        {
-            "role": "user",
-            "content": """
+    chunks = []
+    stats = {}
+    async for content in stream_prompt_to_llm(prompt, model, stats, cache_ttl):
+        # Print each chunk as it arrives
+        print(content, end="", flush=True)
+        chunks.append(content)
+    print(f"\nDebug: LLM stats: {stats}")
+    return "".join(chunks)
+
+
+DEEPSEEK_INSTRUCTIONS = """
             Goal: Use the stock data to analyze the stock in detail. Focus on providing an in-depth analysis of the stock's performance, trends, risks, and actionable insights.
 
             Instructions:
             - You are a professional financial analyst with expertise in equity markets, technical indicators, and industry trends.
             - Conduct a deep analysis of the stock using the data provided. 
-            - Review the Gemini-generated analysis {llm_response} and incorporate relevant parts if they align with the deeper analysis.
+            - Review the Gemini-generated analysis in the next message and incorporate relevant parts if they align with the deeper analysis.
             - Present a structured, professional-level report suitable for senior financial officers, using bullet points where appropriate.
             - Ensure that the analysis is unbiased and provides a well-rounded view with insights into the market’s current position and future performance.
 
@@ -128,40 +149,42 @@ async def send_to_deepseek(llm_response, stock_data=None, model='deepseek-r1:7b'
             Context:
             - Include historical comparison if relevant.
             - Compare performance to sector/industry benchmarks when applicable.
-            - Reference {stock_data} to find key metrics and news. If data is missing or incomplete (e.g., shares outstanding, stock price), explicitly mention this gap and suggest ways to retrieve or estimate the missing information.
+            - Use the stock data below to find key metrics and news. If data is missing or incomplete (e.g., shares outstanding, stock price), explicitly mention this gap and suggest ways to retrieve or estimate the missing information.
             """
-        },
-        {
-            "role": "user",
-            "content": llm_response
-        }
-    ]
-}
 
-   # Optionally include stock data in the prompt
-    if stock_data:
-        payload["messages"].insert(
-            0, {"role": "user", "content": f"Stock Data: {stock_data}"})
+
+def build_deepseek_prompt(llm_response, stock_data=None):
+    """
+    The stage 2 instructions and stock data summary, within PROMPT_TOKEN_BUDGET_DEEPTHINKING
+    once the stage 1 answer (sent as its own message) is counted.
+    """
+    return compile_prompt(DEEPSEEK_INSTRUCTIONS, stock_data or {}, PROMPT_TOKEN_BUDGET_DEEPTHINKING,
+                          reserved_tokens=count_tokens(llm_response or ""))
+
+
+def _deepseek_payload(llm_response, stock_data=None, model=DEEPSEEK_MODEL, prompt=None) -> dict:
+    prompt = prompt or build_deepseek_prompt(llm_response, stock_data)
+    return {
+        "model": model,
+        "messages": [
+            {"role": "user", "content": prompt.text},
+            {"role": "user", "content": llm_response},
+        ]
+    }
+
+
+async def stream_to_deepseek(llm_response, stock_data=None, model=DEEPSEEK_MODEL, stats: dict = None, cache_ttl: float = None):
+    """
+    Send the LLM response to the DeepThinking model and yield its analysis as it is generated.
+    """
+    prompt = build_deepseek_prompt(llm_response, stock_data)
+    if stats is not None:
+        stats["prompt"] = prompt.report()
+    payload = _deepseek_payload(llm_response, stock_data, model, prompt)
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Stream the response
-            async with client.stream("POST", url, json=payload, timeout=200.0) as response:
-                if response.status_code == 200:
-                    # Process the response using process_streaming_response
-                    deepthinking_response = ""
-                    async for content in process_streaming_response(response):
-                        # Print each chunk as it arrives
-                        print(content, end="", flush=True)
-                        deepthinking_response += content
-                    return deepthinking_response
-                else:
-                    print(
-                        f"Debug: DeepThinking API response status: {response.status_code}")
-                    print(
-                        f"Debug: DeepThinking API response text: {response.text}")
-                    raise RuntimeError(
-                        f"Error {response.status_code}: {response.text}")
+        async for content in _stream_chat(DEEPSEEK_API_URL, payload, stats=stats, cache_ttl=cache_ttl):
+            yield content
     except httpx.RequestError as e:
         print(f"Debug: HTTP request error: {str(e)}")
         raise RuntimeError(
@@ -172,6 +195,20 @@ async def send_to_deepseek(llm_response, stock_data=None, model='deepseek-r1:7b'
             f"Failed to send data to DeepThinking model: {str(e)}")
 
 
+async def send_to_deepseek(llm_response, stock_data=None, model=DEEPSEEK_MODEL, cache_ttl: float = None):
+    """
+    Send the LLM response to the DeepThinking model for final analysis.
+    """
+    chunks = []
+    stats = {}
+    async for content in stream_to_deepseek(llm_response, stock_data, model, stats, cache_ttl):
+        # Print each chunk as it arrives
+        print(content, end="", flush=True)
+        chunks.append(content)
+    print(f"\nDebug: DeepThinking stats: {stats}")
+    return "".join(chunks)
+
+
 def store_analysis(symbol, analysis):
     """
     Store the analysis in the database, avoiding duplicates.
@@ -194,7 +231,7 @@ async def fetch_and_analyze_all_stock_data(ticker: str):
         stock_data = validate_stock_data(await fetch_all_stock_data(ticker))
         print("Debug: Fetched stock data:", stock_data)
 
-        if not stock_data or "metadata" not in stock_data:
+        if not stock_data or not stock_data.get("metadata"):
             print("Debug: No stock data available, using default analysis.")
             analysis = "No stock data available for analysis."
             llm_response = "No stock data available for analysis."
@@ -204,15 +241,18 @@ async def fetch_and_analyze_all_stock_data(ticker: str):
             metadata = stock_data["metadata"]
             print("Debug: Metadata:", metadata)
 
-            analysis = perform_analysis(stock_data)
+            prompt = build_analysis_prompt(stock_data)
+            analysis = prompt.text
             print("Debug: Analysis result:", analysis)
+            print("Debug: Prompt size:", prompt.report())
 
             # Generate LLM response
-            llm_response = await send_prompt_to_llm(analysis)
+            cache_ttl = analysis_ttl(ticker)
+            llm_response = await send_prompt_to_llm(analysis, cache_ttl=cache_ttl)
             print("Debug: LLM response:", llm_response)
 
             # Generate DeepThinking response
-            deepthinking_response = await send_to_deepseek(llm_response, stock_data)
+            deepthinking_response = await send_to_deepseek(llm_response, stock_data, cache_ttl=cache_ttl)
             print("Debug: DeepThinking response:", deepthinking_response)
 
         return {
@@ -228,24 +268,45 @@ async def fetch_and_analyze_all_stock_data(ticker: str):
             f"Error in fetch_and_analyze_all_stock_data: {str(e)}")
 
 
-async def process_question_with_llm(question: str, context: str = None) -> str:
-    try:
-        print(f"Debug: Received question: {question}")
-        print(f"Debug: Received context: {context}")
-
-        # Construct the prompt
-        prompt = f"""
+def _question_prompt(question: str, context: str = None) -> str:
+    prompt = f"""
         You are a stock market enthusiast. Answer the following question concisely:
 
         Question: {question}
         """
-        if context:
-            prompt += f"\nContext: {context}\n"
+    if context:
+        prompt += f"\nContext: {context}\n"
+    return prompt
+
+
+async def _answer_question(question: str, context: str = None, stats: dict = None):
+    """
+    Yield the answer to a question: a past answer to an equivalent question when the
+    semantic cache has one, otherwise the model's, which is then added to the cache.
+    """
+    cached, similarity, embedding = await semantic_cache.lookup(question, context, LLM_MODEL)
+    if cached is not None:
+        if stats is not None:
+            stats.update({"cached": True, "similarity": round(similarity, 4), "matched_question": cached["question"]})
+        for content in replay_chunks(cached["answer"]):
+            yield content
+        return
+
+    chunks = []
+    prompt = _question_prompt(question, context)
+    async for content in stream_prompt_to_llm(prompt, stats=stats, cache_ttl=LLM_QUESTION_CACHE_TTL_SECONDS):
+        chunks.append(content)
+        yield content
+    await semantic_cache.add(question, "".join(chunks), context, LLM_MODEL, embedding)
+
 
-        print(f"Debug: Constructed prompt: {prompt}")
+async def process_question_with_llm(question: str, context: str = None) -> str:
+    try:
+        print(f"Debug: Received question: {question}")
+        print(f"Debug: Received context: {context}")
 
-        # Send the prompt to the LLM
-        llm_response = await send_prompt_to_llm(prompt)
+        # Answer from the semantic cache or the LLM
+        llm_response = "".join([content async for content in _answer_question(question, context)])
 
         print(f"Debug: LLM response: {llm_response}")
         return llm_response
@@ -253,3 +314,72 @@ async def process_question_with_llm(question: str, context: str = None) -> str:
         print(f"Error in process_question_with_llm: {e}")
         raise HTTPException(
             status_code=500, detail=f"Error processing question: {str(e)}")
+
+
+"""
+Streaming variants: events are dicts with an "event" key
+    stage: a new stage started (fetching_data, llm, deepthinking)
+    token: a chunk of model output for the current stage
+    done:  the complete result, same fields as the non-streaming endpoint, plus "stats"
+           (per stage timings and token counts reported by the model server)
+"""
+
+async def stream_analysis(ticker: str):
+    """
+    fetch_and_analyze_all_stock_data, forwarding each model's tokens as they are generated.
+    """
+    yield {"event": "stage", "stage": "fetching_data", "symbol": ticker}
+    stock_data = validate_stock_data(await fetch_all_stock_data(ticker))
+
+    if not stock_data or not stock_data.get("metadata"):
+        message = "No stock data available for analysis."
+        yield {
+            "event": "done",
+            "symbol": ticker,
+            "analysis": message,
+            "llm_response": message,
+            "deepthinking_response": message,
+            "stock_data": stock_data,
+        }
+        return
+
+    prompt = build_analysis_prompt(stock_data)
+    analysis = prompt.text
+
+    stats = {"llm": {"prompt": prompt.report()}, "deepthinking": {}}
+    cache_ttl = analysis_ttl(ticker)
+    yield {"event": "stage", "stage": "llm", "model": LLM_MODEL}
+    chunks = []
+    async for content in stream_prompt_to_llm(analysis, stats=stats["llm"], cache_ttl=cache_ttl):
+        chunks.append(content)
+        yield {"event": "token", "stage": "llm", "content": content}
+    llm_response = "".join(chunks)
+
+    yield {"event": "stage", "stage": "deepthinking", "model": DEEPSEEK_MODEL}
+    chunks = []
+    async for content in stream_to_deepseek(llm_response, stock_data, stats=stats["deepthinking"], cache_ttl=cache_ttl):
+        chunks.append(content)
+        yield {"event": "token", "stage": "deepthinking", "content": content}
+
+    yield {
+        "event": "done",
+        "symbol": ticker,
+        "analysis": analysis,
+        "llm_response": llm_response,
+        "deepthinking_response": "".join(chunks),
+        "stock_data": stock_data,
+        "stats": stats,
+    }
+
+
+async def stream_question(question: str, context: str = None):
+    """
+    process_question_with_llm, forwarding the answer's tokens as they are generated.
+    """
+    stats = {}
+    yield {"event": "stage", "stage": "llm", "model": LLM_MODEL}
+    chunks = []
+    async for content in _answer_question(question, context, stats):
+        chunks.append(content)
+        yield {"event": "token", "stage": "llm", "content": content}
+    yield {"event": "done", "answer": "".join(chunks), "stats": stats}
@@ -0,0 +1,310 @@
+"""
+Background analysis jobs.
+
+Submitting returns a job id at once; a pool of workers runs the two-stage analysis and
+records progress on the job. Model calls inside a job still go through the shared LLM
+client, which caps generations per model endpoint, so a burst of submissions queues here
+instead of on the model server. A submission for a ticker that already has a job in
+progress, or a finished one whose data is still fresh, gets that job back.
+
+Jobs are persisted, so after a restart queued jobs are picked up again. A process that
+shuts down hands its running jobs back to the queue; jobs of a worker that died are
+retried once their heartbeat goes stale, checked periodically rather than only on start.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from src.LLM.LLM_service import stream_analysis
+from src.LLM.response_cache import analysis_ttl
+from src.mongoDB.analysis_jobs import analysis_job_store
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+ANALYSIS_JOB_MAX_ATTEMPTS = int(os.getenv("ANALYSIS_JOB_MAX_ATTEMPTS", "3"))
+# A running job whose worker has not reported for this long is presumed dead
+ANALYSIS_JOB_STALE_SECONDS = float(os.getenv("ANALYSIS_JOB_STALE_SECONDS", "120"))
+# How often a running job reports that it is alive, and writes back its progress
+ANALYSIS_JOB_HEARTBEAT_SECONDS = float(os.getenv("ANALYSIS_JOB_HEARTBEAT_SECONDS", "10"))
+# How often running jobs are checked for a dead worker
+ANALYSIS_JOB_SWEEP_SECONDS = float(os.getenv("ANALYSIS_JOB_SWEEP_SECONDS", "30"))
+# How often an event stream with nothing to send re-reads the job and sends a keep-alive
+ANALYSIS_JOB_EVENTS_POLL_SECONDS = float(os.getenv("ANALYSIS_JOB_EVENTS_POLL_SECONDS", "15"))
+# Finished jobs are kept this long for polling clients
+ANALYSIS_JOB_RETENTION_SECONDS = float(os.getenv("ANALYSIS_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+FINISHED_STATUSES = {"done", "failed"}
+
+
+def public_job(job: dict) -> dict:
+    """
+    A job as returned to clients.
+    """
+    fields = {key: value for key, value in job.items() if key not in ("_id", "expires_at", "worker")}
+    return {"job_id": job["_id"], **fields}
+
+
+def _stored_event(job: dict) -> dict:
+    """
+    The event a subscriber gets from the stored job when no progress event arrived.
+    """
+    if job["status"] == "done":
+        return {"event": "done", **(job.get("result") or {}), "job_id": job["_id"]}
+    if job["status"] == "failed":
+        return {"event": "error", "detail": job.get("error"), "job_id": job["_id"]}
+    return {"event": "keep-alive", "status": job["status"], "stage": job.get("stage"), "tokens": job.get("tokens") or {}, "job_id": job["_id"]}
+
+
+class AnalysisJobs:
+    def __init__(self, store, analyze=stream_analysis, workers: int = ANALYSIS_WORKERS, clock=time.time):
+        self.store = store
+        self.analyze = analyze
+        self.workers = workers
+        self._clock = clock
+        self._queue = asyncio.Queue()
+        self._tasks = []
+        self._subscribers = {}
+        self._running = {}  # job id -> attempts, for jobs this process is running
+        self._sweeper = None
+        self._submit_lock = asyncio.Lock()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0, "recovered": 0}
+
+    async def start(self):
+        """
+        Re-queue persisted jobs, start the workers and the periodic sweep for jobs whose
+        worker died.
+        """
+        try:
+            await asyncio.wait_for(self.store.ensure_indexes(), 5)
+            unfinished = await asyncio.wait_for(self.store.unfinished(), 5)
+        except Exception as e:
+            logger.warning(f"Analysis jobs not recovered: {e}")
+            unfinished = []
+
+        for job in unfinished:
+            if job["status"] == "queued":
+                self._queue.put_nowait(job["_id"])
+                self.stats["recovered"] += 1
+        await self._sweep(unfinished)
+        if self.stats["recovered"]:
+            logger.info(f"Re-queued {self.stats['recovered']} analysis jobs")
+        self._start_workers()
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_periodically())
+
+    async def _sweep(self, unfinished):
+        """
+        Re-queue running jobs whose worker stopped reporting, or fail them once they have
+        used up their attempts.
+        """
+        now = self._clock()
+        for job in unfinished:
+            if job["status"] != "running" or job["_id"] in self._running:
+                continue
+            if now - (job.get("heartbeat_at") or 0) < ANALYSIS_JOB_STALE_SECONDS:
+                continue  # Another worker is still on it
+            if job.get("attempts", 0) >= ANALYSIS_JOB_MAX_ATTEMPTS:
+                await self._finish(job["_id"], "failed", error="Worker stopped repeatedly while running this job")
+                continue
+            await self.store.update(job["_id"], {"status": "queued", "stage": None, "worker": None})
+            self._queue.put_nowait(job["_id"])
+            self.stats["recovered"] += 1
+            logger.info(f"Re-queued analysis job {job['_id']} for {job['ticker']}, its worker stopped reporting")
+
+    async def _sweep_periodically(self):
+        while True:
+            await asyncio.sleep(ANALYSIS_JOB_SWEEP_SECONDS)
+            try:
+                await self._sweep(await self.store.unfinished())
+                self._start_workers()
+            except Exception as e:
+                logger.warning(f"Analysis job sweep failed: {e}")
+
+    def _start_workers(self):
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._work()))
+
+    async def stop(self):
+        """
+        Stop the workers and hand the jobs they were running back to the queue, so the next
+        start (of this or another process) runs them again.
+        """
+        tasks = self._tasks + ([self._sweeper] if self._sweeper is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._sweeper = None
+
+        for job_id, attempts in list(self._running.items()):
+            try:
+                # An interrupted run does not count against the job's attempts
+                await self.store.update(job_id, {"status": "queued", "stage": None, "worker": None, "attempts": attempts - 1})
+            except Exception as e:
+                logger.warning(f"Analysis job {job_id} not released: {e}")
+        self._running.clear()
+
+    async def submit(self, ticker: str):
+        """
+        (job, created): a new queued job, or the existing job this submission coalesced with.
+        """
+        ticker = ticker.upper()
+        async with self._submit_lock:
+            now = self._clock()
+            existing = await self.store.find_reusable(ticker, now, now - ANALYSIS_JOB_STALE_SECONDS)
+            if existing is not None:
+                self.stats["coalesced"] += 1
+                return public_job(existing), False
+
+            job = {
+                "_id": uuid.uuid4().hex,
+                "ticker": ticker,
+                "status": "queued",
+                "stage": None,
+                "tokens": {},
+                "attempts": 0,
+                "submitted_at": self._clock(),
+                "started_at": None,
+                "finished_at": None,
+                "heartbeat_at": None,
+                "fresh_until": None,
+                "result": None,
+                "error": None,
+            }
+            await self.store.save(job)
+        self.stats["submitted"] += 1
+        self._queue.put_nowait(job["_id"])
+        self._start_workers()
+        return public_job(job), True
+
+    async def get(self, job_id: str):
+        job = await self.store.get(job_id)
+        return public_job(job) if job is not None else None
+
+    async def events(self, job_id: str):
+        """
+        The job's current state, then its progress events until it finishes.
+
+        Progress events only exist in the process running the job. When nothing arrives
+        for ANALYSIS_JOB_EVENTS_POLL_SECONDS the stored job is read again: a job run by
+        another process ends the stream with a done/error event built from the store, and
+        an unfinished one gets a keep-alive carrying its stored stage and token counts.
+        """
+        queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            job = await self.store.get(job_id)
+            if job is None:
+                return
+            yield {"event": "job", **public_job(job)}
+            if job["status"] in FINISHED_STATUSES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), ANALYSIS_JOB_EVENTS_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    job = await self.store.get(job_id)
+                    if job is None:
+                        return
+                    event = _stored_event(job)
+                yield event
+                if event["event"] in ("done", "error"):
+                    return
+        finally:
+            self._subscribers[job_id].discard(queue)
+            if not self._subscribers[job_id]:
+                del self._subscribers[job_id]
+
+    def _publish(self, job_id: str, event: dict):
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait({**event, "job_id": job_id})
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Analysis job {job_id} crashed: {e}")
+
+    async def _run(self, job_id: str):
+        now = self._clock()
+        job = await self.store.claim(job_id, {"worker": self.worker_id, "started_at": now, "heartbeat_at": now})
+        if job is None:
+            return  # Finished, or claimed by another worker
+
+        self._running[job_id] = job.get("attempts", 1)
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        tokens = {}
+        last_progress = now
+        try:
+            async for event in self.analyze(job["ticker"]):
+                if event["event"] == "stage":
+                    await self.store.update(job_id, {"stage": event["stage"], "tokens": tokens})
+                elif event["event"] == "token":
+                    tokens[event["stage"]] = tokens.get(event["stage"], 0) + 1
+                    if self._clock() - last_progress >= ANALYSIS_JOB_HEARTBEAT_SECONDS:
+                        last_progress = self._clock()
+                        await self.store.update(job_id, {"tokens": tokens})
+                elif event["event"] == "done":
+                    result = {key: value for key, value in event.items() if key != "event"}
+                    await self._finish(job_id, "done", result=result, tokens=tokens,
+                                       fresh_until=self._clock() + analysis_ttl(job["ticker"]))
+                self._publish(job_id, event)
+        except Exception as e:
+            logger.warning(f"Analysis job {job_id} for {job['ticker']} failed: {e}")
+            await self._finish(job_id, "failed", error=str(e), tokens=tokens)
+            self._publish(job_id, {"event": "error", "detail": str(e)})
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str):
+        """
+        Report the job alive while it runs, including long stretches without tokens (model
+        load, prompt evaluation), so the sweep never takes it from a live worker.
+        """
+        while True:
+            await asyncio.sleep(ANALYSIS_JOB_HEARTBEAT_SECONDS)
+            try:
+                await self.store.update(job_id, {"heartbeat_at": self._clock()})
+            except Exception as e:
+                logger.warning(f"Analysis job {job_id} heartbeat failed: {e}")
+
+    async def _finish(self, job_id: str, status: str, **fields):
+        self._running.pop(job_id, None)
+        now = self._clock()
+        await self.store.update(job_id, {
+            **fields,
+            "status": status,
+            "stage": None,
+            "finished_at": now,
+            "expires_at": datetime.fromtimestamp(now + ANALYSIS_JOB_RETENTION_SECONDS, tz=timezone.utc),
+        })
+        self.stats["completed" if status == "done" else "failed"] += 1
+
+    def status(self) -> dict:
+        return {
+            "workers": len([task for task in self._tasks if not task.done()]),
+            "queued": self._queue.qsize(),
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            **self.stats,
+        }
+
+
+# Shared job queue for the /analysis-jobs routes
+analysis_jobs = AnalysisJobs(analysis_job_store)
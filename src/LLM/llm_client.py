@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Model servers (Ollama by default); the DeepThinking stage can run on another host
+LLM_API_URL = os.getenv("LLM_API_URL", "http://localhost:11434/api/chat")
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", LLM_API_URL)
+LLM_EMBED_URL = os.getenv("LLM_EMBED_URL", "http://localhost:11434/api/embed")
+
+# Pool and timeouts, all overridable from the environment. While streaming, the read
+# timeout bounds the gap between chunks (including model load before the first token),
+# not the whole generation.
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "300"))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "30"))
+# Generations in flight per (server, model); further requests wait their turn here
+# instead of piling up in the model server's queue
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+
+_client = None
+_endpoint_semaphores = {}
+_in_flight = {}
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=LLM_CONNECT_TIMEOUT,
+        read=LLM_READ_TIMEOUT,
+        write=LLM_CONNECT_TIMEOUT,
+        pool=LLM_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+async def start_llm_client():
+    """
+    Create the shared model server client. Called once on application startup.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+        logger.info("Started shared LLM client")
+    return _client
+
+
+async def close_llm_client():
+    """
+    Close the shared model server client and release pooled connections.
+    """
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+        logger.info("Closed shared LLM client")
+    _client = None
+    _endpoint_semaphores.clear()
+    _in_flight.clear()
+
+
+def get_llm_client() -> httpx.AsyncClient:
+    """
+    Return the shared client, creating it lazily when used outside the app lifespan
+    (scripts, tests).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+def server_url(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _endpoint(url: str, model: str = None) -> str:
+    return f"{urlsplit(url).netloc}/{model}" if model else urlsplit(url).netloc
+
+
+def _endpoint_semaphore(endpoint: str) -> asyncio.Semaphore:
+    semaphore = _endpoint_semaphores.get(endpoint)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _endpoint_semaphores[endpoint] = semaphore
+    return semaphore
+
+
+@asynccontextmanager
+async def stream_post(url: str, payload: dict):
+    """
+    POST `payload` with a streamed response body, holding one of the model endpoint's
+    concurrency slots until the caller finishes reading.
+    """
+    endpoint = _endpoint(url, payload.get("model"))
+    async with _endpoint_semaphore(endpoint):
+        _in_flight[endpoint] = _in_flight.get(endpoint, 0) + 1
+        try:
+            async with get_llm_client().stream("POST", url, json=payload) as response:
+                yield response
+        finally:
+            _in_flight[endpoint] -= 1
+
+
+async def post(url: str, payload: dict) -> dict:
+    """
+    POST a non-streaming request (embeddings, model management) and return its JSON body,
+    bounded by the same per-endpoint concurrency as generations.
+    """
+    endpoint = _endpoint(url, payload.get("model"))
+    async with _endpoint_semaphore(endpoint):
+        _in_flight[endpoint] = _in_flight.get(endpoint, 0) + 1
+        try:
+            response = await get_llm_client().post(url, json=payload)
+        finally:
+            _in_flight[endpoint] -= 1
+    response.raise_for_status()
+    return response.json()
+
+
+async def get(url: str) -> dict:
+    """
+    GET a model server status endpoint and return its JSON body.
+    """
+    response = await get_llm_client().get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+def in_flight(url: str, model: str = None) -> int:
+    """
+    Requests currently holding a slot on the model endpoint.
+    """
+    return _in_flight.get(_endpoint(url, model), 0)
+
+
+def llm_client_status() -> dict:
+    return {
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "in_flight": {endpoint: count for endpoint, count in _in_flight.items() if count},
+    }
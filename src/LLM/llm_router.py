@@ -0,0 +1,200 @@
+"""
+Spread generations over a pool of model servers.
+
+Each request goes to the healthy server with the fewest outstanding requests among those
+that have the requested model. A server that refuses the connection is taken out of
+rotation for a cooldown and the request is sent to the next one; nothing reached the
+failed server, so the retry cannot duplicate a generation. A periodic check of every
+server's /api/tags keeps health and the model lists current.
+
+With a single server configured this behaves exactly like calling it directly.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+from src.LLM.llm_client import DEEPSEEK_API_URL, LLM_API_URL, get, post, server_url, stream_post
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Comma separated model servers, e.g. "http://gpu1:11434,http://gpu2:11434"
+LLM_SERVERS = [
+    server.strip().rstrip("/")
+    for server in os.getenv("LLM_SERVERS", ",".join(dict.fromkeys([server_url(LLM_API_URL), server_url(DEEPSEEK_API_URL)]))).split(",")
+    if server.strip()
+]
+# How long a server that refused a connection is left out of rotation
+LLM_SERVER_COOLDOWN_SECONDS = float(os.getenv("LLM_SERVER_COOLDOWN_SECONDS", "30"))
+LLM_HEALTH_CHECK_SECONDS = float(os.getenv("LLM_HEALTH_CHECK_SECONDS", "30"))
+
+# Failures where the request never reached the server, so it is safe to send elsewhere
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+def model_name(name: str) -> str:
+    return name if ":" in name else f"{name}:latest"
+
+
+class InferenceRouter:
+    def __init__(self, servers=LLM_SERVERS, health_check_seconds: float = LLM_HEALTH_CHECK_SECONDS, clock=time.time):
+        self.servers = {
+            server: {"down_until": 0, "models": None, "outstanding": 0, "requests": 0, "failures": 0, "last_error": None}
+            for server in servers
+        }
+        self.health_check_seconds = health_check_seconds
+        self._clock = clock
+        self._task = None
+        self.stats = {"retries": 0}
+
+    def is_up(self, server: str) -> bool:
+        return self.servers[server]["down_until"] <= self._clock()
+
+    def has_model(self, server: str, model: str = None) -> bool:
+        models = self.servers[server]["models"]
+        # Until a server's models are known it is assumed to have them all
+        return model is None or models is None or model_name(model) in models
+
+    def pick(self, model: str = None, exclude=()) -> str:
+        """
+        The server for the next request: least outstanding requests among healthy servers
+        with the model, falling back to servers that are cooling down rather than failing.
+        """
+        candidates = [server for server in self.servers if server not in exclude and self.has_model(server, model)]
+        if not candidates:
+            return None
+        healthy = [server for server in candidates if self.is_up(server)] or candidates
+        return min(healthy, key=lambda server: (self.servers[server]["outstanding"], self.servers[server]["requests"]))
+
+    def _mark_down(self, server: str, error: Exception):
+        state = self.servers[server]
+        state["down_until"] = self._clock() + LLM_SERVER_COOLDOWN_SECONDS
+        state["failures"] += 1
+        state["last_error"] = str(error) or type(error).__name__
+        logger.warning(f"Model server {server} unreachable, out of rotation for {LLM_SERVER_COOLDOWN_SECONDS:.0f}s: {state['last_error']}")
+
+    def _route(self, url: str, model: str = None, exclude=()):
+        server = self.pick(model, exclude)
+        if server is None:
+            return None, None
+        parts = urlsplit(url)
+        return server, f"{server}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+    @asynccontextmanager
+    async def stream_post(self, url: str, payload: dict):
+        """
+        Like llm_client.stream_post, with the server in `url` replaced by the one picked
+        from the pool. Connection failures move on to the next server.
+        """
+        tried = set()
+        while True:
+            server, target = self._route(url, payload.get("model"), tried)
+            if server is None:
+                raise RuntimeError(f"No model server has {payload.get('model')}")
+            state = self.servers[server]
+            state["outstanding"] += 1
+            state["requests"] += 1
+            entered = False
+            try:
+                async with stream_post(target, payload) as response:
+                    entered = True
+                    state["down_until"] = 0
+                    yield response
+                return
+            except CONNECT_ERRORS as e:
+                if entered:
+                    raise
+                self._mark_down(server, e)
+                tried.add(server)
+                if self.pick(payload.get("model"), tried) is None:
+                    raise
+                self.stats["retries"] += 1
+            finally:
+                state["outstanding"] -= 1
+
+    async def post(self, url: str, payload: dict) -> dict:
+        """
+        Like llm_client.post, routed over the pool.
+        """
+        tried = set()
+        while True:
+            server, target = self._route(url, payload.get("model"), tried)
+            if server is None:
+                raise RuntimeError(f"No model server has {payload.get('model')}")
+            state = self.servers[server]
+            state["outstanding"] += 1
+            state["requests"] += 1
+            try:
+                return await post(target, payload)
+            except CONNECT_ERRORS as e:
+                self._mark_down(server, e)
+                tried.add(server)
+                if self.pick(payload.get("model"), tried) is None:
+                    raise
+                self.stats["retries"] += 1
+            finally:
+                state["outstanding"] -= 1
+
+    async def check(self):
+        """
+        Refresh every server's health and model list from /api/tags.
+        """
+        async def check_server(server):
+            state = self.servers[server]
+            try:
+                data = await get(f"{server}/api/tags")
+            except Exception as e:
+                if state["down_until"] <= self._clock():
+                    self._mark_down(server, e)
+                return
+            state["models"] = {model_name(entry["name"]) for entry in data.get("models", [])}
+            state["down_until"] = 0
+
+        await asyncio.gather(*(check_server(server) for server in self.servers))
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Model server health check failed: {e}")
+            await asyncio.sleep(self.health_check_seconds)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "servers": {
+                server: {
+                    "healthy": self.is_up(server),
+                    "outstanding": state["outstanding"],
+                    "requests": state["requests"],
+                    "failures": state["failures"],
+                    "last_error": state["last_error"],
+                    "models": sorted(state["models"]) if state["models"] is not None else None,
+                }
+                for server, state in self.servers.items()
+            },
+            **self.stats,
+        }
+
+
+# Shared router for generations from the LLM service
+llm_router = InferenceRouter()
@@ -0,0 +1,249 @@
+"""
+Model residency on the model servers.
+
+Ollama unloads a model five minutes after its last request, so the first analysis after
+an idle spell waits for both models to load again. The manager preloads the configured
+models on startup and sets `keep_alive` on every generation from recent traffic: models
+in steady use are kept resident for longer, rarely used ones get the server default.
+A periodic check reloads hot models the servers dropped and, when the models resident on
+a server exceed the memory budget, unloads the least recently used cold ones.
+
+Every server in the inference router's pool that has a model is managed, since any of
+them may be picked for the next request.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from src.LLM.llm_client import get, in_flight, post
+from src.LLM.llm_router import llm_router, model_name
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_PRELOAD_ENABLED = os.getenv("LLM_PRELOAD_ENABLED", "true").lower() == "true"
+# Seconds a model stays resident after its last request (Ollama's default is 300)
+LLM_KEEP_ALIVE_HOT_SECONDS = int(os.getenv("LLM_KEEP_ALIVE_HOT_SECONDS", "3600"))
+LLM_KEEP_ALIVE_COLD_SECONDS = int(os.getenv("LLM_KEEP_ALIVE_COLD_SECONDS", "300"))
+# A model with this many requests in the traffic window is hot
+LLM_HOT_REQUESTS = int(os.getenv("LLM_HOT_REQUESTS", "3"))
+LLM_TRAFFIC_WINDOW_SECONDS = float(os.getenv("LLM_TRAFFIC_WINDOW_SECONDS", "1800"))
+# Memory the resident models on one server may use; 0 leaves eviction to the server
+LLM_MODEL_MEMORY_BUDGET_MB = float(os.getenv("LLM_MODEL_MEMORY_BUDGET_MB", "0"))
+LLM_MODEL_CHECK_SECONDS = float(os.getenv("LLM_MODEL_CHECK_SECONDS", "60"))
+# A generation whose model load took longer than this was a cold start
+LLM_COLD_START_SECONDS = float(os.getenv("LLM_COLD_START_SECONDS", "1"))
+
+
+class ModelManager:
+    def __init__(
+        self,
+        router=llm_router,
+        preload: bool = LLM_PRELOAD_ENABLED,
+        memory_budget_mb: float = LLM_MODEL_MEMORY_BUDGET_MB,
+        check_seconds: float = LLM_MODEL_CHECK_SECONDS,
+        clock=time.time,
+    ):
+        self.router = router
+        self.preload = preload
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.check_seconds = check_seconds
+        self._clock = clock
+        self.models = set()
+        self.pinned = set()  # Preloaded models, kept hot until traffic says otherwise
+        self._pinned_at = 0
+        self._requests = {}
+        self._last_used = {}
+        self._resident = {}  # server URL -> {model: /api/ps entry}
+        self._task = None
+        self.stats = {"preloads": 0, "reloads": 0, "unloads": 0, "cold_starts": 0, "warm_starts": 0, "errors": 0}
+
+    def servers_for(self, model: str):
+        """
+        Healthy pool servers that have `model`.
+        """
+        return [server for server in self.router.servers if self.router.is_up(server) and self.router.has_model(server, model)]
+
+    def _recent_requests(self, model: str) -> int:
+        requests = self._requests.get(model)
+        if not requests:
+            return 0
+        cutoff = self._clock() - LLM_TRAFFIC_WINDOW_SECONDS
+        while requests and requests[0] < cutoff:
+            requests.popleft()
+        return len(requests)
+
+    def is_hot(self, model: str) -> bool:
+        if self._recent_requests(model) >= LLM_HOT_REQUESTS:
+            return True
+        # Preloaded models stay hot until a full window passes without enough traffic
+        return model in self.pinned and self._clock() - self._pinned_at < LLM_TRAFFIC_WINDOW_SECONDS
+
+    def keep_alive(self, model: str) -> int:
+        """
+        Record a generation for `model` and return the keep_alive to send with it.
+        """
+        self.models.add(model)
+        now = self._clock()
+        self._requests.setdefault(model, deque()).append(now)
+        self._last_used[model] = now
+        return LLM_KEEP_ALIVE_HOT_SECONDS if self.is_hot(model) else LLM_KEEP_ALIVE_COLD_SECONDS
+
+    def observe(self, model: str, stats: dict):
+        """
+        Count a finished generation as a cold or warm start from its load time.
+        """
+        if not stats or "load_duration" not in stats:
+            return
+        if stats["load_duration"] / 1e9 >= LLM_COLD_START_SECONDS:
+            self.stats["cold_starts"] += 1
+            logger.info(f"Cold start for {model}: {stats['load_duration'] / 1e9:.1f}s loading")
+        else:
+            self.stats["warm_starts"] += 1
+
+    async def load(self, model: str, server: str, keep_alive: int = LLM_KEEP_ALIVE_HOT_SECONDS):
+        # A generate request without a prompt only loads the model
+        await post(f"{server}/api/generate", {"model": model, "keep_alive": keep_alive})
+
+    async def unload(self, model: str, server: str):
+        await post(f"{server}/api/generate", {"model": model, "keep_alive": 0})
+        self.stats["unloads"] += 1
+        logger.info(f"Unloaded {model} from {server}")
+
+    async def refresh(self):
+        """
+        Read which models each healthy server currently has loaded.
+        """
+        for server in self.router.servers:
+            if not self.router.is_up(server):
+                self._resident.pop(server, None)
+                continue
+            try:
+                data = await get(f"{server}/api/ps")
+            except Exception as e:
+                self._resident.pop(server, None)
+                logger.warning(f"Could not read loaded models on {server}: {e}")
+                continue
+            self._resident[server] = {model_name(entry["name"]): entry for entry in data.get("models", [])}
+
+    def is_resident(self, model: str, server: str) -> bool:
+        return model_name(model) in self._resident.get(server, {})
+
+    async def _load_everywhere(self, model: str, stat: str):
+        """
+        Load `model` on every server that has it but has not loaded it.
+        """
+        servers = [server for server in self.servers_for(model) if not self.is_resident(model, server)]
+        results = await asyncio.gather(*(self.load(model, server) for server in servers), return_exceptions=True)
+        for server, result in zip(servers, results):
+            if isinstance(result, Exception):
+                self.stats["errors"] += 1
+                logger.warning(f"Could not load {model} on {server}: {result}")
+            else:
+                self.stats[stat] += 1
+                logger.info(f"Loaded {model} on {server}")
+
+    async def rebalance(self):
+        """
+        Reload hot models the servers dropped, then unload cold models while a server is
+        over the memory budget.
+        """
+        await self.refresh()
+        for model in list(self.models):
+            if self.is_hot(model):
+                await self._load_everywhere(model, "reloads")
+        if not self.memory_budget:
+            return
+
+        known = {model_name(model): model for model in self.models}
+        for server, resident in list(self._resident.items()):
+            used = sum(entry.get("size", 0) for entry in resident.values())
+            # Coldest first; models we have never sent traffic to go before any we have.
+            # In-flight counts are keyed on the server the router sent each request to.
+            candidates = sorted(
+                (
+                    name for name in resident
+                    if not self.is_hot(known.get(name, name)) and not in_flight(server, known.get(name, name))
+                ),
+                key=lambda name: self._last_used.get(known.get(name, name), 0),
+            )
+            for name in candidates:
+                if used <= self.memory_budget:
+                    break
+                await self.unload(known.get(name, name), server)
+                used -= resident[name].get("size", 0)
+            if used > self.memory_budget:
+                logger.warning(f"Models on {server} use {used / 2**20:.0f}MB, over the budget, but all are hot or busy")
+        await self.refresh()
+
+    async def start(self, models):
+        """
+        Manage `models`: preload them in the background on every pool server that has them
+        and start the periodic residency check.
+        """
+        self.models.update(models)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        if self.preload:
+            self.pinned = set(self.models)
+            self._pinned_at = self._clock()
+            try:
+                # Know which servers have which models before loading anything
+                await self.router.check()
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Model servers not checked before preloading: {e}")
+            await asyncio.gather(*(self._load_everywhere(model, "preloads") for model in self.models))
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            try:
+                await self.rebalance()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Model residency check failed: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self) -> dict:
+        models = {}
+        for model in sorted(self.models):
+            servers = {}
+            for server in self.router.servers:
+                if not self.router.has_model(server, model):
+                    continue
+                entry = self._resident.get(server, {}).get(model_name(model))
+                servers[server] = {
+                    "resident": entry is not None,
+                    "size_mb": round(entry.get("size", 0) / 2**20) if entry else None,
+                    "expires_at": entry.get("expires_at") if entry else None,
+                }
+            models[model] = {
+                "hot": self.is_hot(model),
+                "recent_requests": self._recent_requests(model),
+                "servers": servers,
+            }
+        return {
+            "preload": self.preload,
+            "memory_budget_mb": round(self.memory_budget / 2**20) or None,
+            "models": models,
+            **self.stats,
+        }
+
+
+# Shared model manager for the LLM service
+model_manager = ModelManager()
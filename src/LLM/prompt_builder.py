@@ -0,0 +1,357 @@
+"""
+Compact, token-budgeted prompts for the analysis pipeline.
+
+The stock data bundle is reduced to a typed feature summary: numbers parsed and rounded,
+missing ("N/A", "None") fields dropped, financial statements reduced to headline figures
+and margins, news condensed to title, date, sentiment and first sentence. Each section
+has progressively shorter renderings; when a prompt is over its stage's budget the least
+important section is shortened (or dropped) first.
+
+Token counts are estimated locally, which is close enough to budget by; the exact count
+for each call is the prompt_eval_count the model server reports in the stream stats.
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Prompt-side token budget per analysis stage
+PROMPT_TOKEN_BUDGET_LLM = int(os.getenv("PROMPT_TOKEN_BUDGET_LLM", "1200"))
+PROMPT_TOKEN_BUDGET_DEEPTHINKING = int(os.getenv("PROMPT_TOKEN_BUDGET_DEEPTHINKING", "2500"))
+# Most news items a prompt includes before any budget cuts
+PROMPT_NEWS_ITEMS = int(os.getenv("PROMPT_NEWS_ITEMS", "3"))
+
+MISSING = {"", "N/A", "NONE", "NULL", "-"}
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+# Bundle keys each summary section is built from
+SECTION_DATASETS = {
+    "profile": ("metadata",),
+    "prices": ("historical_data",),
+    "indicators": ("sma", "ema"),
+    "fundamentals": ("income_statement", "balance_sheet", "cash_flow", "earnings"),
+    "news": ("news",),
+}
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimated tokens: words count once per 6 letters, digit runs once per 3 digits (most
+    tokenizers split long numbers), every other symbol once.
+    """
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        if piece.isalpha():
+            tokens += math.ceil(len(piece) / 6)
+        elif piece.isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        else:
+            tokens += 1
+    return tokens
+
+
+def _value(value):
+    if value is None or (isinstance(value, str) and value.strip().upper() in MISSING):
+        return None
+    return value
+
+
+def _number(value):
+    value = _value(value)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def fmt(value: float) -> str:
+    """
+    Short human form: 391035000000 -> 391B, 213.4900 -> 213.49, 1.259 -> 1.259.
+    """
+    magnitude = abs(value)
+    for size, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M")):
+        if magnitude >= size:
+            return f"{value / size:.3g}{suffix}"
+    if magnitude >= 100:
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return f"{value:.4g}"
+
+
+def pct(ratio: float) -> str:
+    return f"{ratio * 100:+.1f}%"
+
+
+def _join(parts) -> str:
+    return ", ".join(part for part in parts if part)
+
+
+def _field(label: str, value, formatter=fmt):
+    number = _number(value)
+    return f"{label} {formatter(number)}" if number is not None else None
+
+
+def _first_sentence(text, limit: int = 160):
+    text = _value(text)
+    if not text:
+        return None
+    # A sentence ends after a lowercase word, so "Inc." and "U.S." do not end it
+    sentence = re.split(r"(?<=[a-z]{3}[.!?])\s+(?=[A-Z])", " ".join(str(text).split()), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit].rsplit(" ", 1)[0] + "..."
+
+
+@dataclass
+class Section:
+    """
+    A named part of the data summary. `variants` run from most to least detailed; None
+    as the last variant means the section may be dropped entirely. Lower priority
+    numbers are more important and are shortened last.
+    """
+    name: str
+    priority: int
+    variants: list
+
+    def __post_init__(self):
+        self.variants = [variant for variant in self.variants if variant != ""] or [None]
+        self.tokens = [count_tokens(variant) if variant else 0 for variant in self.variants]
+
+
+def _profile(stock_data: dict):
+    metadata = stock_data.get("metadata") or {}
+    ticker = str(metadata.get("ticker") or metadata.get("symbol") or "").upper()
+    about = next((value for key, value in metadata.items() if key.startswith("about")), None)
+    low, high = _number(metadata.get("52_week_low")), _number(metadata.get("52_week_high"))
+    line = _join([
+        ticker,
+        " / ".join(str(_value(metadata.get(key))) for key in ("sector", "industry") if _value(metadata.get(key))),
+        _field("market cap", metadata.get("market_cap")),
+        _field("P/E", metadata.get("pe_ratio")),
+        _field("EPS", metadata.get("eps")),
+        _field("beta", metadata.get("beta")),
+        _field("dividend yield", metadata.get("dividend_yield"), lambda ratio: f"{ratio * 100:.2f}%"),
+        f"52w range {fmt(low)}-{fmt(high)}" if low is not None and high is not None else None,
+        _field("50d average", metadata.get("current_price")),
+        _field("analyst target", metadata.get("price_targets")),
+        _field("quarterly earnings growth YoY", metadata.get("events"), pct),
+    ])
+    line = f"Profile: {line}" if line else None
+    sentence = _first_sentence(about)
+    return Section("profile", 0, [f"{line}\nAbout: {sentence}" if line and sentence else line, line])
+
+
+def _prices(stock_data: dict):
+    historical = stock_data.get("historical_data") or {}
+    bars = historical.get("historical_data", []) if isinstance(historical, dict) else historical
+    bars = [
+        (bar.get("date"), _number(bar.get("close")), _number(bar.get("high")), _number(bar.get("low")), _number(bar.get("volume")))
+        for bar in bars or []
+        if _number(bar.get("close")) is not None
+    ]
+    if not bars:
+        return Section("prices", 0, [None])
+
+    closes = [close for _, close, _, _, _ in bars]
+    highs = [high for _, _, high, _, _ in bars if high is not None]
+    lows = [low for _, _, _, low, _ in bars if low is not None]
+    volumes = [volume for *_, volume in bars if volume is not None]
+    summary = _join([
+        f"last close {fmt(closes[0])} ({bars[0][0]})",
+        f"change {pct(closes[0] / closes[-1] - 1)} over {len(bars)} bars" if len(bars) > 1 and closes[-1] else None,
+        f"range {fmt(min(lows))}-{fmt(max(highs))}" if highs and lows else None,
+        f"avg volume {fmt(sum(volumes) / len(volumes))}" if volumes else None,
+    ])
+
+    def render(count):
+        closes_line = ", ".join(f"{day} {fmt(close)}" for day, close, *_ in bars[:count])
+        return f"Prices: {summary}\nWeekly closes (newest first): {closes_line}"
+
+    return Section("prices", 0, [render(len(bars)), render(min(3, len(bars))), f"Prices: {summary}"])
+
+
+def _latest_indicator(series, name: str):
+    if not isinstance(series, dict) or not series:
+        return None, None, None
+    points = [(day, _number((values or {}).get(name))) for day, values in series.items()]
+    points = [(day, value) for day, value in points if value is not None]
+    if not points:
+        return None, None, None
+    return points[0][0], points[0][1], points[-1][1] if len(points) > 1 else None
+
+
+def _indicators(stock_data: dict, price):
+    full, short = [], []
+    for name in ("SMA", "EMA"):
+        day, latest, oldest = _latest_indicator(stock_data.get(name.lower()), name)
+        if latest is None:
+            continue
+        versus = f", price {pct(price / latest - 1)} vs {name}" if price and latest else ""
+        short.append(f"{name} {fmt(latest)}{versus}")
+        trend = f", {pct(latest / oldest - 1)} over the series" if oldest else ""
+        full.append(f"{name} {fmt(latest)} ({day}){versus}{trend}")
+    if not full:
+        return Section("indicators", 1, [None])
+    return Section("indicators", 1, [f"Indicators: {'; '.join(full)}", f"Indicators: {'; '.join(short)}", None])
+
+
+def _report(stock_data: dict, dataset: str):
+    statement = stock_data.get(dataset) or {}
+    reports = statement.get("annual_reports") if isinstance(statement, dict) else None
+    return reports[0] if reports else {}
+
+
+def _ratio(numerator, denominator, label: str):
+    numerator, denominator = _number(numerator), _number(denominator)
+    return f"{label} {numerator / denominator * 100:.1f}%" if numerator is not None and denominator else None
+
+
+def _fundamentals(stock_data: dict):
+    income = _report(stock_data, "income_statement")
+    balance = _report(stock_data, "balance_sheet")
+    cash_flow = _report(stock_data, "cash_flow")
+
+    income_line = _join([
+        _field("revenue", income.get("totalRevenue")),
+        _ratio(income.get("grossProfit"), income.get("totalRevenue"), "gross margin"),
+        _ratio(income.get("operatingIncome"), income.get("totalRevenue"), "operating margin"),
+        _field("net income", income.get("netIncome")),
+        _ratio(income.get("netIncome"), income.get("totalRevenue"), "net margin"),
+    ])
+    balance_line = _join([
+        _field("assets", balance.get("totalAssets")),
+        _field("liabilities", balance.get("totalLiabilities")),
+        _field("equity", balance.get("totalShareholderEquity")),
+        _field("cash", balance.get("cashAndCashEquivalentsAtCarryingValue")),
+        _field("long-term debt", balance.get("longTermDebt")),
+    ])
+    operating, capex = _number(cash_flow.get("operatingCashflow")), _number(cash_flow.get("capitalExpenditures"))
+    cash_flow_line = _join([
+        _field("operating cash flow", operating),
+        _field("capex", capex),
+        f"free cash flow {fmt(operating - abs(capex))}" if operating is not None and capex is not None else None,
+    ])
+
+    fiscal_year = _value(income.get("fiscalDateEnding") or balance.get("fiscalDateEnding") or cash_flow.get("fiscalDateEnding"))
+    heading = f"Fundamentals (FY ending {fiscal_year})" if fiscal_year else "Fundamentals"
+    lines = [f"{label}: {line}" for label, line in (("Income", income_line), ("Balance sheet", balance_line), ("Cash flow", cash_flow_line)) if line]
+    if not lines:
+        return Section("fundamentals", 2, [None])
+    return Section("fundamentals", 2, [f"{heading}\n" + "\n".join(lines), f"{heading}\n{lines[0]}", None])
+
+
+def _news(stock_data: dict):
+    items = [item for item in stock_data.get("news") or [] if isinstance(item, dict) and _value(item.get("title"))]
+    items = items[:PROMPT_NEWS_ITEMS]
+    if not items:
+        return Section("news", 3, [None])
+
+    def headline(item):
+        date = str(_value(item.get("pubDate")) or "")[:8]
+        date = f"{date[:4]}-{date[4:6]}-{date[6:8]}" if len(date) == 8 and date.isdigit() else None
+        sentiment = _value(item.get("sentimentLabel"))
+        tags = _join([date, sentiment and f"{sentiment} {_number(item.get('sentimentScore')) or 0:+.2f}"])
+        return f"- {_first_sentence(item['title'], 120)}" + (f" ({tags})" if tags else "")
+
+    def render(count, summaries):
+        lines = []
+        for item in items[:count]:
+            lines.append(headline(item))
+            summary = _first_sentence(item.get("summary")) if summaries else None
+            if summary:
+                lines.append(f"  {summary}")
+        scores = [_number(item.get("sentimentScore")) for item in items]
+        scores = [score for score in scores if score is not None]
+        average = f" (average sentiment {sum(scores) / len(scores):+.2f})" if scores else ""
+        return f"News{average}:\n" + "\n".join(lines)
+
+    return Section("news", 3, [render(len(items), True), render(len(items), False), render(1, False), None])
+
+
+def summarize(stock_data: dict):
+    """
+    The stock data bundle as budgetable sections, most important first.
+    """
+    metadata = stock_data.get("metadata") or {}
+    prices = _prices(stock_data)
+    historical = stock_data.get("historical_data") or {}
+    bars = historical.get("historical_data", []) if isinstance(historical, dict) else []
+    price = _number(bars[0].get("close")) if bars else _number(metadata.get("current_price"))
+    return [_profile(stock_data), prices, _indicators(stock_data, price), _fundamentals(stock_data), _news(stock_data)]
+
+
+@dataclass
+class CompiledPrompt:
+    text: str
+    tokens: int
+    budget: int
+    raw_tokens: int
+    sections: dict = field(default_factory=dict)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.tokens > self.budget
+
+    def report(self) -> dict:
+        """
+        Token counts and the compression against sending the raw bundle.
+        """
+        return {
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "raw_tokens": self.raw_tokens,
+            "compression": round(self.raw_tokens / self.tokens, 2) if self.tokens else None,
+            "over_budget": self.over_budget,
+            "sections": self.sections,
+        }
+
+
+def fit(sections, budget: int, fixed_tokens: int = 0):
+    """
+    Choose a variant per section so the total fits `budget`, shortening the least important
+    section that can still shrink first. Returns {name: variant index}.
+    """
+    levels = {section.name: 0 for section in sections}
+    total = fixed_tokens + sum(section.tokens[0] for section in sections)
+    while total > budget:
+        shrinkable = [section for section in sections if levels[section.name] < len(section.variants) - 1]
+        if not shrinkable:
+            break
+        section = max(shrinkable, key=lambda section: section.priority)
+        level = levels[section.name]
+        total -= section.tokens[level] - section.tokens[level + 1]
+        levels[section.name] = level + 1
+    return levels
+
+
+def compile_prompt(instructions: str, stock_data: dict, budget: int, reserved_tokens: int = 0,
+                   heading: str = "Stock data (compact summary, missing fields omitted):", include=None) -> CompiledPrompt:
+    """
+    `instructions` followed by the data summary, within `budget` tokens. `reserved_tokens`
+    is prompt space taken by other messages (e.g. the previous stage's answer). `include`
+    limits the summary to the named sections (see SECTION_DATASETS).
+    """
+    stock_data = stock_data or {}
+    sections = summarize(stock_data)
+    if include is not None:
+        sections = [section for section in sections if section.name in include]
+        stock_data = {key: stock_data.get(key) for name in include for key in SECTION_DATASETS[name]}
+    fixed = count_tokens(instructions) + count_tokens(heading) + reserved_tokens
+    levels = fit(sections, budget, fixed)
+
+    chosen = []
+    report = {}
+    for section in sections:
+        variant = section.variants[levels[section.name]]
+        if variant:
+            chosen.append(variant)
+        if variant or levels[section.name]:
+            report[section.name] = "dropped" if not variant else ("full" if not levels[section.name] else f"level {levels[section.name]}")
+
+    text = f"{instructions.strip()}\n\n{heading}\n" + "\n".join(chosen) if chosen else instructions.strip()
+    raw_tokens = count_tokens(instructions) + count_tokens(str(stock_data)) + reserved_tokens
+    return CompiledPrompt(text, count_tokens(text) + reserved_tokens, budget, raw_tokens, report)
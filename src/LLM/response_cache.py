@@ -0,0 +1,149 @@
+"""
+Exact-match cache of model responses.
+
+A response is keyed on a fingerprint of the request: the model, the messages with
+whitespace normalized, and any generation options. Entries expire with the data the
+prompt was built from (see analysis_ttl), and a hit is replayed in word-sized chunks so
+streaming clients see the same events as for a live generation.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from src.mongoDB.llm_responses import llm_response_store
+from src.utils.cache import CACHE_L2_TIMEOUT_SECONDS
+from src.utils.market_calendar import freshness_ttl
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+# Questions are not tied to one ticker's data, so they get a fixed lifetime
+LLM_QUESTION_CACHE_TTL_SECONDS = float(os.getenv("LLM_QUESTION_CACHE_TTL_SECONDS", str(6 * 3600)))
+# The fastest-changing inputs of an analysis prompt; it is stale once either refreshes
+ANALYSIS_DATASETS = ("historical_data", "news")
+# Request fields that do not change what the model generates
+IGNORED_FIELDS = {"stream", "keep_alive"}
+
+CHUNK_PATTERN = re.compile(r"\s*\S+\s*|\s+")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def fingerprint(payload: dict) -> str:
+    """
+    sha256 over the model, normalized messages and generation options of a chat request.
+    """
+    request = {field: value for field, value in payload.items() if field not in IGNORED_FIELDS}
+    request["messages"] = [
+        {**message, "content": normalize_text(message.get("content", ""))}
+        for message in payload.get("messages", [])
+    ]
+    encoded = json.dumps(request, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def analysis_ttl(ticker: str, now: datetime = None) -> float:
+    """
+    How long an analysis of `ticker` stays valid: until its price or news data refreshes.
+    """
+    return min(freshness_ttl(dataset, ticker, now=now) for dataset in ANALYSIS_DATASETS)
+
+
+def replay_chunks(text: str):
+    """
+    Split a cached answer into word-sized chunks, so a hit streams like a generation.
+    """
+    return CHUNK_PATTERN.findall(text)
+
+
+class ResponseCache:
+    def __init__(self, store, enabled: bool = LLM_RESPONSE_CACHE_ENABLED, clock=time.time):
+        self.store = store
+        self.enabled = enabled
+        self._clock = clock
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    async def start(self):
+        try:
+            await asyncio.wait_for(self.store.ensure_indexes(), CACHE_L2_TIMEOUT_SECONDS * 10)
+        except Exception as e:
+            logger.warning(f"LLM response cache indexes not created: {e}")
+
+    async def get(self, key: str):
+        """
+        The cached {"content", "stats", ...} for `key`, or None. Store failures count as misses.
+        """
+        try:
+            response = await asyncio.wait_for(self.store.load(key), CACHE_L2_TIMEOUT_SECONDS)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"LLM response cache read failed for {key}: {e}")
+            response = None
+        self.stats["hits" if response is not None else "misses"] += 1
+        return response
+
+    async def put(self, key: str, model: str, content: str, stats: dict, ttl: float):
+        now = self._clock()
+        response = {
+            "model": model,
+            "content": content,
+            "stats": stats,
+            "created_at": datetime.fromtimestamp(now, tz=timezone.utc),
+            "expires_at": datetime.fromtimestamp(now + ttl, tz=timezone.utc),
+        }
+        try:
+            await asyncio.wait_for(self.store.save(key, response), CACHE_L2_TIMEOUT_SECONDS)
+            self.stats["stores"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"LLM response cache write failed for {key}: {e}")
+
+    async def stream(self, payload: dict, generate, stats: dict = None, ttl: float = None):
+        """
+        Yield the response to `payload`: replayed from the cache on a hit, otherwise from
+        `generate(stats)` (an async iterator of content chunks) and stored once complete.
+        Without a `ttl` the cache is bypassed.
+        """
+        if not self.enabled or not ttl:
+            async for content in generate(stats):
+                yield content
+            return
+
+        key = fingerprint(payload)
+        cached = await self.get(key)
+        if cached is not None:
+            if stats is not None:
+                stats.update(cached.get("stats") or {})
+                stats["cached"] = True
+            for content in replay_chunks(cached["content"]):
+                yield content
+            return
+
+        generation_stats = {} if stats is None else stats
+        chunks = []
+        async for content in generate(generation_stats):
+            chunks.append(content)
+            yield content
+        # Only complete generations are stored; an interrupted stream never reaches here
+        if chunks:
+            await self.put(key, payload.get("model"), "".join(chunks), dict(generation_stats), ttl)
+
+    def status(self) -> dict:
+        return {"enabled": self.enabled, **self.stats}
+
+
+# Shared response cache for src/LLM/LLM_service.py
+llm_response_cache = ResponseCache(llm_response_store)
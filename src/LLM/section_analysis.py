@@ -0,0 +1,154 @@
+"""
+Incremental analysis: one short generation per report section, merged without a model.
+
+Each section's prompt holds only the data that section is about, so the response cache
+key (a fingerprint of the prompt) is a fingerprint of the section's inputs. On a refresh
+only sections whose inputs changed reach the model; the rest replay from the cache. When
+the news changes but prices and fundamentals do not, one of four short generations runs
+instead of the full two-stage analysis.
+"""
+
+import hashlib
+import os
+
+from dotenv import load_dotenv
+
+from src.alphaVantage.services.stock_services import fetch_all_stock_data
+from src.LLM.LLM_service import DEEPSEEK_MODEL, LLM_MODEL, stream_prompt_to_llm, stream_to_deepseek
+from src.LLM.prompt_builder import compile_prompt
+from src.LLM.response_cache import analysis_ttl
+from src.utils.validate_stock_data_utils import validate_stock_data
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Section outputs are keyed on their inputs, so they stay valid until those change
+SECTION_CACHE_TTL_SECONDS = float(os.getenv("SECTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+SECTION_TOKEN_BUDGET = int(os.getenv("SECTION_TOKEN_BUDGET", "600"))
+# Cap on generated tokens per section
+SECTION_MAX_TOKENS = int(os.getenv("SECTION_MAX_TOKENS", "350"))
+
+DISCLAIMER = "This is a preliminary Artificial Intelligence (AI) analysis. Please consult a financial advisor for investment decisions."
+
+# name: (heading, summary sections used as inputs, instructions)
+ANALYSIS_SECTIONS = {
+    "technicals": (
+        "Price & Technicals",
+        ("prices", "indicators"),
+        "Describe the recent price trend and what the moving averages say about momentum, support and resistance.",
+    ),
+    "sentiment": (
+        "Market Sentiment",
+        ("news",),
+        "Summarize the recent news, its overall sentiment and what it may mean for the stock.",
+    ),
+    "financials": (
+        "Financial Metrics",
+        ("fundamentals",),
+        "Assess revenue, margins, balance sheet strength and cash generation.",
+    ),
+    "risk": (
+        "Risk Factors",
+        ("profile", "fundamentals"),
+        "List the main risks (volatility, valuation, leverage, earnings) with a likelihood of High, Medium or Low.",
+    ),
+}
+
+
+def section_prompt(name: str, ticker: str, stock_data: dict):
+    heading, inputs, instructions = ANALYSIS_SECTIONS[name]
+    text = f"""
+    You are writing the "{heading}" section of a stock report on {ticker}.
+    {instructions}
+    Use 3 to 5 concise bullet points, stay factual, and do not give financial advice.
+    """
+    return compile_prompt(text, stock_data, SECTION_TOKEN_BUDGET, include=inputs, heading="Data:")
+
+
+def merge_sections(ticker: str, outputs: dict) -> str:
+    """
+    The report: each section under its heading, in a fixed order.
+    """
+    parts = [f"# {ticker} analysis"]
+    for name, (heading, _, _) in ANALYSIS_SECTIONS.items():
+        parts.append(f"## {heading}\n{outputs.get(name) or 'No data available.'}")
+    parts.append(DISCLAIMER)
+    return "\n\n".join(parts)
+
+
+def _model_seconds(stats: dict) -> float:
+    return ((stats.get("prompt_eval_duration") or 0) + (stats.get("eval_duration") or 0)) / 1e9
+
+
+async def stream_incremental_analysis(ticker: str, deep: bool = False):
+    """
+    Events like stream_analysis: a stage per section, its tokens, then a "section" event
+    saying whether it was regenerated or reused. With `deep`, the merged report is also
+    refined by the DeepThinking model; otherwise the merged report is the final answer.
+    """
+    yield {"event": "stage", "stage": "fetching_data", "symbol": ticker}
+    stock_data = validate_stock_data(await fetch_all_stock_data(ticker))
+
+    outputs, stats, regenerated, reused = {}, {}, [], []
+    for name in ANALYSIS_SECTIONS:
+        prompt = section_prompt(name, ticker.upper(), stock_data)
+        if not prompt.sections:
+            outputs[name] = None
+            continue
+
+        yield {"event": "stage", "stage": name, "model": LLM_MODEL}
+        stats[name] = {"prompt": prompt.report()}
+        chunks = []
+        async for content in stream_prompt_to_llm(
+            prompt.text, stats=stats[name], cache_ttl=SECTION_CACHE_TTL_SECONDS, options={"num_predict": SECTION_MAX_TOKENS}
+        ):
+            chunks.append(content)
+            yield {"event": "token", "stage": name, "content": content}
+        outputs[name] = "".join(chunks).strip()
+
+        cached = bool(stats[name].get("cached"))
+        (reused if cached else regenerated).append(name)
+        yield {
+            "event": "section",
+            "section": name,
+            "cached": cached,
+            "inputs": hashlib.sha256(prompt.text.encode()).hexdigest()[:12],
+        }
+
+    report = merge_sections(ticker.upper(), outputs)
+    deepthinking_response = report
+    if deep:
+        stats["deepthinking"] = {}
+        yield {"event": "stage", "stage": "deepthinking", "model": DEEPSEEK_MODEL}
+        chunks = []
+        async for content in stream_to_deepseek(report, stock_data, stats=stats["deepthinking"], cache_ttl=analysis_ttl(ticker)):
+            chunks.append(content)
+            yield {"event": "token", "stage": "deepthinking", "content": content}
+        deepthinking_response = "".join(chunks)
+
+    generated = [name for name, section_stats in stats.items() if not section_stats.get("cached")]
+    yield {
+        "event": "done",
+        "symbol": ticker,
+        "analysis": report,
+        "sections": outputs,
+        "llm_response": report,
+        "deepthinking_response": deepthinking_response,
+        "regenerated": regenerated,
+        "reused": reused,
+        "model_seconds": round(sum(_model_seconds(stats[name]) for name in generated), 2),
+        "saved_model_seconds": round(sum(_model_seconds(stats[name]) for name in reused), 2),
+        "stock_data": stock_data,
+        "stats": stats,
+    }
+
+
+async def incremental_analysis(ticker: str, deep: bool = False) -> dict:
+    """
+    The done event of stream_incremental_analysis, for non-streaming callers.
+    """
+    result = None
+    async for event in stream_incremental_analysis(ticker, deep):
+        if event["event"] == "done":
+            result = {key: value for key, value in event.items() if key != "event"}
+    return result
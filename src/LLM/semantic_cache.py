@@ -0,0 +1,248 @@
+"""
+Semantic cache for /ask-question.
+
+Questions are embedded with a local embedding model and compared by cosine similarity
+against a bounded in-memory index of past question/answer pairs. Only questions asked of
+the same model, with the same context and naming the same tickers and numbers, are
+compared, so "is TSLA overvalued?" never answers "is AAPL overvalued?". Entries expire
+after a TTL, and the least recently used entry is evicted when the index is full. Entries
+are persisted so the index survives restarts.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.alphaVantage.services.quote_services import LIVE_MARKET_SYMBOLS
+from src.LLM.llm_client import LLM_EMBED_URL, post
+from src.LLM.response_cache import LLM_QUESTION_CACHE_TTL_SECONDS, normalize_text
+from src.mongoDB.semantic_cache import semantic_cache_store
+from src.utils.cache import CACHE_L2_TIMEOUT_SECONDS
+from src.utils.quote_board import quote_board
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+LLM_EMBED_MODEL = os.getenv("LLM_EMBED_MODEL", "nomic-embed-text")
+# Cosine similarity a past question needs to be reused
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+# Tickers and numbers must match exactly for two questions to be compared
+ENTITY_PATTERN = re.compile(r"\b[A-Z]{1,5}\b|\d+(?:\.\d+)?%?")
+WORD_PATTERN = re.compile(r"\b[A-Za-z]{1,5}\b")
+# Tickers recognised in any case, besides every symbol on the quote board and any ticker
+# already seen written in capitals
+SEMANTIC_CACHE_SYMBOLS = {
+    symbol.strip().upper() for symbol in os.getenv("SEMANTIC_CACHE_SYMBOLS", "").split(",") if symbol.strip()
+}
+# Words that are also tickers but, written in lower case, are far more likely English
+COMMON_WORDS = {
+    "A", "I", "AN", "AND", "ARE", "AS", "AT", "BE", "BIG", "BUY", "BY", "CAN", "DO", "FOR", "GO", "GOOD", "HAS",
+    "HIGH", "IF", "IN", "IS", "IT", "KEY", "LOW", "ME", "MY", "NEW", "NO", "NOW", "OF", "ON", "ONE", "OR", "OUT",
+    "SELL", "SO", "THE", "TO", "TWO", "UP", "US", "WELL", "YOU",
+}
+_seen_symbols = set()
+
+
+def is_symbol(word: str) -> bool:
+    return word in LIVE_MARKET_SYMBOLS or word in SEMANTIC_CACHE_SYMBOLS or word in _seen_symbols or word in quote_board
+
+
+def entities(question: str):
+    found = set(ENTITY_PATTERN.findall(question)) - {"I", "A"}
+    _seen_symbols.update(entity for entity in found if entity.isalpha() and len(entity) > 1)
+    # "is tsla overvalued?" must not share a partition with "is aapl overvalued?"
+    found.update(
+        word.upper() for word in WORD_PATTERN.findall(question)
+        if word.upper() not in COMMON_WORDS and is_symbol(word.upper())
+    )
+    return sorted(found)
+
+
+def partition(question: str, context: str = None, model: str = None) -> str:
+    key = "|".join([model or "", normalize_text(context or ""), ",".join(entities(question))])
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+async def ollama_embed(text: str):
+    data = await post(LLM_EMBED_URL, {"model": LLM_EMBED_MODEL, "input": text})
+    return data["embeddings"][0]
+
+
+class SemanticCache:
+    """
+    Unit-length embeddings in a (capacity, dim) matrix; a lookup is one matrix-vector
+    product restricted to the question's partition.
+    """
+
+    def __init__(
+        self,
+        store,
+        embed=ollama_embed,
+        capacity: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = LLM_QUESTION_CACHE_TTL_SECONDS,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+        clock=time.time,
+    ):
+        self.store = store
+        self.embed = embed
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.enabled = enabled
+        self._clock = clock
+        self._vectors = None
+        self._partitions = np.full(capacity, "", dtype=object)
+        self._last_used = np.full(capacity, -np.inf)
+        self._expires = np.zeros(capacity)
+        self._entries = [None] * capacity
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "evictions": 0, "expired": 0, "embedding_errors": 0}
+
+    def __len__(self):
+        return sum(entry is not None for entry in self._entries)
+
+    async def start(self):
+        """
+        Reload the most recently used persisted entries.
+        """
+        if not self.enabled:
+            return
+        try:
+            await asyncio.wait_for(self.store.ensure_indexes(), CACHE_L2_TIMEOUT_SECONDS * 10)
+            documents = await asyncio.wait_for(self.store.load_recent(self.capacity), CACHE_L2_TIMEOUT_SECONDS * 10)
+        except Exception as e:
+            logger.warning(f"Semantic cache not loaded: {e}")
+            return
+        for document in reversed(documents):
+            self._insert(document, np.asarray(document["embedding"], dtype=float))
+        logger.info(f"Loaded {len(documents)} semantic cache entries")
+
+    async def _embed(self, question: str):
+        try:
+            vector = np.asarray(await self.embed(normalize_text(question)), dtype=float)
+        except Exception as e:
+            self.stats["embedding_errors"] += 1
+            logger.warning(f"Question embedding failed: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    async def lookup(self, question: str, context: str = None, model: str = None):
+        """
+        (entry, similarity, embedding) for the closest past question above the threshold,
+        or (None, best similarity, embedding) on a miss. The embedding is reused by add().
+        """
+        if not self.enabled:
+            return None, None, None
+        self.stats["lookups"] += 1
+        vector = await self._embed(question)
+        if vector is None or self._vectors is None or len(vector) != self._vectors.shape[1]:
+            self.stats["misses"] += 1
+            return None, None, vector
+
+        now = self._clock()
+        candidates = (self._partitions == partition(question, context, model)) & (self._expires > now)
+        if not candidates.any():
+            self.stats["misses"] += 1
+            return None, None, vector
+        scores = np.where(candidates, self._vectors @ vector, -np.inf)
+        slot = int(scores.argmax())
+        similarity = float(scores[slot])
+        if similarity < self.threshold:
+            self.stats["misses"] += 1
+            return None, similarity, vector
+
+        self.stats["hits"] += 1
+        self._last_used[slot] = now
+        entry = self._entries[slot]
+        entry["hits"] += 1
+        entry["last_used"] = now
+        return entry, similarity, vector
+
+    async def add(self, question: str, answer: str, context: str = None, model: str = None, vector=None):
+        if not self.enabled or not answer:
+            return
+        if vector is None:
+            vector = await self._embed(question)
+            if vector is None:
+                return
+        now = self._clock()
+        document = {
+            "_id": uuid.uuid4().hex,
+            "partition": partition(question, context, model),
+            "question": question,
+            "answer": answer,
+            "model": model,
+            "embedding": [float(value) for value in vector],
+            "hits": 0,
+            "last_used": now,
+            "expires_at": datetime.fromtimestamp(now + self.ttl, tz=timezone.utc),
+        }
+        evicted = self._insert(document, vector)
+        try:
+            await asyncio.wait_for(self.store.save(document), CACHE_L2_TIMEOUT_SECONDS)
+            if evicted:
+                await asyncio.wait_for(self.store.delete_many([evicted]), CACHE_L2_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Semantic cache write failed: {e}")
+
+    def _insert(self, document: dict, vector):
+        """
+        Place an entry in a free slot, else in an expired one, else over the least recently
+        used one. Returns the id of the entry it replaced, if any.
+        """
+        if self._vectors is None or self._vectors.shape[1] != len(vector):
+            # First entry, or the embedding model changed: start a new index
+            self._vectors = np.zeros((self.capacity, len(vector)))
+            self._partitions[:] = ""
+            self._last_used[:] = -np.inf
+            self._entries = [None] * self.capacity
+
+        now = self._clock()
+        # MongoDB hands back naive UTC datetimes
+        expires = document["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+        free = self._last_used == -np.inf
+        expired = ~free & (self._expires <= now)
+        if free.any():
+            slot = int(free.argmax())
+        elif expired.any():
+            slot = int(expired.argmax())
+            self.stats["expired"] += 1
+        else:
+            slot = int(self._last_used.argmin())
+            self.stats["evictions"] += 1
+
+        replaced = self._entries[slot]
+        self._vectors[slot] = vector
+        self._partitions[slot] = document["partition"]
+        self._last_used[slot] = document["last_used"]
+        self._expires[slot] = expires
+        self._entries[slot] = {key: document[key] for key in ("_id", "question", "answer", "hits", "last_used")}
+        return replaced["_id"] if replaced else None
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self),
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hit_rate": round(self.stats["hits"] / self.stats["lookups"], 4) if self.stats["lookups"] else None,
+            **self.stats,
+        }
+
+
+# Shared semantic cache for process_question_with_llm and stream_question
+semantic_cache = SemanticCache(semantic_cache_store)
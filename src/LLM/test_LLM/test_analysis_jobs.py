@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+from src.LLM.analysis_jobs import AnalysisJobs
+from src.mongoDB.analysis_jobs import MemoryAnalysisJobStore
+
+
+def fake_analysis(release=None, calls=None, fail=False):
+    async def analyze(ticker):
+        if calls is not None:
+            calls.append(ticker)
+        yield {"event": "stage", "stage": "llm", "model": "m"}
+        if release is not None:
+            await release.wait()
+        yield {"event": "token", "stage": "llm", "content": "Hi"}
+        if fail:
+            raise RuntimeError("model server down")
+        yield {"event": "done", "symbol": ticker, "llm_response": "Hi"}
+
+    return analyze
+
+
+async def wait_for_status(jobs, job_id, status):
+    for _ in range(100):
+        job = await jobs.get(job_id)
+        if job["status"] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job['status']}")
+
+
+@pytest.mark.asyncio
+async def test_submissions_for_one_ticker_coalesce_until_the_result_goes_stale(monkeypatch):
+    monkeypatch.setattr("src.LLM.analysis_jobs.analysis_ttl", lambda ticker: 60)
+    clock = [1000.0]
+    calls = []
+    jobs = AnalysisJobs(MemoryAnalysisJobStore(), fake_analysis(calls=calls), clock=lambda: clock[0])
+
+    first, created = await jobs.submit("aapl")
+    second, created_again = await jobs.submit("AAPL")
+    assert created and not created_again and second["job_id"] == first["job_id"]
+
+    done = await wait_for_status(jobs, first["job_id"], "done")
+    assert done["result"] == {"symbol": "AAPL", "llm_response": "Hi"}
+    assert done["tokens"] == {"llm": 1}
+    assert (await jobs.submit("AAPL"))[0]["job_id"] == first["job_id"]
+
+    clock[0] += 61
+    assert (await jobs.submit("AAPL"))[1] is True
+    await jobs.stop()
+    assert jobs.stats["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_workers_bound_concurrent_analyses():
+    release = asyncio.Event()
+    calls = []
+    jobs = AnalysisJobs(MemoryAnalysisJobStore(), fake_analysis(release, calls), workers=2)
+    submitted = [(await jobs.submit(ticker))[0] for ticker in ("AAPL", "MSFT", "TSLA")]
+    await asyncio.sleep(0.05)
+
+    assert calls == ["AAPL", "MSFT"]
+    assert jobs.status()["queued"] == 1
+    release.set()
+    await wait_for_status(jobs, submitted[2]["job_id"], "done")
+    await jobs.stop()
+
+
+@pytest.mark.asyncio
+async def test_subscribers_get_progress_and_failures():
+    release = asyncio.Event()
+    jobs = AnalysisJobs(MemoryAnalysisJobStore(), fake_analysis(release, fail=True))
+    job, _ = await jobs.submit("AAPL")
+
+    async def collect():
+        return [event async for event in jobs.events(job["job_id"])]
+
+    subscriber = asyncio.create_task(collect())
+    await asyncio.sleep(0.02)
+    release.set()
+    events = await subscriber
+
+    assert events[0]["event"] == "job"
+    assert [event["event"] for event in events[1:]] == ["token", "error"]
+    failed = await jobs.get(job["job_id"])
+    assert failed["status"] == "failed" and failed["error"] == "model server down"
+    await jobs.stop()
+
+
+@pytest.mark.asyncio
+async def test_jobs_survive_a_restart():
+    store = MemoryAnalysisJobStore()
+    await store.save({"_id": "queued", "ticker": "AAPL", "status": "queued", "attempts": 0, "submitted_at": 1})
+    await store.save({"_id": "orphaned", "ticker": "MSFT", "status": "running", "attempts": 1, "submitted_at": 2, "heartbeat_at": 0})
+    await store.save({"_id": "exhausted", "ticker": "TSLA", "status": "running", "attempts": 3, "submitted_at": 3, "heartbeat_at": 0})
+
+    jobs = AnalysisJobs(store, fake_analysis())
+    await jobs.start()
+    assert (await wait_for_status(jobs, "queued", "done"))["attempts"] == 1
+    assert (await wait_for_status(jobs, "orphaned", "done"))["attempts"] == 2
+    assert (await jobs.get("exhausted"))["status"] == "failed"
+    assert jobs.stats["recovered"] == 2
+    await jobs.stop()
+
+
+@pytest.mark.asyncio
+async def test_running_jobs_are_handed_back_on_a_quick_restart():
+    store = MemoryAnalysisJobStore()
+    release = asyncio.Event()
+    jobs = AnalysisJobs(store, fake_analysis(release))
+    await jobs.start()
+    job, _ = await jobs.submit("AAPL")
+    await wait_for_status(jobs, job["job_id"], "running")
+    await jobs.stop()
+
+    assert (await jobs.get(job["job_id"]))["status"] == "queued"
+    restarted = AnalysisJobs(store, fake_analysis())
+    await restarted.start()
+    done = await wait_for_status(restarted, job["job_id"], "done")
+    assert done["attempts"] == 1
+    await restarted.stop()
+
+
+@pytest.mark.asyncio
+async def test_stale_running_jobs_are_swept_and_not_coalesced(monkeypatch):
+    monkeypatch.setattr("src.LLM.analysis_jobs.ANALYSIS_JOB_SWEEP_SECONDS", 0.01)
+    clock = [1000.0]
+    store = MemoryAnalysisJobStore()
+    jobs = AnalysisJobs(store, fake_analysis(), clock=lambda: clock[0])
+    await jobs.start()
+
+    # A worker that died a moment ago: its job still looks alive
+    await store.save({"_id": "dead", "ticker": "AAPL", "status": "running", "attempts": 1, "submitted_at": 1, "heartbeat_at": 990})
+    assert (await jobs.submit("AAPL"))[0]["job_id"] == "dead"
+
+    # Once its heartbeat goes stale, submissions stop coalescing with it and the sweep retries it
+    clock[0] += 200
+    job, created = await jobs.submit("AAPL")
+    assert created and job["job_id"] != "dead"
+    assert (await wait_for_status(jobs, "dead", "done"))["attempts"] == 2
+    await jobs.stop()
+
+
+@pytest.mark.asyncio
+async def test_subscribers_see_jobs_finished_by_another_process(monkeypatch):
+    monkeypatch.setattr("src.LLM.analysis_jobs.ANALYSIS_JOB_EVENTS_POLL_SECONDS", 0.01)
+    store = MemoryAnalysisJobStore()
+    await store.save({"_id": "elsewhere", "ticker": "AAPL", "status": "running", "stage": "llm", "tokens": {"llm": 3}, "attempts": 1, "submitted_at": 1})
+    # This process has no workers; another one runs the job
+    jobs = AnalysisJobs(store, fake_analysis(), workers=0)
+
+    async def collect():
+        return [event async for event in jobs.events("elsewhere")]
+
+    subscriber = asyncio.create_task(collect())
+    await asyncio.sleep(0.05)
+    await store.update("elsewhere", {"status": "done", "result": {"symbol": "AAPL", "llm_response": "Hi"}})
+    events = await asyncio.wait_for(subscriber, 1)
+
+    assert events[0]["event"] == "job"
+    assert events[1] == {"event": "keep-alive", "status": "running", "stage": "llm", "tokens": {"llm": 3}, "job_id": "elsewhere"}
+    assert events[-1] == {"event": "done", "symbol": "AAPL", "llm_response": "Hi", "job_id": "elsewhere"}
@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.LLM import llm_client
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    A model server that holds every request open until released.
+    """
+    state = {"active": 0, "peak": 0, "release": asyncio.Event()}
+
+    async def handler(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await state["release"].wait()
+        state["active"] -= 1
+        return httpx.Response(200, text='{"done": true}\n')
+
+    monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm_client, "LLM_MAX_CONCURRENCY", 2)
+    yield state
+    llm_client._client = None
+    llm_client._endpoint_semaphores.clear()
+    llm_client._in_flight.clear()
+
+
+async def _generate(url, model):
+    async with llm_client.stream_post(url, {"model": model}) as response:
+        return await response.aread()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_per_model_endpoint(server):
+    url = "http://ollama:11434/api/chat"
+    tasks = [asyncio.create_task(_generate(url, "gemma")) for _ in range(5)]
+    tasks.append(asyncio.create_task(_generate(url, "deepseek")))
+    await asyncio.sleep(0.05)
+
+    # Two gemma generations plus the deepseek one; the other three gemma calls wait
+    assert server["active"] == 3
+    assert llm_client.llm_client_status()["in_flight"] == {"ollama:11434/gemma": 2, "ollama:11434/deepseek": 1}
+
+    server["release"].set()
+    await asyncio.gather(*tasks)
+    assert server["peak"] == 3
+    assert llm_client.llm_client_status()["in_flight"] == {}
+
+
+@pytest.mark.asyncio
+async def test_client_is_shared_until_closed():
+    await llm_client.close_llm_client()
+    client = await llm_client.start_llm_client()
+    assert llm_client.get_llm_client() is client
+    assert client.timeout.read == llm_client.LLM_READ_TIMEOUT
+    await llm_client.close_llm_client()
+    assert client.is_closed
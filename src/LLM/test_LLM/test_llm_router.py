@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.LLM import llm_client
+from src.LLM.llm_router import InferenceRouter
+
+CHAT_PATH = "/api/chat"
+GPU1, GPU2, GPU3 = "http://gpu1:11434", "http://gpu2:11434", "http://gpu3:11434"
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    """
+    Three stand-in model servers. gpu3 refuses connections; chats on the others stay
+    open until released.
+    """
+    state = {
+        "models": {"gpu1": ["gemma3:4b"], "gpu2": ["gemma3:4b", "deepseek-r1:7b"], "gpu3": ["gemma3:4b"]},
+        "down": {"gpu3"},
+        "served": [],
+        "release": asyncio.Event(),
+    }
+
+    async def handler(request):
+        host = request.url.host
+        if host in state["down"]:
+            raise httpx.ConnectError("Connection refused", request=request)
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": name} for name in state["models"][host]]})
+        state["served"].append((host, json.loads(request.content)["model"]))
+        await state["release"].wait()
+        return httpx.Response(200, text='{"done": true}\n')
+
+    monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm_client, "LLM_MAX_CONCURRENCY", 10)
+    yield state
+    llm_client._client = None
+    llm_client._endpoint_semaphores.clear()
+    llm_client._in_flight.clear()
+
+
+async def _chat(router, model):
+    async with router.stream_post(f"http://localhost:11434{CHAT_PATH}", {"model": model}) as response:
+        return await response.aread()
+
+
+@pytest.mark.asyncio
+async def test_requests_go_to_the_least_busy_server(servers):
+    router = InferenceRouter([GPU1, GPU2])
+    tasks = [asyncio.create_task(_chat(router, "gemma3:4b")) for _ in range(4)]
+    await asyncio.sleep(0.05)
+
+    assert router.servers[GPU1]["outstanding"] == router.servers[GPU2]["outstanding"] == 2
+    servers["release"].set()
+    await asyncio.gather(*tasks)
+    assert router.servers[GPU1]["outstanding"] == router.servers[GPU2]["outstanding"] == 0
+
+
+@pytest.mark.asyncio
+async def test_requests_only_go_to_servers_with_the_model(servers):
+    router = InferenceRouter([GPU1, GPU2])
+    await router.check()
+    servers["release"].set()
+
+    await asyncio.gather(*(_chat(router, "deepseek-r1:7b") for _ in range(3)))
+
+    assert servers["served"] == [("gpu2", "deepseek-r1:7b")] * 3
+    with pytest.raises(RuntimeError):
+        await _chat(router, "llama3")
+
+
+@pytest.mark.asyncio
+async def test_connection_failures_are_retried_on_another_server(servers):
+    router = InferenceRouter([GPU3, GPU1])
+    servers["release"].set()
+
+    await _chat(router, "gemma3:4b")
+
+    assert servers["served"] == [("gpu1", "gemma3:4b")]
+    assert router.stats["retries"] == 1
+    status = router.status()["servers"]
+    assert not status[GPU3]["healthy"] and status[GPU3]["failures"] == 1
+    assert status[GPU1]["healthy"]
+
+    # While cooling down, the failed server is not tried again
+    await _chat(router, "gemma3:4b")
+    assert router.stats["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_health_check_brings_servers_back(servers):
+    router = InferenceRouter([GPU3])
+    servers["release"].set()
+
+    with pytest.raises(httpx.ConnectError):
+        await _chat(router, "gemma3:4b")
+    assert not router.is_up(GPU3)
+
+    servers["down"].clear()
+    await router.check()
+    assert router.is_up(GPU3)
+    assert router.status()["servers"][GPU3]["models"] == ["gemma3:4b"]
+    await _chat(router, "gemma3:4b")
+    assert servers["served"] == [("gpu3", "gemma3:4b")]
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.LLM import llm_client, model_manager as manager_module
+from src.LLM.llm_router import InferenceRouter
+from src.LLM.model_manager import ModelManager
+
+GPU1, GPU2 = "http://gpu1:11434", "http://gpu2:11434"
+GB = 1024 ** 3
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    """
+    Two Ollama stand-ins that track which models each has loaded. gpu1 has no deepseek.
+    """
+    state = {
+        "available": {"gpu1": ["gemma:latest", "other:latest"], "gpu2": ["gemma:latest", "deepseek:latest", "other:latest"]},
+        "loaded": {"gpu1": {}, "gpu2": {}},
+        "requests": [],
+        "sizes": {"gemma": 4 * GB, "deepseek": 6 * GB, "other": 2 * GB},
+    }
+
+    def handler(request):
+        host = request.url.host
+        if request.url.path == "/api/tags":
+            return httpx.Response(200, json={"models": [{"name": name} for name in state["available"][host]]})
+        if request.url.path == "/api/ps":
+            models = [{"name": f"{name}:latest", "size": state["sizes"][name], "expires_at": expiry} for name, expiry in state["loaded"][host].items()]
+            return httpx.Response(200, json={"models": models})
+        body = json.loads(request.content)
+        state["requests"].append((host, body))
+        model = body["model"].removesuffix(":latest")
+        if body["keep_alive"] == 0:
+            state["loaded"][host].pop(model, None)
+        else:
+            state["loaded"][host][model] = body["keep_alive"]
+        return httpx.Response(200, json={"model": body["model"], "done": True})
+
+    monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    yield state
+    llm_client._client = None
+    llm_client._endpoint_semaphores.clear()
+    llm_client._in_flight.clear()
+
+
+@pytest.mark.asyncio
+async def test_models_are_preloaded_on_every_server_that_has_them(servers):
+    manager = ModelManager(InferenceRouter([GPU1, GPU2]), check_seconds=3600)
+    await manager.start(["gemma", "deepseek"])
+    await asyncio.sleep(0.05)
+    await manager.refresh()
+
+    assert set(servers["loaded"]["gpu1"]) == {"gemma"}
+    assert set(servers["loaded"]["gpu2"]) == {"gemma", "deepseek"}
+    assert all(body["keep_alive"] == manager_module.LLM_KEEP_ALIVE_HOT_SECONDS for _, body in servers["requests"])
+    status = manager.status()
+    assert status["preloads"] == 3
+    assert list(status["models"]["deepseek"]["servers"]) == [GPU2]
+    assert status["models"]["gemma"]["servers"][GPU1]["size_mb"] == 4096
+    await manager.stop()
+
+
+def test_keep_alive_follows_traffic(monkeypatch):
+    monkeypatch.setattr(manager_module, "LLM_HOT_REQUESTS", 3)
+    clock = Clock()
+    manager = ModelManager(InferenceRouter([GPU1]), preload=False, clock=clock)
+
+    keep_alives = [manager.keep_alive("gemma") for _ in range(3)]
+    assert keep_alives[0] == manager_module.LLM_KEEP_ALIVE_COLD_SECONDS
+    assert keep_alives[2] == manager_module.LLM_KEEP_ALIVE_HOT_SECONDS
+
+    # Once the traffic window passes the model cools down again
+    clock.now += manager_module.LLM_TRAFFIC_WINDOW_SECONDS + 1
+    assert not manager.is_hot("gemma")
+    assert manager.keep_alive("gemma") == manager_module.LLM_KEEP_ALIVE_COLD_SECONDS
+
+
+def test_cold_starts_are_counted_from_load_time():
+    manager = ModelManager(InferenceRouter([GPU1]), preload=False)
+    manager.observe("gemma", {"load_duration": 8_000_000_000})
+    manager.observe("gemma", {"load_duration": 20_000_000})
+    manager.observe("gemma", {"cached": True})
+    assert manager.stats["cold_starts"] == 1
+    assert manager.stats["warm_starts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cold_models_are_unloaded_under_memory_pressure(servers, monkeypatch):
+    monkeypatch.setattr(manager_module, "LLM_HOT_REQUESTS", 2)
+    clock = Clock()
+    router = InferenceRouter([GPU2])
+    manager = ModelManager(router, preload=False, memory_budget_mb=8 * 1024, clock=clock)
+    servers["loaded"]["gpu2"] = {"gemma": 300, "deepseek": 300, "other": 300}
+
+    # gemma is hot; deepseek was used once, long ago; "other" was never used by us
+    manager.keep_alive("deepseek")
+    clock.now += 60
+    manager.keep_alive("gemma")
+    manager.keep_alive("gemma")
+
+    await manager.rebalance()
+
+    # 12GB resident against an 8GB budget: the coldest models go, the hot one stays
+    assert set(servers["loaded"]["gpu2"]) == {"gemma"}
+    assert manager.stats["unloads"] == 2
+
+
+@pytest.mark.asyncio
+async def test_busy_models_are_not_unloaded(servers):
+    clock = Clock()
+    manager = ModelManager(InferenceRouter([GPU2]), preload=False, memory_budget_mb=1024, clock=clock)
+    servers["loaded"]["gpu2"] = {"deepseek": 300}
+    manager.keep_alive("deepseek")
+    # A generation the router sent to gpu2 is still running
+    llm_client._in_flight[llm_client._endpoint(f"{GPU2}/api/chat", "deepseek")] = 1
+
+    await manager.rebalance()
+
+    assert set(servers["loaded"]["gpu2"]) == {"deepseek"}
+    assert manager.stats["unloads"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hot_models_dropped_by_any_server_are_reloaded(servers, monkeypatch):
+    monkeypatch.setattr(manager_module, "LLM_HOT_REQUESTS", 1)
+    router = InferenceRouter([GPU1, GPU2])
+    await router.check()
+    manager = ModelManager(router, preload=False)
+    servers["loaded"]["gpu2"] = {"gemma": 300}
+    manager.keep_alive("gemma")
+
+    await manager.rebalance()
+
+    assert "gemma" in servers["loaded"]["gpu1"]
+    assert manager.stats["reloads"] == 1
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from src.LLM.prompt_builder import compile_prompt, count_tokens, fmt, summarize
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "Ouput_json", "aapl_data.json")
+
+
+@pytest.fixture
+def stock_data():
+    with open(SAMPLE) as f:
+        return json.load(f)["stock_data"]
+
+
+def test_numbers_are_shortened():
+    assert fmt(391035000000) == "391B"
+    assert fmt(213.49) == "213.49"
+    assert fmt(1.259) == "1.259"
+
+
+def test_summary_is_typed_and_drops_missing_fields(stock_data):
+    stock_data["metadata"]["beta"] = "None"
+    text = "\n".join(variant for section in summarize(stock_data) for variant in section.variants[:1] if variant)
+
+    assert "market cap 3.05T" in text
+    assert "gross margin 46.2%" in text
+    assert "About: Apple Inc. is an American multinational technology company" in text
+    assert "beta" not in text
+    assert "N/A" not in text and "None" not in text and "_id" not in text
+    assert "https://" not in text
+
+
+def test_prompt_fits_its_budget_and_reports_compression(stock_data):
+    prompt = compile_prompt("Analyse this stock.", stock_data, budget=2000)
+    report = prompt.report()
+    assert report["tokens"] == count_tokens(prompt.text) <= 2000
+    assert report["compression"] > 4
+    assert set(report["sections"].values()) == {"full"}
+
+
+def test_least_important_sections_are_cut_first(stock_data):
+    full = compile_prompt("Analyse this stock.", stock_data, budget=2000)
+    tight = compile_prompt("Analyse this stock.", stock_data, budget=full.tokens - 150)
+
+    assert tight.tokens <= tight.budget
+    assert tight.sections["news"] != "full"
+    assert tight.sections["profile"] == tight.sections["prices"] == "full"
+
+    # Even an impossible budget keeps the core sections and says it is over
+    minimal = compile_prompt("Analyse this stock.", stock_data, budget=50)
+    assert minimal.over_budget
+    assert minimal.sections["news"] == minimal.sections["fundamentals"] == "dropped"
+    assert "Prices: last close 215.24" in minimal.text
+
+
+def test_reserved_tokens_count_against_the_budget(stock_data):
+    prompt = compile_prompt("Refine this analysis.", stock_data, budget=1500, reserved_tokens=1000)
+    assert prompt.tokens <= 1500
+    assert prompt.sections["news"] != "full"
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.LLM.response_cache import ResponseCache, analysis_ttl, fingerprint, replay_chunks
+from src.mongoDB.llm_responses import MemoryLLMResponseStore
+
+
+def chat(content, **fields):
+    return {"model": "gemma3:4b", "messages": [{"role": "user", "content": content}], **fields}
+
+
+def test_fingerprint_ignores_whitespace_and_stream_flag():
+    assert fingerprint(chat("What is\n  AAPL?")) == fingerprint(chat(" What is AAPL? ", stream=True))
+    assert fingerprint(chat("What is AAPL?")) != fingerprint(chat("What is MSFT?"))
+    assert fingerprint(chat("What is AAPL?")) != fingerprint(chat("What is AAPL?", model="deepseek-r1:7b"))
+    assert fingerprint(chat("What is AAPL?")) != fingerprint(chat("What is AAPL?", options={"temperature": 0}))
+
+
+def test_replay_chunks_reassemble_the_answer():
+    text = "Revenue grew  12%\nin Q3.\n\n- Risk: high"
+    assert "".join(replay_chunks(text)) == text
+    assert replay_chunks(text)[-3:] == ["- ", "Risk: ", "high"]
+
+
+def test_analysis_ttl_lasts_until_the_next_refresh():
+    # Saturday: news refreshes hourly off-hours, prices not before Monday's close
+    saturday = datetime(2025, 3, 8, 15, 0, tzinfo=timezone.utc)
+    assert analysis_ttl("AAPL", saturday) == 3600
+
+
+@pytest.mark.asyncio
+async def test_stream_replays_stored_generations():
+    cache = ResponseCache(MemoryLLMResponseStore())
+    calls = []
+
+    async def generate(stats):
+        calls.append(1)
+        yield "fresh "
+        yield "answer"
+        stats["eval_count"] = 2
+
+    async def collect(ttl):
+        return [content async for content in cache.stream(chat("q"), generate, {}, ttl)]
+
+    assert await collect(None) == ["fresh ", "answer"]
+    assert cache.stats["misses"] == 0  # no ttl: the cache is bypassed
+
+    assert await collect(60) == ["fresh ", "answer"]
+    assert await collect(60) == ["fresh ", "answer"]
+    assert len(calls) == 2
+    assert cache.stats == {"hits": 1, "misses": 1, "stores": 1, "errors": 0}
+
+
+@pytest.mark.asyncio
+async def test_store_failures_fall_back_to_generating():
+    class BrokenStore(MemoryLLMResponseStore):
+        async def load(self, key):
+            raise ConnectionError("mongo down")
+
+    cache = ResponseCache(BrokenStore())
+
+    async def generate(stats):
+        yield "live"
+
+    assert [c async for c in cache.stream(chat("q"), generate, None, 60)] == ["live"]
+    assert cache.stats["errors"] == 1
@@ -0,0 +1,83 @@
+import json
+import os
+import httpx
+import pytest
+
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "demo")
+
+from src.LLM import LLM_service, llm_client, section_analysis
+from src.LLM.response_cache import ResponseCache
+from src.LLM.section_analysis import ANALYSIS_SECTIONS, incremental_analysis
+from src.mongoDB.llm_responses import MemoryLLMResponseStore
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "..", "Ouput_json", "aapl_data.json")
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """
+    Route LLM calls to an in-process Ollama stand-in that reports model time.
+    """
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        lines = [
+            json.dumps({"message": {"content": "- point"}, "done": False}),
+            json.dumps({"message": {"content": ""}, "done": True, "eval_count": 1, "eval_duration": 2_000_000_000}),
+        ]
+        return httpx.Response(200, text="\n".join(lines) + "\n")
+
+    monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(LLM_service, "llm_response_cache", ResponseCache(MemoryLLMResponseStore()))
+    yield requests
+    llm_client._client = None
+
+
+@pytest.fixture
+def stock_data(monkeypatch):
+    with open(SAMPLE) as f:
+        data = json.load(f)["stock_data"]
+
+    async def fake_bundle(ticker):
+        return data
+
+    monkeypatch.setattr(section_analysis, "fetch_all_stock_data", fake_bundle)
+    monkeypatch.setattr(section_analysis, "validate_stock_data", lambda data: data)
+    return data
+
+
+@pytest.mark.asyncio
+async def test_only_sections_whose_inputs_changed_are_regenerated(ollama, stock_data):
+    first = await incremental_analysis("AAPL")
+    assert first["regenerated"] == list(ANALYSIS_SECTIONS)
+    assert len(ollama) == len(ANALYSIS_SECTIONS)
+    assert all(request["options"]["num_predict"] == section_analysis.SECTION_MAX_TOKENS for request in ollama)
+    assert "## Market Sentiment\n- point" in first["analysis"]
+    assert first["deepthinking_response"] == first["analysis"]
+
+    stock_data["news"] = [{"title": "Apple unveils a new product line", "summary": "Shares rose.", "overall_sentiment_label": "Bullish"}]
+    second = await incremental_analysis("AAPL")
+
+    assert second["regenerated"] == ["sentiment"]
+    assert second["reused"] == ["technicals", "financials", "risk"]
+    assert len(ollama) == len(ANALYSIS_SECTIONS) + 1
+    assert "Apple unveils" in ollama[-1]["messages"][0]["content"]
+    assert second["model_seconds"] == 2.0
+    assert second["saved_model_seconds"] == 6.0
+
+
+@pytest.mark.asyncio
+async def test_incremental_route_runs_the_deepthinking_stage_on_request(ollama, stock_data):
+    from src.alphaVantage.routes import stock_routes
+
+    single = await stock_routes.analyze_all_stock_data("AAPL", stream=None, mode="incremental", deep=False)
+    assert "deepthinking" not in single["stats"]
+    assert len(ollama) == len(ANALYSIS_SECTIONS)
+
+    deep = await stock_routes.analyze_all_stock_data("AAPL", stream=None, mode="incremental", deep=True)
+    # Every section is reused; only the DeepThinking model runs
+    assert deep["reused"] == list(ANALYSIS_SECTIONS)
+    assert len(ollama) == len(ANALYSIS_SECTIONS) + 1
+    assert ollama[-1]["model"] == LLM_service.DEEPSEEK_MODEL
+    assert deep["deepthinking_response"] == "- point"
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from src.LLM import LLM_service
+from src.LLM.semantic_cache import SemanticCache, entities, partition
+from src.mongoDB.semantic_cache import MemorySemanticCacheStore
+
+# Stand-in embedding model: paraphrases share a direction
+VECTORS = {
+    "is TSLA overvalued?": [1.0, 0.0, 0.0],
+    "TSLA valuation?": [0.98, 0.2, 0.0],
+    "is AAPL overvalued?": [1.0, 0.0, 0.0],
+    "TSLA dividend?": [0.0, 1.0, 0.0],
+}
+
+
+async def fake_embed(text):
+    return VECTORS[text]
+
+
+def make_cache(**kwargs):
+    return SemanticCache(MemorySemanticCacheStore(), embed=fake_embed, **kwargs)
+
+
+def test_questions_about_different_tickers_never_share_a_partition():
+    assert entities("is TSLA up 5% since 2024?") == ["2024", "5%", "TSLA"]
+    assert partition("is TSLA overvalued?") == partition("TSLA valuation?")
+    assert partition("is TSLA overvalued?") != partition("is AAPL overvalued?")
+    assert partition("TSLA valuation?", context="a") != partition("TSLA valuation?", context="b")
+
+
+def test_lowercase_tickers_are_recognised():
+    assert partition("is tsla overvalued?") != partition("is aapl overvalued?")
+    assert partition("is tsla overvalued?") == partition("is TSLA overvalued?")
+    assert entities("is it a good time to buy nvda?") == ["NVDA"]
+    # A ticker once seen in capitals is recognised in lower case afterwards
+    entities("what does ZZQX do?")
+    assert entities("should i buy zzqx?") == ["ZZQX"]
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_hits_and_unrelated_question_misses():
+    cache = make_cache(threshold=0.9)
+    await cache.add("is TSLA overvalued?", "Maybe.")
+
+    entry, similarity, _ = await cache.lookup("TSLA valuation?")
+    assert entry["answer"] == "Maybe." and similarity > 0.9
+    assert (await cache.lookup("is AAPL overvalued?"))[0] is None
+    assert (await cache.lookup("TSLA dividend?"))[0] is None
+    assert cache.status()["hit_rate"] == round(1 / 3, 4)
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted_when_full():
+    clock = [time.time()]
+    cache = make_cache(capacity=2, clock=lambda: clock[0])
+    await cache.add("is TSLA overvalued?", "valuation answer")
+    clock[0] += 1
+    await cache.add("TSLA dividend?", "dividend answer")
+    clock[0] += 1
+    await cache.lookup("is TSLA overvalued?")  # touch the older entry
+    clock[0] += 1
+    await cache.add("is AAPL overvalued?", "apple answer")
+
+    assert len(cache) == 2 and cache.stats["evictions"] == 1
+    assert (await cache.lookup("TSLA dividend?"))[0] is None
+    assert (await cache.lookup("is TSLA overvalued?"))[0]["answer"] == "valuation answer"
+    # The evicted entry is gone from the store too, so a restart does not bring it back
+    restarted = SemanticCache(cache.store, embed=fake_embed, capacity=2)
+    await restarted.start()
+    assert sorted(entry["question"] for entry in restarted._entries) == ["is AAPL overvalued?", "is TSLA overvalued?"]
+
+
+@pytest.mark.asyncio
+async def test_stream_question_serves_paraphrases_without_the_model(monkeypatch):
+    calls = []
+
+    async def fake_llm(prompt, model=LLM_service.LLM_MODEL, stats=None, cache_ttl=None):
+        calls.append(prompt)
+        yield "Probably "
+        yield "yes."
+
+    monkeypatch.setattr(LLM_service, "semantic_cache", make_cache())
+    monkeypatch.setattr(LLM_service, "stream_prompt_to_llm", fake_llm)
+
+    await LLM_service.process_question_with_llm("is TSLA overvalued?")
+    events = [event async for event in LLM_service.stream_question("TSLA valuation?")]
+
+    assert len(calls) == 1
+    assert events[-1]["answer"] == "Probably yes."
+    assert events[-1]["stats"]["matched_question"] == "is TSLA overvalued?"
@@ -0,0 +1,93 @@
+import json
+import os
+import httpx
+import pytest
+
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "demo")
+
+from src.LLM import LLM_service, llm_client
+from src.LLM.response_cache import ResponseCache
+from src.LLM.semantic_cache import SemanticCache
+from src.mongoDB.llm_responses import MemoryLLMResponseStore
+from src.mongoDB.semantic_cache import MemorySemanticCacheStore
+
+
+def ollama_stream(*chunks):
+    lines = [json.dumps({"message": {"content": chunk}, "done": False}) for chunk in chunks]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True, "eval_count": len(chunks)}))
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    """
+    Route LLM calls to an in-process Ollama stand-in.
+    """
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, text=ollama_stream("Hel", "lo"))
+
+    monkeypatch.setattr(llm_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(LLM_service, "llm_response_cache", ResponseCache(MemoryLLMResponseStore()))
+    monkeypatch.setattr(LLM_service, "semantic_cache", SemanticCache(MemorySemanticCacheStore(), enabled=False))
+    yield requests
+    llm_client._client = None
+
+
+@pytest.mark.asyncio
+async def test_question_stream_forwards_tokens_then_done(ollama):
+    events = [event async for event in LLM_service.stream_question("Why?", "context")]
+    assert events[0] == {"event": "stage", "stage": "llm", "model": LLM_service.LLM_MODEL}
+    assert [event["content"] for event in events if event["event"] == "token"] == ["Hel", "lo"]
+    assert events[-1] == {"event": "done", "answer": "Hello", "stats": {"eval_count": 2}}
+    assert "Question: Why?" in ollama[0]["messages"][0]["content"]
+
+
+@pytest.mark.asyncio
+async def test_analysis_stream_marks_both_stages(ollama, monkeypatch):
+    async def fake_bundle(ticker):
+        return {"metadata": {"ticker": ticker}}
+
+    monkeypatch.setattr(LLM_service, "fetch_all_stock_data", fake_bundle)
+    monkeypatch.setattr(LLM_service, "validate_stock_data", lambda data: data)
+    events = [event async for event in LLM_service.stream_analysis("AAPL")]
+
+    stages = [event["stage"] for event in events if event["event"] == "stage"]
+    assert stages == ["fetching_data", "llm", "deepthinking"]
+    done = events[-1]
+    assert done["llm_response"] == "Hello"
+    assert done["deepthinking_response"] == "Hello"
+    # The second model receives the first model's full answer
+    assert ollama[1]["messages"][-1]["content"] == "Hello"
+
+
+def test_ask_question_route_streams_ndjson(ollama):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.alphaVantage.routes import stock_routes
+
+    app = FastAPI()
+    app.include_router(stock_routes.router)
+    client = TestClient(app)
+
+    response = client.post("/ask-question?stream=ndjson", json={"question": "Why?"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1]["answer"] == "Hello"
+
+    response = client.post("/ask-question?stream=sse", json={"question": "Why?"})
+    assert response.text.startswith("event: stage\ndata: ")
+    assert client.post("/ask-question?stream=xml", json={"question": "Why?"}).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_replayed_from_the_cache(ollama):
+    first = [event async for event in LLM_service.stream_question("Why?")]
+    second = [event async for event in LLM_service.stream_question("  Why?  ")]
+
+    assert len(ollama) == 1
+    assert "".join(event["content"] for event in second if event["event"] == "token") == "Hello"
+    assert second[-1]["answer"] == first[-1]["answer"] == "Hello"
+    assert second[-1]["stats"] == {"eval_count": 2, "cached": True}
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
 from src.alphaVantage.services.stock_services import (
     fetch_stock_metadata,
     fetch_historical_data,
@@ -10,12 +13,28 @@ from src.alphaVantage.services.stock_services import (
     fetch_earnings,
     fetch_SMA,
     fetch_EMA,
+    fetch_indicator,
     fetch_live_market_prices,
     fetch_all_stock_data,
-    fetch_top_gainers_losers
+    fetch_top_gainers_losers,
+    price_hub
 )
-from src.LLM.LLM_service import fetch_and_analyze_all_stock_data, process_question_with_llm
+from src.alphaVantage.services.batch_indicator_services import DEFAULT_BATCH_INDICATORS, run_batch_indicators
+from src.LLM.analysis_jobs import analysis_jobs
+from src.LLM.llm_client import llm_client_status
+from src.LLM.llm_router import llm_router
+from src.LLM.model_manager import model_manager
+from src.LLM.response_cache import llm_response_cache
+from src.LLM.semantic_cache import semantic_cache
+from src.LLM.LLM_service import fetch_and_analyze_all_stock_data, process_question_with_llm, stream_analysis, stream_question
+from src.LLM.section_analysis import incremental_analysis, stream_incremental_analysis
+from src.utils.streaming_utils import STREAM_MEDIA_TYPES, to_ndjson, to_sse
 from src.mongoDB.database import database
+from src.utils.rate_limiter import governor
+from src.utils.single_flight import upstream_flight
+from src.utils.cache import cache
+from src.utils.rolling_indicators import indicator_states
+from src.utils.quote_board import quote_board
 from pydantic import BaseModel
 from src.alphaVantage.test.mock_live_news import mock_news_data
 
@@ -26,15 +45,57 @@ class QuestionRequest(BaseModel):
     question: str
     context: str = 'You are a stock market enthusiast'  # Optional context (e.g., stock analysis)
 
+# Request model for batch indicator runs (screens and nightly jobs)
+class BatchIndicatorRequest(BaseModel):
+    tickers: list[str]
+    interval: str = 'daily'
+    indicators: list[str] = list(DEFAULT_BATCH_INDICATORS)  # e.g. SMA_50, EMA_20, RSI_14
+
+def _event_stream(events, stream: str):
+    """
+    Stream service events as NDJSON or SSE. Failures after the response has started are
+    reported as a final error event, since the status code has already been sent.
+    """
+    if stream not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported stream format {stream}. Choose from {', '.join(STREAM_MEDIA_TYPES)}.")
+
+    async def guarded():
+        try:
+            async for event in events:
+                yield event
+        except Exception as e:
+            yield {"event": "error", "detail": str(e)}
+
+    formatter = to_ndjson if stream == "ndjson" else to_sse
+    return StreamingResponse(
+        formatter(guarded()),
+        media_type=STREAM_MEDIA_TYPES[stream],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Main Endpoint
 @router.get("/analyze_all/{ticker}")
-async def analyze_all_stock_data(ticker: str):
+async def analyze_all_stock_data(
+    ticker: str,
+    stream: str = Query(None, description="ndjson or sse to receive tokens as they are generated"),
+    mode: str = Query("full", description="full, or incremental to only regenerate report sections whose data changed"),
+    deep: bool = Query(False, description="incremental mode only: also refine the merged report with the DeepThinking model"),
+):
     """
     Endpoint to fetch all stock data, analyze it (stage 1), send it to the LLM to analyze (stage 2)
+    Incremental mode runs only the first model unless `deep` is set; the full analysis always runs both.
     """
+    if mode not in ("full", "incremental"):
+        raise HTTPException(status_code=400, detail=f"Unsupported mode {mode}. Choose from full, incremental.")
+    if stream:
+        events = stream_incremental_analysis(ticker, deep) if mode == "incremental" else stream_analysis(ticker)
+        return _event_stream(events, stream)
     try:
         # Call the service function to fetch, analyze, and send data to the LLM
-        result = await fetch_and_analyze_all_stock_data(ticker)
+        if mode == "incremental":
+            result = await incremental_analysis(ticker, deep)
+        else:
+            result = await fetch_and_analyze_all_stock_data(ticker)
 
         # Return the result
         return result
@@ -43,6 +104,32 @@ async def analyze_all_stock_data(ticker: str):
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/analysis-jobs/{ticker}", status_code=202)
+async def submit_analysis_job(ticker: str):
+    """
+    Queue a background analysis of the ticker and return its job at once. A ticker with a
+    job in progress, or a finished one whose data is still fresh, returns that job.
+    """
+    job, created = await analysis_jobs.submit(ticker)
+    return {**job, "created": created}
+
+@router.get("/analysis-jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    job = await analysis_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Analysis job {job_id} not found")
+    return job
+
+@router.get("/analysis-jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str, stream: str = Query("sse", description="ndjson or sse")):
+    """
+    The job's current state, then its stage, token and done/error events as they happen,
+    with keep-alive events (the stored progress) while there is nothing else to send.
+    """
+    if await analysis_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Analysis job {job_id} not found")
+    return _event_stream(analysis_jobs.events(job_id), stream)
+
 @router.get("/metadata/{ticker}")
 async def get_stock_metadata(ticker: str):
     return await fetch_stock_metadata(ticker)
@@ -95,26 +182,121 @@ async def get_live_market_prices():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Seconds between SSE keep-alive comments, so proxies keep idle streams open
+SSE_HEARTBEAT_SECONDS = 15
+
+def _symbol_filter(symbols: str = None):
+    return [symbol for symbol in symbols.split(",") if symbol.strip()] if symbols else None
+
+@router.get("/stream/live-market-prices")
+async def stream_live_market_prices(symbols: str = Query(None, description="Comma separated symbols, default all")):
+    """
+    Server-Sent Events: a snapshot on connect, then only the prices that changed
+    """
+    async def events():
+        # Read the subscription queue directly: a cancelled get is safe to abandon on
+        # disconnect, unlike a pending step of an async generator
+        subscription = price_hub.subscribe(_symbol_filter(symbols))
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {message['type']}\ndata: {json.dumps(message['prices'])}\n\n"
+        finally:
+            price_hub.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.websocket("/ws/live-market-prices")
+async def websocket_live_market_prices(websocket: WebSocket):
+    """
+    WebSocket: same messages as the SSE stream as JSON ({"type", "prices"}).
+    Clients can send {"symbols": [...]} at any time to change their selection.
+    """
+    await websocket.accept()
+    subscription = price_hub.subscribe(_symbol_filter(websocket.query_params.get("symbols")))
+
+    async def receive_filters():
+        while True:
+            request = await websocket.receive_json()
+            price_hub.resubscribe(subscription, request.get("symbols"))
+
+    receiver = asyncio.create_task(receive_filters())
+    try:
+        while not receiver.done():
+            getter = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await websocket.send_json(getter.result())
+            else:
+                getter.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        if receiver.done() and not receiver.cancelled():
+            receiver.exception()  # A disconnect surfaces here; nothing to report
+        price_hub.unsubscribe(subscription)
+
 # Financial Indicator
 @router.get("/sma/{ticker}")
-async def get_SMA(ticker: str):
-    return await fetch_SMA(ticker)
+async def get_SMA(
+    ticker: str,
+    interval: str = Query("weekly", description="daily or weekly"),
+    time_period: int = Query(60, description="Number of bars in each window"),
+    series_type: str = Query("close", description="open, high, low or close"),
+    limit: int = Query(12, description="Number of most recent values to return"),
+):
+    return await fetch_SMA(ticker, interval, time_period, series_type, limit)
 
 # Financial Indicator
 @router.get("/ema/{ticker}")
-async def get_EMA(ticker: str):
-    return await fetch_EMA(ticker)
+async def get_EMA(
+    ticker: str,
+    interval: str = Query("weekly", description="daily or weekly"),
+    time_period: int = Query(60, description="Number of bars in each window"),
+    series_type: str = Query("close", description="open, high, low or close"),
+    limit: int = Query(12, description="Number of most recent values to return"),
+):
+    return await fetch_EMA(ticker, interval, time_period, series_type, limit)
+
+# Financial Indicator (SMA, EMA, RSI, MACD, BBANDS, ATR), computed from stored price history
+@router.get("/indicators/{ticker}/{indicator}")
+async def get_indicator(
+    ticker: str,
+    indicator: str,
+    interval: str = Query("weekly", description="daily or weekly"),
+    time_period: int = Query(14, description="Number of bars in each window"),
+    series_type: str = Query("close", description="open, high, low or close"),
+    limit: int = Query(12, description="Number of most recent values to return"),
+):
+    return await fetch_indicator(ticker, indicator, interval, time_period, series_type, limit)
+
+# Indicators for many tickers at once, from stored price history
+@router.post("/indicators/batch")
+async def post_batch_indicators(request: BatchIndicatorRequest):
+    return await run_batch_indicators(request.tickers, request.interval, request.indicators)
 
 @router.get("/all-stock-data/{ticker}")
 async def get_all_stock_data(ticker: str):
     return await fetch_all_stock_data(ticker)
 
 @router.get("/top-gainers-losers")
-async def get_top_gainers_losers(limit: int = Query(5, description="Number of gainers and losers to return")):
-    return await fetch_top_gainers_losers(limit)
+async def get_top_gainers_losers(
+    limit: int = Query(5, description="Number of gainers and losers to return"),
+    sector: str = Query(None, description="Only symbols in this sector, e.g. TECHNOLOGY"),
+    min_market_cap: float = Query(None, description="Minimum market capitalization"),
+    max_market_cap: float = Query(None, description="Maximum market capitalization"),
+):
+    return await fetch_top_gainers_losers(limit, sector, min_market_cap, max_market_cap)
 
 @router.post("/ask-question")
-async def post_process_question_with_llm(request: QuestionRequest):
+async def post_process_question_with_llm(request: QuestionRequest, stream: str = Query(None, description="ndjson or sse to receive tokens as they are generated")):
+    if stream:
+        return _event_stream(stream_question(request.question, request.context), stream)
     try:
         # Call the LLM service
         llm_response = await process_question_with_llm(request.question, request.context)
@@ -124,6 +306,27 @@ async def post_process_question_with_llm(request: QuestionRequest):
         print(f"Error in post_process_question_with_llm: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
+@router.get("/upstream-status")
+async def get_upstream_status():
+    """
+    Alpha Vantage quota usage, how many upstream calls were coalesced, cache effectiveness
+    and model server load
+    """
+    return {
+        "quota": governor.status(),
+        "coalescing": upstream_flight.status(),
+        "cache": cache.status(),
+        "indicator_states": indicator_states.status(),
+        "quote_board": quote_board.status(),
+        "price_hub": price_hub.status(),
+        "llm": llm_client_status(),
+        "llm_cache": llm_response_cache.status(),
+        "semantic_cache": semantic_cache.status(),
+        "analysis_jobs": analysis_jobs.status(),
+        "models": model_manager.status(),
+        "llm_servers": llm_router.status(),
+    }
+
 @router.get("/status")
 async def check_db_status():
     try:
@@ -0,0 +1,62 @@
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from src.alphaVantage.services.historical_sync import SERIES
+from src.mongoDB.indicator_snapshots import indicator_snapshot_store
+from src.mongoDB.price_bars import price_bar_store
+from src.utils import batch_indicators
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Tickers per matrix; bounds memory for universe-wide runs
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+DEFAULT_BATCH_INDICATORS = ("SMA_50", "EMA_20", "RSI_14")
+
+
+async def run_batch_indicators(tickers, interval: str = "daily", specs=DEFAULT_BATCH_INDICATORS, bars=None, snapshots=None):
+    """
+    Compute indicators for many tickers from the stored price bars (kept up to date by
+    fetch_historical_data / historical_sync) and write each ticker's latest values back in bulk.
+
+    Nothing is fetched upstream: tickers without stored bars are reported as missing.
+    """
+    bars = bars or price_bar_store
+    snapshots = snapshots or indicator_snapshot_store
+    if interval not in SERIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval {interval}. Choose from {', '.join(SERIES)}.")
+    try:
+        specs = [f"{name}_{period}" for name, period in map(batch_indicators.parse_spec, specs)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    started = time.perf_counter()
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+    snapshot = {}
+    written = 0
+    for offset in range(0, len(tickers), BATCH_CHUNK_SIZE):
+        chunk = tickers[offset:offset + BATCH_CHUNK_SIZE]
+        series = await bars.bars_for_tickers(chunk, interval)
+        dates, columns, matrix = batch_indicators.align(series)
+        results = batch_indicators.compute(matrix, specs)
+        values = batch_indicators.latest_values(dates, columns, matrix, results)
+        written += await snapshots.save_many(interval, values)
+        snapshot.update(values)
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Computed {', '.join(specs)} for {len(snapshot)}/{len(tickers)} tickers in {elapsed_ms} ms")
+    return {
+        "interval": interval,
+        "indicators": specs,
+        "computed": len(snapshot),
+        "written": written,
+        "missing": [ticker for ticker in tickers if ticker not in snapshot],
+        "elapsed_ms": elapsed_ms,
+        "values": snapshot,
+    }
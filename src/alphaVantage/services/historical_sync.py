@@ -0,0 +1,173 @@
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from itertools import takewhile
+
+from dotenv import load_dotenv
+
+from src.alphaVantage.services.segmented_services.helpers import make_request
+from src.mongoDB.price_bars import price_bar_store
+from src.utils.market_calendar import exchange_for, is_trading_day
+from src.utils.rate_limiter import PRIORITY_USER
+
+# Load environment variables from .env file
+load_dotenv()
+
+API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
+
+logger = logging.getLogger(__name__)
+
+# Upstream series per interval. Only endpoints that accept outputsize=compact get a
+# compact incremental mode; the others always return full history.
+SERIES = {
+    "daily": {
+        "function": "TIME_SERIES_DAILY",
+        "key": "Time Series (Daily)",
+        "compact_bars": 100,
+        "check_field": "close",
+    },
+    "weekly": {
+        "function": "TIME_SERIES_WEEKLY_ADJUSTED",
+        "key": "Weekly Adjusted Time Series",
+        "compact_bars": None,
+        "check_field": "adjusted_close",
+    },
+}
+
+# Alpha Vantage field names, in order, for each interval
+FIELDS = {
+    "daily": (("open", "1. open"), ("high", "2. high"), ("low", "3. low"), ("close", "4. close"), ("volume", "5. volume")),
+    "weekly": (
+        ("open", "1. open"), ("high", "2. high"), ("low", "3. low"), ("close", "4. close"),
+        ("adjusted_close", "5. adjusted close"), ("volume", "6. volume"), ("dividend_amount", "7. dividend amount"),
+    ),
+}
+
+
+def parse_bars(interval: str, series: dict, since: str = None):
+    """
+    Convert an Alpha Vantage time series into numeric bars, newest first.
+    Upstream series are ordered newest first, so with `since` parsing stops at the first
+    older bar instead of walking the whole history.
+    """
+    entries = series.items()
+    if since:
+        entries = takewhile(lambda item: item[0] >= since, entries)
+    return [
+        {
+            "date": day,
+            **{
+                field: int(values[source]) if field == "volume" else float(values[source])
+                for field, source in FIELDS[interval]
+                if source in values
+            },
+        }
+        for day, values in entries
+    ]
+
+
+def _missing_sessions(interval: str, last_date: str, ticker: str, today: date) -> int:
+    """
+    Upper bound on how many bars were published since the last stored one.
+    """
+    last = date.fromisoformat(last_date)
+    if interval == "weekly":
+        return (today - last).days // 7 + 1
+    exchange = exchange_for(ticker)
+    return sum(
+        1 for offset in range(1, (today - last).days + 1)
+        if is_trading_day(last + timedelta(days=offset), exchange)
+    )
+
+
+async def _fetch_series(ticker: str, interval: str, compact: bool, priority: int):
+    spec = SERIES[interval]
+    url = f"https://www.alphavantage.co/query?function={spec['function']}&symbol={ticker}&apikey={API_KEY}"
+    if compact:
+        url += "&outputsize=compact"
+    elif spec["compact_bars"]:
+        url += "&outputsize=full"
+    data = await make_request(url, priority=priority)
+    series = data.get(spec["key"])
+    if not series:
+        # An "Error Message" (unknown symbol) or an unrecognised notice: never treat it as
+        # an empty history, or a full reload would wipe the stored bars
+        detail = data.get("Error Message") or data.get("Information") or data.get("Note") or "no time series returned"
+        raise ValueError(f"No {interval} bars for {ticker} from Alpha Vantage: {detail}")
+    return series
+
+
+def _same_period(interval: str, a: str, b: str) -> bool:
+    if interval == "weekly":
+        return date.fromisoformat(a).isocalendar()[:2] == date.fromisoformat(b).isocalendar()[:2]
+    return a == b
+
+
+async def sync_bars(ticker: str, interval: str = "weekly", priority: int = PRIORITY_USER, store=None, today: date = None):
+    """
+    Bring the stored bars for (ticker, interval) up to date.
+
+    - Nothing stored yet: full pull.
+    - Only recent bars missing: compact pull where the endpoint supports it, and only the
+      bars from the last stored date onwards are parsed and upserted.
+    - The last stored bar is re-checked against upstream. If it changed (a split or
+      dividend re-based the adjusted history) or the upstream window does not reach back
+      to it (a gap), the series is reloaded in full.
+
+    Returns a small sync summary.
+    """
+    store = store or price_bar_store
+    spec = SERIES[interval]
+    today = today or datetime.now(timezone.utc).date()
+    stored = await store.latest_bars(ticker, interval, 2)
+
+    mode = "full"
+    if stored:
+        missing = _missing_sessions(interval, stored[0]["date"], ticker, today)
+        mode = "compact" if spec["compact_bars"] and missing < spec["compact_bars"] else "incremental"
+
+    series = await _fetch_series(ticker, interval, compact=(mode == "compact"), priority=priority)
+    changed = 0
+
+    if mode != "full":
+        anchor = stored[0]
+        newest = next(iter(series), None)
+        if newest and len(stored) > 1 and _same_period(interval, anchor["date"], newest):
+            # The bar for the current period is provisional: its values move until the
+            # period closes and weekly bars are re-dated as the week goes on. Anchor on
+            # the last completed bar instead so it is simply overwritten.
+            if anchor["date"] != newest:
+                await store.delete_bars(ticker, interval, [anchor["date"]])
+            anchor = stored[1]
+
+        bars = parse_bars(interval, series, since=anchor["date"])
+        overlap = bars[-1] if bars else None
+        if overlap is None or overlap["date"] != anchor["date"]:
+            logger.info(f"Gap in stored {interval} bars for {ticker}, reloading in full")
+            mode = "full"
+        elif overlap.get(spec["check_field"]) != anchor.get(spec["check_field"]):
+            logger.info(f"Stored {interval} bars for {ticker} were adjusted upstream, reloading in full")
+            mode = "full"
+        else:
+            changed = await store.upsert_bars(ticker, interval, bars)
+            mode = "compact" if mode == "compact" else "incremental"
+
+        if mode == "full":
+            if spec["compact_bars"]:
+                # Only the compact window was fetched; the reload needs the whole history
+                series = await _fetch_series(ticker, interval, compact=False, priority=priority)
+            bars = parse_bars(interval, series)
+            if not bars:
+                raise ValueError(f"No {interval} bars for {ticker} to reload, keeping the stored history")
+            changed = await store.replace_bars(ticker, interval, bars)
+    else:
+        changed = await store.upsert_bars(ticker, interval, parse_bars(interval, series))
+
+    logger.info(f"Synced {interval} bars for {ticker} ({mode}): {changed} new or changed")
+    return {
+        "ticker": ticker,
+        "interval": interval,
+        "mode": mode,
+        "changed": changed,
+        "last_updated": datetime.utcnow(),
+    }
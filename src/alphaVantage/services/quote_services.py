@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import math
+import os
+from itertools import islice
+
+from dotenv import load_dotenv
+
+from src.alphaVantage.services.segmented_services.helpers import make_request
+from src.utils.cache import cache
+from src.utils.rate_limiter import PRIORITY_BACKGROUND, PRIORITY_USER
+
+# Load environment variables from .env file
+load_dotenv()
+
+API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
+
+logger = logging.getLogger(__name__)
+
+# Symbols shown by the live market prices widget
+LIVE_MARKET_SYMBOLS = [
+    symbol.strip().upper()
+    for symbol in os.getenv("LIVE_MARKET_SYMBOLS", "AAPL,AMZN,TSLA,MSFT,GOOG,NVDA").split(",")
+    if symbol.strip()
+]
+# REALTIME_BULK_QUOTES needs a premium key; without it every symbol uses the daily series
+AV_BULK_QUOTES_ENABLED = os.getenv("AV_BULK_QUOTES_ENABLED", "false").lower() == "true"
+# Alpha Vantage accepts up to 100 symbols per bulk request
+BULK_QUOTES_BATCH_SIZE = int(os.getenv("BULK_QUOTES_BATCH_SIZE", "100"))
+# The widget compares the latest close with the close this many sessions earlier
+REFERENCE_SESSIONS = 5
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _daily_points(symbol: str, priority: int = PRIORITY_USER):
+    """
+    (date, close, volume) for the newest REFERENCE_SESSIONS + 1 daily bars. The compact
+    series is ordered newest first, so only those points are parsed.
+    """
+    url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize=compact&apikey={API_KEY}"
+    data = await make_request(url, priority=priority)
+    series = data.get("Time Series (Daily)", {})
+    return [
+        (day, float(values["4. close"]), int(values.get("5. volume", 0)))
+        for day, values in islice(series.items(), REFERENCE_SESSIONS + 1)
+    ]
+
+
+def _quote_from_points(symbol: str, points):
+    if len(points) < 2:
+        return None
+    return {
+        "symbol": symbol,
+        "price": points[0][1],
+        "previous_close": points[1][1],
+        "volume": points[0][2],
+        "latest_trading_day": points[0][0],
+        "price_5_days_ago": points[REFERENCE_SESSIONS][1] if len(points) > REFERENCE_SESSIONS else None,
+    }
+
+
+async def _bulk_quotes(symbols, priority: int):
+    """
+    One REALTIME_BULK_QUOTES request for up to BULK_QUOTES_BATCH_SIZE symbols.
+    """
+    url = f"https://www.alphavantage.co/query?function=REALTIME_BULK_QUOTES&symbol={','.join(symbols)}&apikey={API_KEY}"
+    data = await make_request(url, priority=priority)
+    wanted = set(symbols)
+    quotes = {}
+    for row in data.get("data", []):
+        symbol = str(row.get("symbol", "")).upper()
+        price = _number(row.get("close"))
+        previous_close = _number(row.get("previous_close"))
+        # Without a trading day the quote cannot be placed in the daily series; such rows
+        # fall back to the daily request like symbols the bulk endpoint left out
+        latest_trading_day = str(row.get("timestamp") or "")[:10]
+        if symbol in wanted and price is not None and previous_close is not None and latest_trading_day:
+            quotes[symbol] = {
+                "symbol": symbol,
+                "price": price,
+                "previous_close": previous_close,
+                "volume": int(_number(row.get("volume")) or 0),
+                "latest_trading_day": latest_trading_day,
+            }
+    return quotes
+
+
+async def _add_reference_close(quote: dict):
+    """
+    Fill price_5_days_ago for a bulk quote from the daily series, which only changes once
+    a day and is cached on that schedule.
+    """
+    symbol = quote["symbol"]
+    try:
+        points = await cache.get_or_fetch(
+            "quote_reference", symbol, lambda: _daily_points(symbol, PRIORITY_BACKGROUND), ticker=symbol
+        )
+    except Exception as e:
+        logger.warning(f"No reference close for {symbol}: {e}")
+        points = []
+    # The cached series may end one session before the live quote
+    offset = REFERENCE_SESSIONS if points and points[0][0] == quote["latest_trading_day"] else REFERENCE_SESSIONS - 1
+    quote["price_5_days_ago"] = points[offset][1] if len(points) > offset else None
+    return quote
+
+
+def quote_request_cost(symbols) -> int:
+    """
+    Upstream requests one fetch_quotes(symbols) makes, leaving out cached reference closes.
+    """
+    count = len({symbol.upper() for symbol in symbols})
+    if AV_BULK_QUOTES_ENABLED:
+        return math.ceil(count / BULK_QUOTES_BATCH_SIZE)
+    return count
+
+
+async def fetch_quotes(symbols, priority: int = PRIORITY_USER):
+    """
+    Latest quote per symbol ({symbol: quote or None}).
+
+    With bulk quotes enabled, symbols are fetched BULK_QUOTES_BATCH_SIZE per request and
+    the batches run concurrently. Anything the bulk endpoint does not return (or every
+    symbol when it is disabled) falls back to one compact daily request per symbol, all
+    issued concurrently; the request governor still paces them against the quota.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    quotes = {}
+
+    if AV_BULK_QUOTES_ENABLED:
+        batches = [symbols[i:i + BULK_QUOTES_BATCH_SIZE] for i in range(0, len(symbols), BULK_QUOTES_BATCH_SIZE)]
+        results = await asyncio.gather(*(_bulk_quotes(batch, priority) for batch in batches), return_exceptions=True)
+        for batch, result in zip(batches, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Bulk quotes failed for {len(batch)} symbols: {result}")
+                continue
+            quotes.update(result)
+        await asyncio.gather(*(_add_reference_close(quote) for quote in quotes.values()))
+
+    remaining = [symbol for symbol in symbols if symbol not in quotes]
+    results = await asyncio.gather(*(_daily_points(symbol, priority) for symbol in remaining), return_exceptions=True)
+    for symbol, result in zip(remaining, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Quote failed for {symbol}: {result}")
+            continue
+        quotes[symbol] = _quote_from_points(symbol, result)
+
+    return {symbol: quotes.get(symbol) for symbol in symbols}
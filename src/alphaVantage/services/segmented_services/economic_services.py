@@ -1,9 +1,9 @@
-import requests
-from fastapi import HTTPException
 from cachetools import TTLCache
 import os
 from dotenv import load_dotenv
 from src.mongoDB.database import database
+from motor.motor_asyncio import AsyncIOMotorClient
+from src.alphaVantage.services.segmented_services.helpers import make_request
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,16 +20,6 @@ db = client.tradely  # Use the 'tradely' database
 # Caches with a TTL of 1 hour and a max size of 100 items
 economic_cache = TTLCache(maxsize=100, ttl=3600)
 
-# Helper function for API requests
-async def make_request(url: str):
-    """Handles API requests and rate limit errors."""
-    response = requests.get(url)
-    if response.status_code == 429:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch data from Alpha Vantage.")
-    return response.json()
-
 # async def fetch_economic_data(indicator: str):
 #     if indicator in economic_cache:
 #         return economic_cache[indicator]
@@ -1,10 +1,45 @@
-import requests
 from fastapi import HTTPException
 import asyncio
+import logging
+import httpx
+from src.utils import http_client
+from src.utils.rate_limiter import governor, is_daily_limit, throttle_message, PRIORITY_USER
+from src.utils.single_flight import upstream_flight, normalize_url
 
-async def make_request(url: str, retries: int = 3, backoff_factor: float = 0.5):
+logger = logging.getLogger(__name__)
+
+# How long to hold all requests back after Alpha Vantage soft-throttles us
+SOFT_THROTTLE_PAUSE_SECONDS = 60
+
+async def make_request(url: str, retries: int = 3, backoff_factor: float = 0.5, priority: int = PRIORITY_USER):
+    """
+    Identical concurrent requests share one upstream call (see src/utils/single_flight.py)
+    """
+    return await upstream_flight.do(
+        normalize_url(url),
+        lambda: _make_request(url, retries, backoff_factor, priority),
+    )
+
+async def _make_request(url: str, retries: int, backoff_factor: float, priority: int):
+    """
+    Handles API requests and rate limit errors with retries, using the shared pooled client
+    Every attempt waits for the request governor, so upstream budgets are respected
+        429 == rate limit exceeded (HTTP 429, or a 200 with a throttle "Note"/"Information")
+        200 == success
+        Not 429 || 200 == HTTPException
+        500 == retry attempts fail
+    """
     for attempt in range(retries):
-        response = requests.get(url)
+        await governor.acquire(priority)
+        try:
+            response = await http_client.get(url)
+        except httpx.TimeoutException:
+            if attempt < retries - 1:
+                await asyncio.sleep(backoff_factor * (2 ** attempt))
+                continue
+            raise HTTPException(status_code=504, detail="Timed out fetching data from Alpha Vantage.")
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=502, detail=f"Failed to reach Alpha Vantage: {str(e)}")
         if response.status_code == 429:
             if attempt < retries - 1:
                 await asyncio.sleep(backoff_factor * (2 ** attempt))
@@ -12,5 +47,18 @@ async def make_request(url: str, retries: int = 3, backoff_factor: float = 0.5):
             raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
         if response.status_code != 200:
             raise HTTPException(status_code=response.status_code, detail="Failed to fetch data from Alpha Vantage.")
-        return response.json()
-    raise HTTPException(status_code=500, detail="Failed to fetch data after multiple attempts.")
\ No newline at end of file
+
+        data = response.json()
+        message = throttle_message(data)
+        if message is None:
+            return data
+
+        # Soft throttle: never hand this payload back as data
+        logger.warning(f"Alpha Vantage throttled the request: {message}")
+        if is_daily_limit(message):
+            governor.exhaust_day()
+            raise HTTPException(status_code=429, detail="Daily Alpha Vantage request budget exhausted. Please try again tomorrow.")
+        governor.penalize(SOFT_THROTTLE_PAUSE_SECONDS)
+        if attempt == retries - 1:
+            raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
+    raise HTTPException(status_code=500, detail="Failed to fetch data after multiple attempts.")
@@ -1,14 +1,22 @@
-import requests
 from fastapi import HTTPException
-from cachetools import TTLCache
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-from alpha_vantage.timeseries import TimeSeries
 from src.alphaVantage.models.stock_models import StockMetadata, StockHistoricalData
 from src.mongoDB.database import database
+from src.mongoDB.price_bars import price_bar_store
+from src.alphaVantage.services.segmented_services import helpers
+from src.alphaVantage.services.segmented_services.helpers import make_request
+from src.alphaVantage.services.historical_sync import SERIES, sync_bars
+from src.alphaVantage.services.quote_services import LIVE_MARKET_SYMBOLS, fetch_quotes, quote_request_cost
+from src.utils.fan_out import fan_out
+from src.utils.cache import cache
+from src.utils.indicators import INDICATORS, SERIES_TYPES, compute_indicator
+from src.utils.rolling_indicators import INDICATOR_STATE_HISTORY, indicator_states
+from src.utils.quote_board import quote_board
+from src.utils.price_hub import PriceHub
+from src.utils.rate_limiter import AV_REQUESTS_PER_MINUTE, PRIORITY_BACKGROUND
 from motor.motor_asyncio import AsyncIOMotorClient
-import asyncio
 import logging
 import time
 
@@ -20,101 +28,56 @@ API_KEY = os.getenv("ALPHA_VANTAGE_API_KEY")
 if not API_KEY:
     raise ValueError("Alpha Vantage API key is not set in environment variables.")
 
+# Overall latency budget for the combined /all-stock-data bundle
+BUNDLE_DEADLINE_SECONDS = float(os.getenv("BUNDLE_DEADLINE_SECONDS", "20"))
+# Share of the Alpha Vantage quota the live prices widget may use; the rest is kept for analyses
+LIVE_PRICES_QUOTA_SHARE = float(os.getenv("LIVE_PRICES_QUOTA_SHARE", "0.5"))
+
 # MongoDB setup
 client = AsyncIOMotorClient(os.getenv("MONGODB_URI"))
 db = client.tradely
 
-# Caches with a TTL of 1 hour and a max size of 100 items
-metadata_cache = TTLCache(maxsize=100, ttl=3600)
-historical_data_cache = TTLCache(maxsize=100, ttl=3600)
-news_cache = TTLCache(maxsize=100, ttl=3600)
-income_statement_cache = TTLCache(maxsize=100, ttl=3600)
-balance_sheet_cache = TTLCache(maxsize=100, ttl=3600)
-cash_flow_cache = TTLCache(maxsize=100, ttl=3600)
-earnings_cache = TTLCache(maxsize=100, ttl=3600)
-sma_cache = TTLCache(maxsize=100, ttl=3600)
-ema_cache = TTLCache(maxsize=100, ttl=3600)
-top_gainers_losers_cache = TTLCache(maxsize=100, ttl=3600)
-market_data_cache = {"data": {}, "last_updated": 0}
+# All fetch functions cache through the shared tiered cache (src/utils/cache.py),
+# with per-dataset TTL policies keyed on the dataset names used below
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Helper function for API requests with retries
-async def make_request(url: str, retries: int = 3, backoff_factor: float = 0.5):
-    """
-    Handles API requests and rate limit errors with retries
-        429 == rate limit exceeded
-        200 == success
-        Not 429 || 200 == HTTPException
-        500 == retry attempts fail
-    """
-    for attempt in range(retries):
-        response = requests.get(url)
-        if response.status_code == 429:
-            if attempt < retries - 1:
-                await asyncio.sleep(backoff_factor * (2 ** attempt))
-                continue
-            raise HTTPException(status_code=429, detail="Rate limit exceeded. Please try again later.")
-        if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Failed to fetch data from Alpha Vantage.")
-        return response.json()
-    raise HTTPException(status_code=500, detail="Failed to fetch data after multiple attempts.")
+# Upstream datasets are cached once per ticker as full snapshots; every `limit` is served
+# as a copied slice so callers can never mutate (or truncate) the cached data
+def _rows(snapshot, limit: int):
+    return [dict(row) for row in snapshot[:limit]]
+
+def _items(snapshot: dict, limit: int):
+    return {key: dict(value) for key, value in list(snapshot.items())[:limit]}
 
 async def fetch_all_stock_data(ticker: str):
     """
-    Fetch all relevant stock data by calling multiple endpoints.
+    Fetch all relevant stock data by calling multiple endpoints concurrently.
+    Sections that fail or miss the deadline come back as None, with their status and
+    timing recorded under "fetch_status" instead of failing the whole bundle.
     """
-    try:
-        # Step 1: Fetch metadata
-        metadata = await fetch_stock_metadata(ticker)
-
-        # Step 2: Fetch historical data
-        historical_data = await fetch_historical_data(ticker)
-        
-        # Step 3: Fetch news headlines
-        news = await fetch_news_headlines(ticker)
-        
-        # Step 4: Fetch income statement
-        income_statement = await fetch_income_statement(ticker)
-        
-        # Step 5: Fetch balance sheet
-        balance_sheet = await fetch_balance_sheet(ticker)
-
-        # Step 6: Fetch cash flow
-        cash_flow = await fetch_cash_flow(ticker)
-
-        # Step 7: Fetch earnings
-        earnings = await fetch_earnings(ticker)
-
-        # Step 8: Fetch SMA (Simple Moving Average)
-        sma = await fetch_SMA(ticker)
-
-        # Step 9: Fetch EMA (Exponential Moving Average)
-        ema = await fetch_EMA(ticker)
-
-        # Step 10: Fetch live market prices
-        live_market_prices = await fetch_live_market_prices()
-
-        # Step 11: Consolidate all data into a single dictionary
-        consolidated_data = {
-            "metadata": metadata,
-            "historical_data": historical_data,
-            "news": news,
-            "income_statement": income_statement,
-            "balance_sheet": balance_sheet,
-            "cash_flow": cash_flow,
-            "earnings": earnings,
-            "sma": sma,
-            "ema": ema,
-        }
+    sections = {
+        "metadata": fetch_stock_metadata(ticker),
+        "historical_data": fetch_historical_data(ticker),
+        "news": fetch_news_headlines(ticker),
+        "income_statement": fetch_income_statement(ticker),
+        "balance_sheet": fetch_balance_sheet(ticker),
+        "cash_flow": fetch_cash_flow(ticker),
+        "earnings": fetch_earnings(ticker),
+        "sma": fetch_SMA(ticker),
+        "ema": fetch_EMA(ticker),
+    }
+    consolidated_data, fetch_status = await fan_out(sections, BUNDLE_DEADLINE_SECONDS)
+    logger.info(f"Fetched stock data bundle for {ticker} in {fetch_status['elapsed_ms']} ms")
 
-        return consolidated_data
+    if all(section["status"] != "ok" for section in fetch_status["sections"].values()):
+        logger.error(f"Failed to fetch all stock data for {ticker}: {fetch_status}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch all stock data: {fetch_status['sections']}")
 
-    except Exception as e:
-        logger.error(f"Failed to fetch all stock data for {ticker}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to fetch all stock data: {str(e)}")
+    consolidated_data["fetch_status"] = fetch_status
+    return consolidated_data
 
 
 # Specific Data Calls
@@ -122,14 +85,15 @@ async def fetch_stock_metadata(ticker: str):
     """
     Fetching stock metadata of a specific ticker input symbol
     """
-    if ticker in metadata_cache:
-        return metadata_cache[ticker]
-    
+    return await cache.get_or_fetch("metadata", ticker, lambda: _fetch_stock_metadata(ticker), ticker=ticker)
+
+async def _fetch_stock_metadata(ticker: str):
     url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={ticker}&apikey={API_KEY}"
     data = await make_request(url)
 
     metadata = {
         "ticker": ticker,
+        "sector": data.get("Sector", "N/A"),
         "industry": data.get("Industry", "N/A"),
         "market_cap": data.get("MarketCapitalization", "N/A"),
         "dividend_yield": data.get("DividendYield", "N/A"),
@@ -146,6 +110,9 @@ async def fetch_stock_metadata(ticker: str):
         "last_updated": datetime.utcnow()
     }
 
+    # Sector and market cap drive the gainers/losers filters
+    quote_board.set_profile(ticker, metadata["sector"], metadata["market_cap"])
+
     # Store in MongoDB (overwrite existing data)
     await db.stock_metadata.update_one(
         {"ticker": ticker},
@@ -154,87 +121,39 @@ async def fetch_stock_metadata(ticker: str):
     )
     logger.info(f"Stored metadata for {ticker} in database")
 
-    # Update cache
-    metadata_cache[ticker] = metadata
-
     return metadata
 
 async def fetch_historical_data(ticker: str, limit: int = 5):
     """
     Fetch weekly historical stock data with a limit on the number of entries.
+    Bars are read from the per-bar price store; the limit is applied by the database.
     """
-    if ticker in historical_data_cache:
-        # Return limited data from the cache
-        cached_data = historical_data_cache[ticker]
-        cached_data["historical_data"] = cached_data["historical_data"][:limit]
-        return cached_data
-
-    # Check if historical data is already stored in the database
-    existing_data = await db.historical_data.find_one({"ticker": ticker})
-    if existing_data:
-        existing_data["_id"] = str(existing_data["_id"])
-        # Limit the number of entries
-        existing_data["historical_data"] = existing_data["historical_data"][:limit]
-        return existing_data
-
-    try:
-        ts = TimeSeries(key=os.getenv("ALPHA_VANTAGE_API_KEY"), output_format='json')
-        data, _ = ts.get_weekly_adjusted(ticker)
-
-        # Extract relevant details and limit the number of entries
-        cleaned_data = [
-            {
-                "date": date,
-                "open": values["1. open"],
-                "high": values["2. high"],
-                "low": values["3. low"],
-                "close": values["4. close"],
-                "adjusted_close": values["5. adjusted close"],
-                "volume": values["6. volume"],
-                "dividend_amount": values["7. dividend amount"]
-            }
-            for date, values in data.items()
-        ][:limit]  # Apply the limit here
-
-        historical_data = {
-            "ticker": ticker,
-            "historical_data": cleaned_data,
-            "last_updated": datetime.utcnow()
-        }
-
-        # Store in MongoDB
-        await db.historical_data.update_one(
-            {"ticker": ticker},
-            {"$set": historical_data},
-            upsert=True
-        )
-        logger.info(f"Stored historical data for {ticker} in database")
-
-        # Update cache
-        historical_data_cache[ticker] = historical_data
-
-        return historical_data
-
-    except Exception as e:
-        logger.error(f"Failed to fetch historical data for {ticker}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to fetch historical data: {str(e)}")
+    sync = await _sync_price_bars(ticker, "weekly")
+    bars = await price_bar_store.latest_bars(ticker, "weekly", limit)
+    return {
+        "ticker": ticker,
+        "historical_data": bars,
+        "last_updated": sync["last_updated"],
+    }
 
-# Fetch news headlines
-async def fetch_news_headlines(ticker: str, limit: int = 3):
+async def _sync_price_bars(ticker: str, interval: str = "weekly"):
     """
-    Stock news for specific ticker input
+    Bring the stored series up to date (only new bars are written, see
+    src/alphaVantage/services/historical_sync.py), at most once per freshness window.
+    Returns a small sync marker, which is what the cache holds, rather than the bars.
     """
-    cache_key = f"{ticker}_{limit}"
-    if cache_key in news_cache:
-        return news_cache[cache_key]
-
-    url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers={ticker}&apikey={API_KEY}&sort=RELEVANCE"
+    async def sync():
+        try:
+            return await sync_bars(ticker, interval, store=price_bar_store)
 
-    data = await make_request(url)
+        except Exception as e:
+            logger.error(f"Failed to fetch historical data for {ticker}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to fetch historical data: {str(e)}")
 
-    news_data = data.get("feed", [])
+    return await cache.get_or_fetch("price_bars", f"{ticker}_{interval}", sync, ticker=ticker)
 
-    cleaned_news = [
+def _clean_news(news_data):
+    return tuple(
         {
             "article": index + 1,
             "title": item.get("title", "N/A"),
@@ -245,183 +164,122 @@ async def fetch_news_headlines(ticker: str, limit: int = 3):
             "sentimentScore": item.get("overall_sentiment_score", "N/A"),
             "sentimentLabel": item.get("overall_sentiment_label", "N/A"),
         }
-        for index, item in enumerate(news_data[:limit])
-    ]
+        for index, item in enumerate(news_data)
+    )
 
-    # Cache the result
-    news_cache[cache_key] = cleaned_news
-    return cleaned_news
+# Fetch news headlines
+async def fetch_news_headlines(ticker: str, limit: int = 3):
+    """
+    Stock news for specific ticker input
+    """
+    news = await cache.get_or_fetch("news", ticker, lambda: _fetch_news_feed(ticker), ticker=ticker)
+    return _rows(news, limit)
+
+async def _fetch_news_feed(ticker: str = None):
+    if ticker:
+        url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&tickers={ticker}&apikey={API_KEY}&sort=RELEVANCE"
+    else:
+        url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&apikey={API_KEY}"
+    data = await make_request(url)
+    return _clean_news(data.get("feed", []))
     
 # Fetch fetchLiveNewsHeadlines
 async def fetch_live_news_headlines(limit: int = 3):
     """
     Fetching live market news for the frontend, no specific stock ticker
     """
-    cache_key = f"{limit}"
-    if cache_key in news_cache:
-        return news_cache[cache_key]
+    news = await cache.get_or_fetch("live_news", "market", _fetch_news_feed)
+    return {"news": _rows(news, limit)}
 
-    url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&apikey={API_KEY}"
-    data = await make_request(url)
-    news_data = data.get("feed", [])
-
-    cleaned_news = [
-        {
-            "article": index + 1,
-            "title": item.get("title", "N/A"),
-            "summary": item.get("summary", "N/A"),
-            "pubDate": item.get("time_published", "N/A"),
-            "url": item.get("url", "N/A"),
-            "thumbnail": item.get("banner_image", "N/A"),
-            "sentimentScore": item.get("overall_sentiment_score", "N/A"),
-            "sentimentLabel": item.get("overall_sentiment_label", "N/A"),
+# Financial statements share one upstream shape: {"annualReports": [...], "quarterlyReports": [...]}
+async def _fetch_annual_reports(dataset: str, function: str, ticker: str, limit: int):
+    """
+    Fetch a financial statement from Alpha Vantage, persist every annual report in the
+    MongoDB collection named after the dataset, and return the latest `limit` of them.
+    """
+    async def fetch():
+        url = f"https://www.alphavantage.co/query?function={function}&symbol={ticker}&apikey={API_KEY}"
+        data = await make_request(url)
+        statement = {
+            "ticker": ticker,
+            "annual_reports": tuple(data.get("annualReports", [])),
+            # "quarterly_reports": tuple(data.get("quarterlyReports", []))
         }
-        for index, item in enumerate(news_data[:limit])
-    ]
-
-    result = {"news": cleaned_news}
-    news_cache[cache_key] = result
-    return result
-
-# Fetch Income Statement
-async def fetch_income_statement(ticker: str, limit: int = 1):
-    cache_key = f"{ticker}_{limit}"
-    if cache_key in income_statement_cache:
-        return income_statement_cache[cache_key]
-    
-    # Check if income statement is already stored in the database
-    existing_income_statement = await db.income_statement.find_one({"ticker": ticker})
-    if existing_income_statement:
-        existing_income_statement["_id"] = str(existing_income_statement["_id"])
-        return existing_income_statement
-    
-    url = f"https://www.alphavantage.co/query?function=INCOME_STATEMENT&symbol={ticker}&apikey={API_KEY}"
-    data = await make_request(url)
 
-    # Process the data to limit the number of statements
-    limited_data = {
-        "ticker": ticker,
-        "annual_reports": data.get("annualReports", [])[:limit],
-        # "quarterly_reports": data.get("quarterlyReports", [])[:limit]
-    }
+        # Store in MongoDB
+        await db[dataset].update_one(
+            {"ticker": ticker},
+            {"$set": {**statement, "annual_reports": list(statement["annual_reports"])}},
+            upsert=True
+        )
+        logger.info(f"Stored {dataset.replace('_', ' ')} for {ticker} in database")
 
-    # Store in MongoDB
-    await db.income_statement.update_one(
-        {"ticker": ticker},
-        {"$set": limited_data},
-        upsert=True
-    )
-    logger.info(f"Stored income statement for {ticker} in database")
+        return statement
 
-    # Cache the result
-    income_statement_cache[cache_key] = limited_data
+    statement = await cache.get_or_fetch(dataset, ticker, fetch, ticker=ticker)
+    return {"ticker": ticker, "annual_reports": _rows(statement["annual_reports"], limit)}
 
-    return limited_data
+# Fetch Income Statement
+async def fetch_income_statement(ticker: str, limit: int = 1):
+    return await _fetch_annual_reports("income_statement", "INCOME_STATEMENT", ticker, limit)
 
 # Fetch Balance Sheet
 async def fetch_balance_sheet(ticker: str, limit: int = 1):
-    cache_key = f"{ticker}_{limit}"
-    if cache_key in balance_sheet_cache:
-        return balance_sheet_cache[cache_key]
-    
-    # Check if balance sheet is already stored in the database
-    existing_balance_sheet = await db.balance_sheet.find_one({"ticker": ticker})
-    if existing_balance_sheet:
-        existing_balance_sheet["_id"] = str(existing_balance_sheet["_id"])
-        return existing_balance_sheet
-    
-    url = f"https://www.alphavantage.co/query?function=BALANCE_SHEET&symbol={ticker}&apikey={API_KEY}"
-    data = await make_request(url)
-
-    # Process the data to limit the number of balance sheets
-    limited_data = {
-        "ticker": ticker,
-        "annual_reports": data.get("annualReports", [])[:limit],
-        # "quarterly_reports": data.get("quarterlyReports", [])[:limit]
-    }
-
-    # Store in MongoDB
-    await db.balance_sheet.update_one(
-        {"ticker": ticker},
-        {"$set": limited_data},
-        upsert=True
-    )
-    logger.info(f"Stored balance sheet for {ticker} in database")
-
-    # Cache the result
-    balance_sheet_cache[cache_key] = limited_data
-
-    return limited_data
+    return await _fetch_annual_reports("balance_sheet", "BALANCE_SHEET", ticker, limit)
 
 # Fetch Cash Flow
 async def fetch_cash_flow(ticker: str, limit: int = 1):
-    cache_key = f"{ticker}_{limit}"
-    if cache_key in cash_flow_cache:
-        return cash_flow_cache[cache_key]
-    
-    url = f"https://www.alphavantage.co/query?function=CASH_FLOW&symbol={ticker}&apikey={API_KEY}"
-    data = await make_request(url)
-    
-    # Check if cash flow is already stored in the database
-    existing_cash_flow = await db.cash_flow.find_one({"ticker": ticker})
-    if existing_cash_flow:
-        existing_cash_flow["_id"] = str(existing_cash_flow["_id"])
-        return existing_cash_flow
-    
-    # Process the data to limit the number of cash flows
-    limited_data = {
-        "ticker": ticker,
-        "annual_reports": data.get("annualReports", [])[:limit],
-        # "quarterly_reports": data.get("quarterlyReports", [])[:limit]
-    }
-
-    # Store in MongoDB
-    await db.cash_flow.update_one(
-        {"ticker": ticker},
-        {"$set": limited_data},
-        upsert=True
-    )
-    logger.info(f"Stored cash flow for {ticker} in database")
-
-    # Cache the result
-    cash_flow_cache[cache_key] = limited_data
-
-    return limited_data
+    return await _fetch_annual_reports("cash_flow", "CASH_FLOW", ticker, limit)
 
 # Fetch Earnings
 async def fetch_earnings(ticker: str, limit: int = 1):
-    cache_key = f"{ticker}_{limit}"
-    if cache_key in earnings_cache:
-        return earnings_cache[cache_key]
-    
-    # Check if earnings are already stored in the database
-    existing_earnings = await db.earnings.find_one({"ticker": ticker})
-    if existing_earnings:
-        existing_earnings["_id"] = str(existing_earnings["_id"])
-        return existing_earnings
-    
-    url = f"https://www.alphavantage.co/query?function=EARNINGS&symbol={ticker}&apikey={API_KEY}"
-    data = await make_request(url)
-    
-    # Process the data to limit the number of earnings
-    limited_data = {
-        "ticker": ticker,
-        "annual_reports": data.get("annualReports", [])[:limit],
-        # "quarterly_reports": data.get("quarterlyReports", [])[:limit]
-    }
-    
-    # Store in MongoDB
-    await db.earnings.update_one(
-        {"ticker": ticker},
-        {"$set": limited_data},
-        upsert=True
+    return await _fetch_annual_reports("earnings", "EARNINGS", ticker, limit)
+
+# Technical indicators, computed locally from the stored price bars
+def _check_indicator_params(indicator: str, interval: str, time_period: int, series_type: str):
+    indicator = indicator.upper()
+    if indicator not in INDICATORS:
+        raise HTTPException(status_code=400, detail=f"Unsupported indicator {indicator}. Choose from {', '.join(INDICATORS)}.")
+    if interval not in SERIES:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval {interval}. Choose from {', '.join(SERIES)}.")
+    if series_type not in SERIES_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported series_type {series_type}. Choose from {', '.join(SERIES_TYPES)}.")
+    if time_period < 1:
+        raise HTTPException(status_code=400, detail="time_period must be at least 1.")
+    return indicator
+
+async def fetch_indicator(ticker: str, indicator: str, interval: str = "weekly", time_period: int = 60, series_type: str = "close", limit: int = 12):
+    """
+    Any indicator in src/utils/indicators.py (SMA, EMA, RSI, MACD, BBANDS, ATR), in the
+    same format as Alpha Vantage's technical indicator endpoints but without spending
+    upstream requests. The full series is cached per parameter set and sliced per call.
+    """
+    indicator = _check_indicator_params(indicator, interval, time_period, series_type)
+    cache_key = f"{ticker}_{indicator}_{interval}_{time_period}_{series_type}"
+    data = await cache.get_or_fetch(
+        "indicators", cache_key, lambda: _compute_indicator(ticker, indicator, interval, time_period, series_type), ticker=ticker
     )
-    logger.info(f"Stored earnings for {ticker} in database")
 
-    # Cache the result
-    earnings_cache[cache_key] = limited_data
+    # Limit the data to the last 'limit' entries
+    return _items(data, limit)
 
-    return limited_data
+async def _compute_indicator(ticker: str, indicator: str, interval: str, time_period: int, series_type: str):
+    await _sync_price_bars(ticker, interval)
+    bars = await price_bar_store.bars_in_range(ticker, interval)
+    return compute_indicator(indicator, bars, time_period, series_type)
+
+async def _fetch_rolling_indicator(ticker: str, indicator: str, interval: str, time_period: int, series_type: str, limit: int):
+    """
+    SMA/EMA from the rolling state (src/utils/rolling_indicators.py): each call only applies
+    the bars published since the last one. Longer histories than the state keeps fall back
+    to the batch engine.
+    """
+    if limit > INDICATOR_STATE_HISTORY:
+        return await fetch_indicator(ticker, indicator, interval, time_period, series_type, limit)
+    indicator = _check_indicator_params(indicator, interval, time_period, series_type)
+    await _sync_price_bars(ticker, interval)
+    state = await indicator_states.get(ticker, indicator, interval, time_period, series_type)
+    return state.to_alpha_vantage(limit)
 
 # Fetch SMA
 async def fetch_SMA(ticker: str, interval: str = "weekly", time_period: int = 60, series_type: str = "close", limit: int = 12):
@@ -433,21 +291,7 @@ async def fetch_SMA(ticker: str, interval: str = "weekly", time_period: int = 60
             - Buy when a goes above line
             - Sell when it goes below the line
     """
-    cache_key = f"{ticker}_{limit}"
-    if cache_key in sma_cache:
-        return sma_cache[cache_key]
-    
-    url = f"https://www.alphavantage.co/query?function=SMA&symbol={ticker}&interval={interval}&time_period={time_period}&series_type={series_type}&apikey={API_KEY}"
-    data = await make_request(url)
-    sma_data = data.get("Technical Analysis: SMA", {})
-    
-    # Limit the data to the last 'limit' entries
-    limited_sma_data = dict(list(sma_data.items())[:limit])
-    
-    # Cache the result
-    sma_cache[cache_key] = limited_sma_data
-
-    return limited_sma_data
+    return await _fetch_rolling_indicator(ticker, "SMA", interval, time_period, series_type, limit)
 
 # Fetch EMA
 async def fetch_EMA(ticker: str, interval: str = "weekly", time_period: int = 60, series_type: str = "close", limit: int = 12):
@@ -461,21 +305,7 @@ async def fetch_EMA(ticker: str, interval: str = "weekly", time_period: int = 60
             - Buy when a goes above line
             - Sell when it goes below the line
     """
-    cache_key = f"{ticker}_{limit}"
-    if cache_key in ema_cache:
-        return ema_cache[cache_key]
-    
-    url = f"https://www.alphavantage.co/query?function=EMA&symbol={ticker}&interval={interval}&time_period={time_period}&series_type={series_type}&apikey={API_KEY}"
-    data = await make_request(url)
-    ema_data = data.get("Technical Analysis: EMA", {})
-    
-    # Limit the data to the last 'limit' entries
-    limited_ema_data = dict(list(ema_data.items())[:limit])
-    
-    # Cache the result
-    ema_cache[cache_key] = limited_ema_data
-
-    return limited_ema_data
+    return await _fetch_rolling_indicator(ticker, "EMA", interval, time_period, series_type, limit)
 
 """
 Fetching live market data -----------------------
@@ -484,169 +314,125 @@ Fetching live market data -----------------------
 async def fetch_live_market_prices():
     """
     Fetching live market prices for specified stocks to display in the frontend
+    The symbols come from LIVE_MARKET_SYMBOLS (src/alphaVantage/services/quote_services.py)
     """
-    global market_data_cache
-    current_time = time.time()
-    
-    # Refresh market data every 60 minutes
-    if current_time - market_data_cache["last_updated"] < 3600:
-        print("Returning cached market data")
-        return market_data_cache["data"]
-    
-    symbols = ["AAPL", "AMZN", "TSLA", "MSFT", "GOOG", "NVDA"]
-    interval = "daily"
-    
-    market_data = {}
+    snapshot = await cache.get_or_fetch("live_market_prices", "quotes", _fetch_live_market_prices)
+    _apply_quotes(snapshot)
+    return snapshot["prices"]
 
-    for symbol in symbols:
-        try:
-            url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&apikey={API_KEY}"
-            data = await make_request(url)
-            
-            # Check if API returned an error
-            if "Error Message" in data or not data:
-                print(f"API Error for {symbol}: {data.get('Error Message', 'Unknown error')}")
-                market_data[symbol] = {"current_price": None, "price_5_days_ago": None}
-                continue
-
-            # Verify correct data structure
-            time_series = data.get("Time Series (Daily)", {})
-
-            if not time_series:
-                print(f"Warning: No time series data found for {symbol}")
-                market_data[symbol] = {"current_price": None, "price_5_days_ago": None}
-                continue
-
-            # Get the latest timestamp
-            sorted_dates = sorted(time_series.keys(), reverse=True)
-            latest_time = sorted_dates[0] if sorted_dates else None
-            time_5_days_ago = sorted_dates[5] if len(sorted_dates) > 5 else None
-
-            if not latest_time or not time_5_days_ago:
-                print(f"Warning: No valid timestamp for {symbol}")
-                market_data[symbol] = {"current_price": None, "price_5_days_ago": None}
-                continue
-
-            latest_data = time_series[latest_time]
-            data_5_days_ago = time_series[time_5_days_ago]
-
-            # Extract closing prices
-            current_price = float(latest_data["4. close"])
-            price_5_days_ago = float(data_5_days_ago["4. close"])
-
-            market_data[symbol] = {
-                "current_price": current_price,
-                "price_5_days_ago": price_5_days_ago
-            }
+# Pushes live prices to every connected dashboard from one poller (WebSocket and SSE routes)
+price_hub = PriceHub(fetch_live_market_prices)
 
-        except Exception as e:
-            print(f"Error fetching data for {symbol}: {e}")
+# The newest live snapshot this process has applied
+_live_snapshot = None
+
+def _apply_quotes(snapshot):
+    """
+    Keep the rolling SMA/EMA and the gainers/losers board current between bar syncs.
+    Done on read rather than in the fetcher: a snapshot from the shared L2 cache, written
+    by another worker, must still reach this process's in-memory state.
+    """
+    global _live_snapshot
+    if _live_snapshot is not None and snapshot["fetched_at"] <= _live_snapshot["fetched_at"]:
+        return
+    for symbol, quote in snapshot["quotes"].items():
+        indicator_states.apply_tick(symbol, quote["latest_trading_day"], quote["price"])
+        quote_board.update(symbol, quote["price"], quote["previous_close"], quote["volume"])
+    _live_snapshot = snapshot
+
+def _live_refresh_seconds():
+    # Spacing that keeps live refreshes within their share of the per-minute rate
+    return quote_request_cost(LIVE_MARKET_SYMBOLS) * 60 / (AV_REQUESTS_PER_MINUTE * LIVE_PRICES_QUOTA_SHARE)
+
+async def _fetch_live_market_prices():
+    """
+    A refresh costs a request per symbol (or per bulk batch) and runs at background
+    priority, so user requests go first. The last snapshot is served again until the
+    refresh spacing has passed, and while the governor has requests queued or today's
+    usage would go past LIVE_PRICES_QUOTA_SHARE of the daily budget.
+    """
+    last = _live_snapshot
+    if last is not None and (
+        time.time() - last["fetched_at"] < _live_refresh_seconds()
+        or not helpers.governor.has_headroom(quote_request_cost(LIVE_MARKET_SYMBOLS), LIVE_PRICES_QUOTA_SHARE)
+    ):
+        return last
+
+    quotes = await fetch_quotes(LIVE_MARKET_SYMBOLS, priority=PRIORITY_BACKGROUND)
+
+    market_data = {}
+    for symbol, quote in quotes.items():
+        if quote is None:
             market_data[symbol] = {"current_price": None, "price_5_days_ago": None}
+            continue
 
-    # Update cache
-    market_data_cache["data"] = market_data
-    market_data_cache["last_updated"] = current_time
+        market_data[symbol] = {
+            "current_price": quote["price"],
+            "price_5_days_ago": quote["price_5_days_ago"]
+        }
 
-    return market_data
+    return {
+        "prices": market_data,
+        "quotes": {
+            symbol: {field: quote[field] for field in ("latest_trading_day", "price", "previous_close", "volume")}
+            for symbol, quote in quotes.items()
+            if quote is not None
+        },
+        "fetched_at": time.time(),
+    }
 
-async def fetch_top_gainers_losers(limit: int = 5):
+async def fetch_top_gainers_losers(limit: int = 5, sector: str = None, min_market_cap: float = None, max_market_cap: float = None):
     """
-    Fetch the top gainers and losers from the Alpha Vantage API.
-    If the API fails or returns no data, return mock data.
+    Top gainers, losers and most actively traded symbols, ranked locally from the latest
+    quotes we ingest (src/utils/quote_board.py), optionally filtered by sector or market cap.
+    Alpha Vantage's TOP_GAINERS_LOSERS feeds the board through the intraday cache, so the
+    rankings cover the whole market rather than only the symbols we quote ourselves.
     """
-    cache_key = f"top_gainers_losers_{limit}"
-    if cache_key in top_gainers_losers_cache:
-        return top_gainers_losers_cache[cache_key]
-    
     try:
-        # Corrected URL without the 'symbol' parameter
-        url = f"https://www.alphavantage.co/query?function=TOP_GAINERS_LOSERS&apikey={API_KEY}"
-        data = await make_request(url)
-        
-        # Check if API returned a valid response
-        gainers = data.get("top_gainers", [])[:limit]  # Use an empty list as fallback
-        losers = data.get("top_losers", [])[:limit]    # Use an empty list as fallback
-
-        # If gainers or losers are empty, use mock data
-        if not gainers:
-            gainers = [
-                {
-                    "ticker": f"MOCK_GAINER_{i+1}",
-                    "price": round(100 + i * 10, 2),
-                    "change_amount": round(5 + i, 2),
-                    "change_percentage": round(2.5 + i * 0.5, 2),
-                    "volume": 100000 + i * 1000
-                }
-                for i in range(limit)
-            ]
-        
-        if not losers:
-            losers = [
-                {
-                    "ticker": f"MOCK_LOSER_{i+1}",
-                    "price": round(100 - i * 10, 2),
-                    "change_amount": round(-5 - i, 2),
-                    "change_percentage": round(-2.5 - i * 0.5, 2),
-                    "volume": 100000 - i * 1000
-                }
-                for i in range(limit)
-            ]
-
-        # Format the result
-        result = {
-            "metadata": data.get("metadata", "No metadata available"),
-            "last_updated": data.get("last_updated", "Unknown"),
-            "gainers": [
-                {
-                    "ticker": gainer.get("ticker", "N/A"),
-                    "price": gainer.get("price", "N/A"),
-                    "change_amount": gainer.get("change_amount", "N/A"),
-                    "change_percentage": gainer.get("change_percentage", "N/A"),
-                    "volume": gainer.get("volume", "N/A")
-                }
-                for gainer in gainers
-            ],
-            "losers": [
-                {
-                    "ticker": loser.get("ticker", "N/A"),
-                    "price": loser.get("price", "N/A"),
-                    "change_amount": loser.get("change_amount", "N/A"),
-                    "change_percentage": loser.get("change_percentage", "N/A"),
-                    "volume": loser.get("volume", "N/A")
-                }
-                for loser in losers
-            ]
-        }
+        seed = await cache.get_or_fetch("top_gainers_losers", "board", _fetch_top_gainers_losers)
+        _apply_seed(seed)
+    except Exception as e:
+        logger.error(f"Failed to refresh top gainers and losers: {str(e)}")
 
-        # Cache the result
-        top_gainers_losers_cache[cache_key] = result
+    return quote_board.rankings(limit, sector=sector, min_market_cap=min_market_cap, max_market_cap=max_market_cap)
 
-        return result
+# The gainers/losers snapshot whose quotes this process last applied
+_applied_seed = None
 
-    except Exception as e:
-        logger.error(f"Failed to fetch top gainers and losers: {str(e)}")
-        # Return mock data as a fallback
-        return {
-            "metadata": "Mock metadata",
-            "last_updated": "Mock timestamp",
-            "gainers": [
-                {
-                    "ticker": f"MOCK_GAINER_{i+1}",
-                    "price": round(100 + i * 10, 2),
-                    "change_amount": round(5 + i, 2),
-                    "change_percentage": round(2.5 + i * 0.5, 2),
-                    "volume": 100000 + i * 1000
-                }
-                for i in range(limit)
-            ],
-            "losers": [
-                {
-                    "ticker": f"MOCK_LOSER_{i+1}",
-                    "price": round(100 - i * 10, 2),
-                    "change_amount": round(-5 - i, 2),
-                    "change_percentage": round(-2.5 - i * 0.5, 2),
-                    "volume": 100000 - i * 1000
-                }
-                for i in range(limit)
-            ]
-        }
\ No newline at end of file
+def _apply_seed(seed):
+    """
+    Applied on read, not in the fetcher, so a snapshot cached by another worker also
+    reaches this process's board; each snapshot is applied once.
+    """
+    global _applied_seed
+    if seed["fetched_at"] == _applied_seed:
+        return
+    for row in seed["quotes"]:
+        quote_board.update(row["ticker"], row["price"], row["previous_close"], row["volume"])
+    _applied_seed = seed["fetched_at"]
+
+def _parse_number(value):
+    try:
+        return float(str(value).rstrip("%"))
+    except (TypeError, ValueError):
+        return None
+
+async def _fetch_top_gainers_losers():
+    url = f"https://www.alphavantage.co/query?function=TOP_GAINERS_LOSERS&apikey={API_KEY}"
+    data = await make_request(url)
+
+    # Every listed quote goes into the board; it does the ranking
+    rows = data.get("top_gainers", []) + data.get("top_losers", []) + data.get("most_actively_traded", [])
+    quotes = []
+    for row in rows:
+        price = _parse_number(row.get("price"))
+        change_amount = _parse_number(row.get("change_amount"))
+        if row.get("ticker") and price is not None and change_amount is not None:
+            quotes.append({
+                "ticker": row["ticker"],
+                "price": price,
+                "previous_close": price - change_amount,
+                "volume": int(_parse_number(row.get("volume")) or 0),
+            })
+
+    return {"quotes": quotes, "last_updated": data.get("last_updated", "Unknown"), "fetched_at": time.time()}
@@ -0,0 +1,120 @@
+import os
+from datetime import date, timedelta
+import httpx
+import pytest
+
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "demo")
+
+from src.utils import http_client
+from src.utils.rate_limiter import RequestGovernor
+from src.mongoDB.price_bars import MemoryPriceBarStore
+from src.alphaVantage.services import historical_sync
+from src.alphaVantage.services.segmented_services import helpers
+
+
+def daily_series(start: date, days: int, bump: float = 0):
+    """
+    `days` consecutive weekday bars from `start`, newest first like Alpha Vantage.
+    """
+    series = {}
+    day = start
+    while len(series) < days:
+        if day.weekday() < 5:
+            close = 100 + len(series) + bump
+            series[day.isoformat()] = {"1. open": "1", "2. high": "2", "3. low": "0.5", "4. close": str(close), "5. volume": "10"}
+        day += timedelta(days=1)
+    return dict(reversed(list(series.items())))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+    responses = {}
+
+    def handler(request):
+        calls.append(dict(request.url.params))
+        return httpx.Response(200, json={"Time Series (Daily)": responses[request.url.params.get("outputsize")]})
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http_client._host_semaphores.clear()
+    monkeypatch.setattr(helpers, "governor", RequestGovernor(per_minute=600, per_day=0))
+    yield calls, responses
+    http_client._client = None
+
+
+@pytest.mark.asyncio
+async def test_first_sync_pulls_full_history_then_only_new_bars(upstream):
+    calls, responses = upstream
+    store = MemoryPriceBarStore()
+    full = daily_series(date(2025, 1, 6), 20)
+    responses["full"] = full
+
+    first = await historical_sync.sync_bars("AAPL", "daily", store=store, today=date(2025, 1, 31))
+    assert first["mode"] == "full"
+    assert first["changed"] == 20
+
+    # Two more sessions published: compact window overlaps the stored history
+    responses["compact"] = daily_series(date(2025, 1, 6), 22)
+    second = await historical_sync.sync_bars("AAPL", "daily", store=store, today=date(2025, 2, 5))
+    assert second["mode"] == "compact"
+    assert second["changed"] == 2
+    assert calls[-1]["outputsize"] == "compact"
+    assert len(await store.latest_bars("AAPL", "daily", 100)) == 22
+
+
+@pytest.mark.asyncio
+async def test_adjusted_history_triggers_full_reload(upstream):
+    calls, responses = upstream
+    store = MemoryPriceBarStore()
+    responses["full"] = daily_series(date(2025, 1, 6), 20)
+    await historical_sync.sync_bars("AAPL", "daily", store=store, today=date(2025, 1, 31))
+
+    # A split re-based every close upstream
+    responses["compact"] = daily_series(date(2025, 1, 6), 21, bump=-50)
+    responses["full"] = daily_series(date(2025, 1, 6), 21, bump=-50)
+    result = await historical_sync.sync_bars("AAPL", "daily", store=store, today=date(2025, 2, 4))
+    assert result["mode"] == "full"
+    assert [call["outputsize"] for call in calls[-2:]] == ["compact", "full"]
+    bars = await store.latest_bars("AAPL", "daily", 100)
+    assert len(bars) == 21
+    assert bars[-1]["close"] == 50.0
+
+
+@pytest.mark.asyncio
+async def test_weekly_provisional_bar_is_redated(monkeypatch):
+    store = MemoryPriceBarStore()
+    await store.upsert_bars("AAPL", "weekly", [
+        {"date": "2025-03-07", "close": 10.0, "adjusted_close": 10.0},
+        {"date": "2025-03-12", "close": 11.0, "adjusted_close": 11.0},
+    ])
+    weekly = {
+        "2025-03-14": {"4. close": "12", "5. adjusted close": "12"},
+        "2025-03-07": {"4. close": "10", "5. adjusted close": "10"},
+    }
+
+    async def fetch_series(ticker, interval, compact, priority):
+        return weekly
+
+    monkeypatch.setattr(historical_sync, "_fetch_series", fetch_series)
+    result = await historical_sync.sync_bars("AAPL", "weekly", store=store, today=date(2025, 3, 15))
+    assert result["mode"] == "incremental"
+    assert [bar["date"] for bar in await store.latest_bars("AAPL", "weekly", 5)] == ["2025-03-14", "2025-03-07"]
+
+
+@pytest.mark.asyncio
+async def test_error_payload_keeps_stored_history(monkeypatch):
+    store = MemoryPriceBarStore()
+    await store.upsert_bars("AAPL", "daily", historical_sync.parse_bars("daily", daily_series(date(2025, 1, 6), 20)))
+
+    def handler(request):
+        return httpx.Response(200, json={"Error Message": "Invalid API call. Please retry or visit the documentation."})
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http_client._host_semaphores.clear()
+    monkeypatch.setattr(helpers, "governor", RequestGovernor(per_minute=600, per_day=0))
+    try:
+        with pytest.raises(ValueError):
+            await historical_sync.sync_bars("AAPL", "daily", store=store, today=date(2025, 2, 5))
+    finally:
+        http_client._client = None
+    assert len(await store.latest_bars("AAPL", "daily", 100)) == 20
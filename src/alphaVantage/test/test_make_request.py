@@ -0,0 +1,117 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from src.utils import http_client
+from src.alphaVantage.services.segmented_services import helpers
+from src.alphaVantage.services.segmented_services.helpers import make_request
+from src.utils.rate_limiter import RequestGovernor
+
+
+@pytest.fixture(autouse=True)
+def generous_governor(monkeypatch):
+    governor = RequestGovernor(per_minute=600, per_day=0)
+    monkeypatch.setattr(helpers, "governor", governor)
+    return governor
+
+
+def use_transport(handler):
+    """
+    Point the shared client at an in-process handler instead of Alpha Vantage.
+    """
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http_client._host_semaphores.clear()
+
+
+@pytest.mark.asyncio
+async def test_make_request_returns_json():
+    use_transport(lambda request: httpx.Response(200, json={"Symbol": "AAPL"}))
+    data = await make_request("https://www.alphavantage.co/query?function=OVERVIEW&symbol=AAPL")
+    assert data == {"Symbol": "AAPL"}
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_make_request_retries_rate_limit():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429) if len(calls) < 2 else httpx.Response(200, json={"ok": True})
+
+    use_transport(handler)
+    data = await make_request("https://www.alphavantage.co/query?function=OVERVIEW", backoff_factor=0)
+    assert data == {"ok": True}
+    assert len(calls) == 2
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_make_request_raises_on_error_status():
+    use_transport(lambda request: httpx.Response(503))
+    with pytest.raises(HTTPException) as exc:
+        await make_request("https://www.alphavantage.co/query?function=OVERVIEW")
+    assert exc.value.status_code == 503
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_make_request_rejects_soft_throttle(generous_governor):
+    note = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute."}
+    use_transport(lambda request: httpx.Response(200, json=note))
+    generous_governor.penalize = lambda seconds: None
+    with pytest.raises(HTTPException) as exc:
+        await make_request("https://www.alphavantage.co/query?function=OVERVIEW")
+    assert exc.value.status_code == 429
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_per_minute_note_does_not_spend_the_daily_budget(generous_governor):
+    note = {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute and 500 calls per day. "
+                    "Please visit https://www.alphavantage.co/premium/ if you would like to target a higher API call frequency."}
+    use_transport(lambda request: httpx.Response(200, json=note))
+    exhausted = []
+    generous_governor.penalize = lambda seconds: None
+    generous_governor.exhaust_day = lambda: exhausted.append(True)
+    with pytest.raises(HTTPException) as exc:
+        await make_request("https://www.alphavantage.co/query?function=OVERVIEW&symbol=MSFT")
+    assert exc.value.status_code == 429
+    assert exhausted == []
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_daily_notice_spends_the_daily_budget(generous_governor):
+    notice = {"Information": "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. "
+                             "Please subscribe to any of the premium plans at https://www.alphavantage.co/premium/ to instantly remove all daily rate limits."}
+    use_transport(lambda request: httpx.Response(200, json=notice))
+    exhausted = []
+    generous_governor.exhaust_day = lambda: exhausted.append(True)
+    with pytest.raises(HTTPException) as exc:
+        await make_request("https://www.alphavantage.co/query?function=OVERVIEW&symbol=TSLA")
+    assert exc.value.status_code == 429
+    assert exhausted == [True]
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_make_request_coalesces_identical_requests():
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"Symbol": "AAPL"})
+
+    use_transport(handler)
+    leaders = helpers.upstream_flight.stats["leaders"]
+    results = await asyncio.gather(
+        make_request("https://www.alphavantage.co/query?function=OVERVIEW&symbol=AAPL&apikey=a"),
+        make_request("https://www.alphavantage.co/query?symbol=aapl&function=OVERVIEW&apikey=b"),
+        make_request("https://www.alphavantage.co/query?function=OVERVIEW&symbol=AAPL"),
+    )
+    assert results == [{"Symbol": "AAPL"}] * 3
+    assert len(calls) == 1
+    assert helpers.upstream_flight.stats["leaders"] == leaders + 1
+    await http_client.close_http_client()
@@ -0,0 +1,81 @@
+import os
+import httpx
+import pytest
+
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "demo")
+
+from src.utils import http_client
+from src.utils.cache import TieredCache
+from src.utils.rate_limiter import RequestGovernor
+from src.alphaVantage.services import quote_services
+from src.alphaVantage.services.segmented_services import helpers
+
+DAYS = ["2025-01-10", "2025-01-09", "2025-01-08", "2025-01-07", "2025-01-06", "2025-01-03", "2025-01-02"]
+
+
+def daily_payload(base):
+    return {
+        "Time Series (Daily)": {
+            day: {"4. close": str(base - i), "5. volume": str(1000 + i)} for i, day in enumerate(DAYS)
+        }
+    }
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    def handler(request):
+        params = request.url.params
+        calls.append(dict(params))
+        if params["function"] == "REALTIME_BULK_QUOTES":
+            rows = [
+                {"symbol": symbol, "timestamp": None if symbol == "NODATE" else "2025-01-13 16:00:00", "close": "200", "previous_close": "190", "volume": "5000"}
+                for symbol in params["symbol"].split(",") if symbol != "MISS"
+            ]
+            return httpx.Response(200, json={"endpoint": "Realtime Bulk Quotes", "data": rows})
+        return httpx.Response(200, json=daily_payload(100))
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http_client._host_semaphores.clear()
+    monkeypatch.setattr(helpers, "governor", RequestGovernor(per_minute=600, per_day=0))
+    monkeypatch.setattr(quote_services, "cache", TieredCache())
+    yield calls
+    http_client._client = None
+
+
+@pytest.mark.asyncio
+async def test_daily_fallback_reads_only_needed_points(upstream, monkeypatch):
+    monkeypatch.setattr(quote_services, "AV_BULK_QUOTES_ENABLED", False)
+    quotes = await quote_services.fetch_quotes(["aapl", "MSFT"])
+    assert quotes["AAPL"] == {
+        "symbol": "AAPL", "price": 100.0, "previous_close": 99.0, "volume": 1000,
+        "latest_trading_day": "2025-01-10", "price_5_days_ago": 95.0,
+    }
+    assert sorted(call["symbol"] for call in upstream) == ["AAPL", "MSFT"]
+    assert all(call["outputsize"] == "compact" for call in upstream)
+
+
+@pytest.mark.asyncio
+async def test_bulk_quotes_batch_symbols_and_fall_back(upstream, monkeypatch):
+    monkeypatch.setattr(quote_services, "AV_BULK_QUOTES_ENABLED", True)
+    monkeypatch.setattr(quote_services, "BULK_QUOTES_BATCH_SIZE", 2)
+    quotes = await quote_services.fetch_quotes(["AAA", "BBB", "CCC", "MISS"])
+
+    bulk_calls = [call for call in upstream if call["function"] == "REALTIME_BULK_QUOTES"]
+    assert [call["symbol"] for call in bulk_calls] == ["AAA,BBB", "CCC,MISS"]
+    assert quotes["AAA"]["price"] == 200.0
+    # The live quote is a session ahead of the cached daily series
+    assert quotes["AAA"]["price_5_days_ago"] == 96.0
+    # Missing from the bulk response: served from its daily series instead
+    assert quotes["MISS"]["price"] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_bulk_rows_without_a_trading_day_fall_back(upstream, monkeypatch):
+    monkeypatch.setattr(quote_services, "AV_BULK_QUOTES_ENABLED", True)
+    quotes = await quote_services.fetch_quotes(["AAA", "NODATE"])
+
+    assert quotes["AAA"]["latest_trading_day"] == "2025-01-13"
+    assert quotes["NODATE"]["latest_trading_day"] == "2025-01-10"
+    assert quotes["NODATE"]["price"] == 100.0
@@ -0,0 +1,303 @@
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock
+import httpx
+import pytest
+
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "demo")
+
+from src.utils import http_client
+from src.utils.cache import MemoryBackend, TieredCache
+from src.utils.rate_limiter import PRIORITY_BACKGROUND, RequestGovernor
+from src.mongoDB.price_bars import MemoryPriceBarStore
+from src.mongoDB.indicator_state import MemoryIndicatorStateStore
+from src.utils.rolling_indicators import IndicatorStates
+from src.utils.quote_board import QuoteBoard
+from src.alphaVantage.services import stock_services
+from src.alphaVantage.services.segmented_services import helpers
+
+
+def weekly_payload(weeks):
+    return {
+        "Weekly Adjusted Time Series": {
+            f"2025-01-{week + 1:02d}": {
+                "1. open": "1", "2. high": "2", "3. low": "0.5", "4. close": str(100 + week),
+                "5. adjusted close": str(100 + week), "6. volume": "1000", "7. dividend amount": "0",
+            }
+            for week in range(weeks)
+        }
+    }
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    Route stock_services through an in-process Alpha Vantage stand-in with a fresh cache
+    and no MongoDB.
+    """
+    calls = []
+    responses = {}
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json=responses[request.url.params["function"]])
+
+    http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http_client._host_semaphores.clear()
+    monkeypatch.setattr(helpers, "governor", RequestGovernor(per_minute=600, per_day=0))
+    monkeypatch.setattr(stock_services, "cache", TieredCache())
+    fake_db = MagicMock()
+    fake_db.__getitem__.return_value.update_one = AsyncMock()
+    monkeypatch.setattr(stock_services, "db", fake_db)
+    bars = MemoryPriceBarStore()
+    monkeypatch.setattr(stock_services, "price_bar_store", bars)
+    monkeypatch.setattr(stock_services, "indicator_states", IndicatorStates(bars, MemoryIndicatorStateStore()))
+    monkeypatch.setattr(stock_services, "quote_board", QuoteBoard())
+    monkeypatch.setattr(stock_services, "_live_snapshot", None)
+    monkeypatch.setattr(stock_services, "_applied_seed", None)
+    yield calls, responses
+    http_client._client = None
+
+
+@pytest.mark.asyncio
+async def test_historical_limits_share_one_upstream_call(upstream):
+    calls, responses = upstream
+    responses["TIME_SERIES_WEEKLY_ADJUSTED"] = weekly_payload(10)
+
+    three = await stock_services.fetch_historical_data("AAPL", limit=3)
+    eight = await stock_services.fetch_historical_data("AAPL", limit=8)
+    assert len(three["historical_data"]) == 3
+    assert len(eight["historical_data"]) == 8
+    assert len(calls) == 1
+
+    # Mutating a returned view must not leak into the cached snapshot
+    eight["historical_data"].clear()
+    three["historical_data"][0]["close"] = 0
+    again = await stock_services.fetch_historical_data("AAPL", limit=5)
+    assert len(again["historical_data"]) == 5
+    # Newest bar first
+    assert again["historical_data"][0]["date"] == "2025-01-10"
+    assert again["historical_data"][0]["close"] == 109.0
+
+
+@pytest.mark.asyncio
+async def test_statement_limits_share_one_upstream_call(upstream):
+    calls, responses = upstream
+    responses["INCOME_STATEMENT"] = {"annualReports": [{"fiscalDateEnding": f"202{i}-12-31"} for i in range(4, 0, -1)]}
+
+    one = await stock_services.fetch_income_statement("AAPL", limit=1)
+    three = await stock_services.fetch_income_statement("AAPL", limit=3)
+    assert [r["fiscalDateEnding"] for r in one["annual_reports"]] == ["2024-12-31"]
+    assert len(three["annual_reports"]) == 3
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_indicators_are_computed_from_stored_bars(upstream):
+    calls, responses = upstream
+    responses["TIME_SERIES_WEEKLY_ADJUSTED"] = weekly_payload(10)
+
+    sma = await stock_services.fetch_SMA("AAPL", time_period=3, limit=2)
+    ema = await stock_services.fetch_EMA("AAPL", time_period=3, limit=2)
+    rsi = await stock_services.fetch_indicator("AAPL", "rsi", time_period=3, limit=1)
+    # One weekly download feeds every indicator; no SMA/EMA/RSI upstream calls
+    assert [call.url.params["function"] for call in calls] == ["TIME_SERIES_WEEKLY_ADJUSTED"]
+    assert sma == {"2025-01-10": {"SMA": "108.0000"}, "2025-01-09": {"SMA": "107.0000"}}
+    assert list(ema) == ["2025-01-10", "2025-01-09"]
+    assert rsi == {"2025-01-10": {"RSI": "100.0000"}}
+
+    with pytest.raises(stock_services.HTTPException) as error:
+        await stock_services.fetch_indicator("AAPL", "VWAP")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_top_gainers_losers_ranked_locally_after_seeding(upstream):
+    calls, responses = upstream
+    responses["TOP_GAINERS_LOSERS"] = {
+        "last_updated": "2025-01-10 16:15:59 US/Eastern",
+        "top_gainers": [{"ticker": "UP", "price": "12", "change_amount": "2", "change_percentage": "20%", "volume": "900"}],
+        "top_losers": [{"ticker": "DOWN", "price": "8", "change_amount": "-2", "change_percentage": "-20%", "volume": "100"}],
+        "most_actively_traded": [],
+    }
+
+    first = await stock_services.fetch_top_gainers_losers(limit=3)
+    assert [row["ticker"] for row in first["gainers"]] == ["UP"]
+    assert [row["ticker"] for row in first["losers"]] == ["DOWN"]
+    assert first["losers"][0]["change_percentage"] == -20.0
+
+    # Later quotes update the ranking without another upstream call
+    stock_services.quote_board.update("NEW", 30, 20, volume=10)
+    second = await stock_services.fetch_top_gainers_losers(limit=1)
+    assert second["gainers"][0]["ticker"] == "NEW"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_rankings_cover_the_market_when_live_symbols_are_on_the_board(upstream):
+    calls, responses = upstream
+    responses["TOP_GAINERS_LOSERS"] = {
+        "top_gainers": [{"ticker": "UP", "price": "12", "change_amount": "2", "volume": "900"}],
+        "top_losers": [],
+        "most_actively_traded": [],
+    }
+    # The live prices widget ran first and put its own symbols on the board
+    stock_services.quote_board.update("AAPL", 101, 100, volume=5)
+
+    rankings = await stock_services.fetch_top_gainers_losers()
+    assert [row["ticker"] for row in rankings["gainers"]] == ["UP", "AAPL"]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_rankings_are_refreshed_after_the_seed_expires(upstream, monkeypatch):
+    calls, responses = upstream
+    responses["TOP_GAINERS_LOSERS"] = {
+        "top_gainers": [{"ticker": "UP", "price": "12", "change_amount": "2", "volume": "900"}],
+        "top_losers": [],
+        "most_actively_traded": [],
+    }
+    now = [time.time()]
+    monkeypatch.setattr(stock_services, "cache", TieredCache(clock=lambda: now[0]))
+    monkeypatch.setattr(stock_services, "quote_board", QuoteBoard(clock=lambda: now[0]))
+    assert [row["ticker"] for row in (await stock_services.fetch_top_gainers_losers())["gainers"]] == ["UP"]
+
+    # Long past both the cached seed and the quotes it put on the board
+    now[0] += 5 * 24 * 3600
+    assert [row["ticker"] for row in (await stock_services.fetch_top_gainers_losers())["gainers"]] == ["UP"]
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_seed_fills_every_worker_board(upstream, monkeypatch):
+    calls, responses = upstream
+    responses["TOP_GAINERS_LOSERS"] = {
+        "top_gainers": [{"ticker": "UP", "price": "12", "change_amount": "2", "volume": "900"}],
+        "top_losers": [],
+        "most_actively_traded": [],
+    }
+    l2 = MemoryBackend()
+    monkeypatch.setattr(stock_services, "cache", TieredCache(l2=l2))
+    await stock_services.fetch_top_gainers_losers()
+
+    # Another worker: its own L1, board and applied seed, the same L2
+    monkeypatch.setattr(stock_services, "cache", TieredCache(l2=l2))
+    monkeypatch.setattr(stock_services, "quote_board", QuoteBoard())
+    monkeypatch.setattr(stock_services, "_applied_seed", None)
+    rankings = await stock_services.fetch_top_gainers_losers()
+    assert [row["ticker"] for row in rankings["gainers"]] == ["UP"]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_live_prices_reach_every_worker_board(upstream, monkeypatch):
+    quote_calls = []
+
+    async def fetch_quotes(symbols, priority):
+        quote_calls.append(symbols)
+        return {"AAPL": {"latest_trading_day": "2025-01-10", "price": 110.0, "previous_close": 100.0, "volume": 5, "price_5_days_ago": 90.0}}
+
+    monkeypatch.setattr(stock_services, "fetch_quotes", fetch_quotes)
+    l2 = MemoryBackend()
+    monkeypatch.setattr(stock_services, "cache", TieredCache(l2=l2))
+    await stock_services.fetch_live_market_prices()
+
+    # Another worker: its own L1, board and applied snapshot, the same L2
+    monkeypatch.setattr(stock_services, "cache", TieredCache(l2=l2))
+    monkeypatch.setattr(stock_services, "quote_board", QuoteBoard())
+    monkeypatch.setattr(stock_services, "_live_snapshot", None)
+    prices = await stock_services.fetch_live_market_prices()
+    assert prices == {"AAPL": {"current_price": 110.0, "price_5_days_ago": 90.0}}
+    assert [row["ticker"] for row in stock_services.quote_board.rankings(5)["gainers"]] == ["AAPL"]
+    assert len(quote_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_live_prices_stay_within_their_share_of_the_quota(upstream, monkeypatch):
+    priorities = []
+
+    async def fetch_quotes(symbols, priority):
+        priorities.append(priority)
+        return {"AAPL": {"latest_trading_day": "2025-01-10", "price": 110.0, "previous_close": 100.0, "volume": 5, "price_5_days_ago": 90.0}}
+
+    async def refresh():
+        # As if the cached snapshot had expired
+        await stock_services.cache.invalidate("live_market_prices", "quotes")
+        return await stock_services.fetch_live_market_prices()
+
+    monkeypatch.setattr(stock_services, "fetch_quotes", fetch_quotes)
+    monkeypatch.setattr(stock_services, "LIVE_MARKET_SYMBOLS", ["AAPL", "MSFT"])
+    governor = RequestGovernor(per_minute=5, per_day=10)
+    monkeypatch.setattr(helpers, "governor", governor)
+
+    await stock_services.fetch_live_market_prices()
+    assert priorities == [PRIORITY_BACKGROUND]
+
+    # Two symbols at half of 5 requests a minute: 48s between refreshes
+    assert await refresh() == {"AAPL": {"current_price": 110.0, "price_5_days_ago": 90.0}}
+    assert len(priorities) == 1
+
+    # Spacing passed, but analyses used 4 of the 10 daily requests and the refresh needs 2 more
+    stock_services._live_snapshot["fetched_at"] -= 60
+    for _ in range(4):
+        await governor.acquire()
+    await refresh()
+    assert len(priorities) == 1
+
+    monkeypatch.setattr(helpers, "governor", RequestGovernor(per_minute=5, per_day=10))
+    await refresh()
+    assert len(priorities) == 2
+
+
+def test_websocket_receives_snapshot_and_filter_changes(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.alphaVantage.routes import stock_routes
+    from src.utils.price_hub import PriceHub
+
+    async def feed():
+        return {"AAPL": {"current_price": 1.0}, "MSFT": {"current_price": 2.0}}
+
+    hub = PriceHub(feed, interval=60)
+    hub.snapshot = {"AAPL": {"current_price": 1.0}, "MSFT": {"current_price": 2.0}}
+    monkeypatch.setattr(stock_routes, "price_hub", hub)
+    app = FastAPI()
+    app.include_router(stock_routes.router)
+
+    with TestClient(app).websocket_connect("/ws/live-market-prices?symbols=AAPL") as websocket:
+        assert websocket.receive_json() == {"type": "snapshot", "prices": {"AAPL": {"current_price": 1.0}}}
+        websocket.send_json({"symbols": ["MSFT"]})
+        message = websocket.receive_json()
+        # The first poll may land before the new filter; skip its delta
+        while message["type"] != "snapshot":
+            message = websocket.receive_json()
+        assert message == {"type": "snapshot", "prices": {"MSFT": {"current_price": 2.0}}}
+
+
+@pytest.mark.asyncio
+async def test_sse_disconnect_releases_the_subscription(monkeypatch):
+    from src.alphaVantage.routes import stock_routes
+    from src.utils.price_hub import PriceHub
+
+    async def feed():
+        return {"AAPL": {"current_price": 1.0}}
+
+    hub = PriceHub(feed, interval=60)
+    hub.snapshot = {"AAPL": {"current_price": 1.0}}
+    monkeypatch.setattr(stock_routes, "price_hub", hub)
+    monkeypatch.setattr(stock_routes, "SSE_HEARTBEAT_SECONDS", 0.01)
+
+    response = await stock_routes.stream_live_market_prices(symbols=None)
+    events = response.body_iterator
+    assert await events.__anext__() == 'event: snapshot\ndata: {"AAPL": {"current_price": 1.0}}\n\n'
+    assert await events.__anext__() == ": keep-alive\n\n"
+
+    # The client goes away while the stream waits for the next message
+    pending = asyncio.ensure_future(events.__anext__())
+    await asyncio.sleep(0)
+    pending.cancel()
+    (result,) = await asyncio.gather(pending, return_exceptions=True)
+    assert isinstance(result, asyncio.CancelledError)
+    await events.aclose()
+    assert not hub._subscribers
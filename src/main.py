@@ -4,14 +4,51 @@ from typing import List
 import uvicorn
 from dotenv import load_dotenv
 import os
+import asyncio
 from src.alphaVantage.routes import stock_routes
 from motor.motor_asyncio import AsyncIOMotorClient
 from contextlib import asynccontextmanager
 from logging import info
+from src.utils.http_client import start_http_client, close_http_client
+from src.LLM.llm_client import start_llm_client, close_llm_client
+from src.LLM.response_cache import llm_response_cache
+from src.LLM.semantic_cache import semantic_cache
+from src.LLM.analysis_jobs import analysis_jobs
+from src.LLM.model_manager import model_manager
+from src.LLM.llm_router import llm_router
+from src.LLM.LLM_service import DEEPSEEK_MODEL, LLM_MODEL
+from src.utils.cache import cache
+from src.mongoDB.price_bars import price_bar_store
+from src.alphaVantage.services.stock_services import price_hub
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open shared upstream connections on startup and release them on shutdown.
+    """
+    await start_http_client()
+    await start_llm_client()
+    await cache.start()
+    await llm_response_cache.start()
+    await semantic_cache.start()
+    await analysis_jobs.start()
+    await llm_router.start()
+    await model_manager.start([LLM_MODEL, DEEPSEEK_MODEL])
+    try:
+        await asyncio.wait_for(price_bar_store.ensure_indexes(), 5)
+    except Exception as e:
+        info(f"Price bar indexes not created: {e}")
+    yield
+    await price_hub.stop()
+    await analysis_jobs.stop()
+    await model_manager.stop()
+    await llm_router.stop()
+    await close_llm_client()
+    await close_http_client()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 origins = [
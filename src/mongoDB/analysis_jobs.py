@@ -0,0 +1,125 @@
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "mongo" in production, "memory" as a local stand-in for tests and offline development
+ANALYSIS_JOB_STORE = os.getenv("ANALYSIS_JOB_STORE", "mongo")
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+class AnalysisJobStore:
+    """
+    Analysis jobs in the `analysis_jobs` collection. Finished jobs are removed by a TTL
+    index on `expires_at`.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("ticker", 1), ("submitted_at", -1)])
+        await self.collection.create_index("status")
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def save(self, job: dict):
+        await self.collection.replace_one({"_id": job["_id"]}, job, upsert=True)
+
+    async def get(self, job_id: str):
+        return await self.collection.find_one({"_id": job_id})
+
+    async def update(self, job_id: str, fields: dict):
+        await self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    async def claim(self, job_id: str, fields: dict):
+        """
+        Atomically move a queued job to running; None if another worker got it first.
+        """
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {**fields, "status": "running"}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def find_reusable(self, ticker: str, now: float, stale_before: float):
+        """
+        The newest job for `ticker` that is queued, running with a heartbeat after
+        `stale_before`, or done with a result that is still fresh.
+        """
+        return await self.collection.find_one(
+            {
+                "ticker": ticker,
+                "$or": [
+                    {"status": "queued"},
+                    {"status": "running", "heartbeat_at": {"$gt": stale_before}},
+                    {"status": "done", "fresh_until": {"$gt": now}},
+                ],
+            },
+            sort=[("submitted_at", -1)],
+        )
+
+    async def unfinished(self):
+        return await self.collection.find({"status": {"$in": ACTIVE_STATUSES}}).sort("submitted_at", 1).to_list(length=None)
+
+
+class MemoryAnalysisJobStore:
+    """
+    In-process stand-in with the same interface as AnalysisJobStore.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def save(self, job: dict):
+        self._jobs[job["_id"]] = dict(job)
+
+    async def get(self, job_id: str):
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    async def update(self, job_id: str, fields: dict):
+        if job_id in self._jobs:
+            self._jobs[job_id].update(fields)
+
+    async def claim(self, job_id: str, fields: dict):
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != "queued":
+            return None
+        job.update(fields, status="running", attempts=job.get("attempts", 0) + 1)
+        return dict(job)
+
+    async def find_reusable(self, ticker: str, now: float, stale_before: float):
+        jobs = [
+            job for job in self._jobs.values()
+            if job["ticker"] == ticker
+            and (
+                job["status"] == "queued"
+                or (job["status"] == "running" and (job.get("heartbeat_at") or 0) > stale_before)
+                or (job["status"] == "done" and (job.get("fresh_until") or 0) > now)
+            )
+        ]
+        return dict(max(jobs, key=lambda job: job["submitted_at"])) if jobs else None
+
+    async def unfinished(self):
+        jobs = [dict(job) for job in self._jobs.values() if job["status"] in ACTIVE_STATUSES]
+        return sorted(jobs, key=lambda job: job["submitted_at"])
+
+
+def _build_store():
+    if ANALYSIS_JOB_STORE == "memory":
+        return MemoryAnalysisJobStore()
+    return AnalysisJobStore(AsyncIOMotorClient(os.getenv("MONGODB_URI")).tradely.analysis_jobs)
+
+
+# Shared job store for src/LLM/analysis_jobs.py
+analysis_job_store = _build_store()
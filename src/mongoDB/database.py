@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_NAME = "tradely"
-COLLECTION_NAMES = {'historical_data', 'stock_metadata'}
+COLLECTION_NAMES = {'historical_data', 'stock_metadata', 'price_bars', 'indicator_state', 'indicator_snapshots', 'llm_responses', 'semantic_cache', 'analysis_jobs'}
 
 class DatabaseManager:
     def __init__(self):
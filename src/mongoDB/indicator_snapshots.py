@@ -0,0 +1,67 @@
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "mongo" in production, "memory" as a local stand-in for tests and offline development
+INDICATOR_SNAPSHOT_STORE = os.getenv("INDICATOR_SNAPSHOT_STORE", "mongo")
+
+
+class IndicatorSnapshotStore:
+    """
+    Latest batch-computed indicator values in the `indicator_snapshots` collection, one
+    document per (ticker, interval), for screens to query and sort on.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def save_many(self, interval: str, snapshot: dict) -> int:
+        """
+        Write every ticker's values in one bulk request. Returns how many were written.
+        """
+        operations = [
+            ReplaceOne({"_id": f"{ticker}:{interval}"}, {"ticker": ticker, "interval": interval, **values}, upsert=True)
+            for ticker, values in snapshot.items()
+        ]
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    async def load(self, ticker: str, interval: str):
+        return await self.collection.find_one({"_id": f"{ticker}:{interval}"}, {"_id": 0})
+
+
+class MemoryIndicatorSnapshotStore:
+    """
+    In-process stand-in with the same interface as IndicatorSnapshotStore.
+    """
+
+    def __init__(self):
+        self._snapshots = {}
+
+    async def save_many(self, interval: str, snapshot: dict) -> int:
+        for ticker, values in snapshot.items():
+            self._snapshots[(ticker, interval)] = {"ticker": ticker, "interval": interval, **values}
+        return len(snapshot)
+
+    async def load(self, ticker: str, interval: str):
+        snapshot = self._snapshots.get((ticker, interval))
+        return dict(snapshot) if snapshot is not None else None
+
+
+def _build_store():
+    if INDICATOR_SNAPSHOT_STORE == "memory":
+        return MemoryIndicatorSnapshotStore()
+    return IndicatorSnapshotStore(AsyncIOMotorClient(os.getenv("MONGODB_URI")).tradely.indicator_snapshots)
+
+
+# Shared store for the batch indicator engine
+indicator_snapshot_store = _build_store()
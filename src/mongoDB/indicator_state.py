@@ -0,0 +1,60 @@
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "mongo" in production, "memory" as a local stand-in for tests and offline development
+INDICATOR_STATE_STORE = os.getenv("INDICATOR_STATE_STORE", "mongo")
+
+
+class IndicatorStateStore:
+    """
+    Checkpoints of rolling indicator state in the `indicator_state` collection, one
+    document per (ticker, indicator, interval, period, series type).
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def load(self, key: str):
+        return await self.collection.find_one({"_id": key}, {"_id": 0})
+
+    async def save(self, key: str, state: dict):
+        await self.collection.replace_one({"_id": key}, state, upsert=True)
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+
+class MemoryIndicatorStateStore:
+    """
+    In-process stand-in with the same interface as IndicatorStateStore.
+    """
+
+    def __init__(self):
+        self._states = {}
+
+    async def load(self, key: str):
+        state = self._states.get(key)
+        return dict(state) if state is not None else None
+
+    async def save(self, key: str, state: dict):
+        self._states[key] = dict(state)
+
+    async def delete(self, key: str):
+        self._states.pop(key, None)
+
+
+def _build_store():
+    if INDICATOR_STATE_STORE == "memory":
+        return MemoryIndicatorStateStore()
+    return IndicatorStateStore(AsyncIOMotorClient(os.getenv("MONGODB_URI")).tradely.indicator_state)
+
+
+# Shared checkpoint store for src/utils/rolling_indicators.py
+indicator_state_store = _build_store()
@@ -0,0 +1,72 @@
+import logging
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "mongo" in production, "memory" as a local stand-in for tests and offline development
+LLM_RESPONSE_STORE = os.getenv("LLM_RESPONSE_STORE", "mongo")
+
+
+class LLMResponseStore:
+    """
+    Cached model responses in the `llm_responses` collection, one document per prompt
+    fingerprint, removed by a MongoDB TTL index once `expires_at` passes.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def load(self, key: str):
+        # The TTL monitor only runs once a minute, so expired documents are filtered here too
+        return await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"_id": 0}
+        )
+
+    async def save(self, key: str, response: dict):
+        await self.collection.replace_one({"_id": key}, response, upsert=True)
+
+    async def delete(self, key: str):
+        await self.collection.delete_one({"_id": key})
+
+
+class MemoryLLMResponseStore:
+    """
+    In-process stand-in with the same interface as LLMResponseStore.
+    """
+
+    def __init__(self):
+        self._responses = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def load(self, key: str):
+        response = self._responses.get(key)
+        if response is None or response["expires_at"] <= datetime.now(timezone.utc):
+            return None
+        return dict(response)
+
+    async def save(self, key: str, response: dict):
+        self._responses[key] = dict(response)
+
+    async def delete(self, key: str):
+        self._responses.pop(key, None)
+
+
+def _build_store():
+    if LLM_RESPONSE_STORE == "memory":
+        return MemoryLLMResponseStore()
+    return LLMResponseStore(AsyncIOMotorClient(os.getenv("MONGODB_URI")).tradely.llm_responses)
+
+
+# Shared store for src/LLM/response_cache.py
+llm_response_store = _build_store()
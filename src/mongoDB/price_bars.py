@@ -0,0 +1,175 @@
+import bisect
+import logging
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "mongo" in production, "memory" as a local stand-in for tests and offline development
+PRICE_BAR_STORE = os.getenv("PRICE_BAR_STORE", "mongo")
+
+BAR_FIELDS = ("open", "high", "low", "close", "adjusted_close", "volume", "dividend_amount")
+
+
+class PriceBarStore:
+    """
+    One document per (ticker, interval, date) bar in the `price_bars` collection.
+
+    Dates are ISO strings, so they sort chronologically and range queries, sorting and
+    limits are all answered by the compound index instead of in Python.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("ticker", ASCENDING), ("interval", ASCENDING), ("date", DESCENDING)],
+            unique=True,
+            name="ticker_interval_date",
+        )
+
+    async def upsert_bars(self, ticker: str, interval: str, bars) -> int:
+        """
+        Insert or update bars by date. Re-writing an unchanged bar is a no-op, so this is
+        safe to call with overlapping batches. Returns how many bars were new or changed.
+        """
+        operations = [
+            UpdateOne(
+                {"ticker": ticker, "interval": interval, "date": bar["date"]},
+                {"$set": {field: bar[field] for field in BAR_FIELDS if field in bar}},
+                upsert=True,
+            )
+            for bar in bars
+        ]
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    async def replace_bars(self, ticker: str, interval: str, bars) -> int:
+        """
+        Drop every stored bar for the series and write `bars` in its place.
+        """
+        await self.collection.delete_many({"ticker": ticker, "interval": interval})
+        return await self.upsert_bars(ticker, interval, bars)
+
+    async def delete_bars(self, ticker: str, interval: str, dates):
+        await self.collection.delete_many({"ticker": ticker, "interval": interval, "date": {"$in": list(dates)}})
+
+    async def latest_bars(self, ticker: str, interval: str, limit: int):
+        """
+        The newest `limit` bars, newest first.
+        """
+        cursor = (
+            self.collection.find({"ticker": ticker, "interval": interval}, {"_id": 0, "ticker": 0, "interval": 0})
+            .sort("date", DESCENDING)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+
+    async def bars_in_range(self, ticker: str, interval: str, start: str = None, end: str = None, limit: int = 0):
+        """
+        Bars with start <= date <= end, newest first.
+        """
+        query = {"ticker": ticker, "interval": interval}
+        if start or end:
+            query["date"] = {}
+            if start:
+                query["date"]["$gte"] = start
+            if end:
+                query["date"]["$lte"] = end
+        cursor = self.collection.find(query, {"_id": 0, "ticker": 0, "interval": 0}).sort("date", DESCENDING)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit or None)
+
+    async def last_bar(self, ticker: str, interval: str):
+        bars = await self.latest_bars(ticker, interval, 1)
+        return bars[0] if bars else None
+
+    async def bars_for_tickers(self, tickers, interval: str, start: str = None):
+        """
+        {ticker: bars newest first} for many tickers in a single query.
+        """
+        query = {"ticker": {"$in": list(tickers)}, "interval": interval}
+        if start:
+            query["date"] = {"$gte": start}
+        cursor = self.collection.find(query, {"_id": 0, "interval": 0}).sort([("ticker", ASCENDING), ("date", DESCENDING)])
+        series = {ticker: [] for ticker in tickers}
+        async for bar in cursor:
+            series[bar.pop("ticker")].append(bar)
+        return series
+
+
+class MemoryPriceBarStore:
+    """
+    In-process stand-in with the same interface as PriceBarStore.
+    """
+
+    def __init__(self):
+        # {(ticker, interval): (sorted dates, {date: bar})}
+        self._series = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    def _get(self, ticker, interval):
+        return self._series.setdefault((ticker, interval), ([], {}))
+
+    async def upsert_bars(self, ticker: str, interval: str, bars) -> int:
+        dates, by_date = self._get(ticker, interval)
+        changed = 0
+        for bar in bars:
+            stored = {field: bar[field] for field in BAR_FIELDS if field in bar}
+            stored["date"] = bar["date"]
+            if bar["date"] not in by_date:
+                bisect.insort(dates, bar["date"])
+            if by_date.get(bar["date"]) != stored:
+                by_date[bar["date"]] = stored
+                changed += 1
+        return changed
+
+    async def replace_bars(self, ticker: str, interval: str, bars) -> int:
+        self._series.pop((ticker, interval), None)
+        return await self.upsert_bars(ticker, interval, bars)
+
+    async def delete_bars(self, ticker: str, interval: str, dates):
+        stored_dates, by_date = self._get(ticker, interval)
+        for date in dates:
+            if by_date.pop(date, None) is not None:
+                stored_dates.remove(date)
+
+    async def latest_bars(self, ticker: str, interval: str, limit: int):
+        return await self.bars_in_range(ticker, interval, limit=limit)
+
+    async def bars_in_range(self, ticker: str, interval: str, start: str = None, end: str = None, limit: int = 0):
+        dates, by_date = self._get(ticker, interval)
+        low = bisect.bisect_left(dates, start) if start else 0
+        high = bisect.bisect_right(dates, end) if end else len(dates)
+        selected = dates[low:high][::-1]
+        if limit:
+            selected = selected[:limit]
+        return [dict(by_date[date]) for date in selected]
+
+    async def last_bar(self, ticker: str, interval: str):
+        bars = await self.latest_bars(ticker, interval, 1)
+        return bars[0] if bars else None
+
+    async def bars_for_tickers(self, tickers, interval: str, start: str = None):
+        return {ticker: await self.bars_in_range(ticker, interval, start=start) for ticker in tickers}
+
+
+def _build_store():
+    if PRICE_BAR_STORE == "memory":
+        return MemoryPriceBarStore()
+    return PriceBarStore(AsyncIOMotorClient(os.getenv("MONGODB_URI")).tradely.price_bars)
+
+
+# Shared store for every price history reader and writer
+price_bar_store = _build_store()
@@ -0,0 +1,74 @@
+import logging
+import os
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# "mongo" in production, "memory" as a local stand-in for tests and offline development
+SEMANTIC_CACHE_STORE = os.getenv("SEMANTIC_CACHE_STORE", "mongo")
+
+
+class SemanticCacheStore:
+    """
+    Question/answer pairs and their embeddings in the `semantic_cache` collection, so the
+    in-memory index survives restarts. Documents are removed by a TTL index on `expires_at`.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def load_recent(self, limit: int):
+        """
+        Unexpired entries, most recently used first.
+        """
+        cursor = self.collection.find({"expires_at": {"$gt": datetime.now(timezone.utc)}})
+        return await cursor.sort("last_used", -1).to_list(length=limit)
+
+    async def save(self, entry: dict):
+        await self.collection.replace_one({"_id": entry["_id"]}, entry, upsert=True)
+
+    async def delete_many(self, ids):
+        if ids:
+            await self.collection.delete_many({"_id": {"$in": list(ids)}})
+
+
+class MemorySemanticCacheStore:
+    """
+    In-process stand-in with the same interface as SemanticCacheStore.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def load_recent(self, limit: int):
+        now = datetime.now(timezone.utc)
+        entries = [dict(entry) for entry in self._entries.values() if entry["expires_at"] > now]
+        return sorted(entries, key=lambda entry: entry["last_used"], reverse=True)[:limit]
+
+    async def save(self, entry: dict):
+        self._entries[entry["_id"]] = dict(entry)
+
+    async def delete_many(self, ids):
+        for entry_id in ids:
+            self._entries.pop(entry_id, None)
+
+
+def _build_store():
+    if SEMANTIC_CACHE_STORE == "memory":
+        return MemorySemanticCacheStore()
+    return SemanticCacheStore(AsyncIOMotorClient(os.getenv("MONGODB_URI")).tradely.semantic_cache)
+
+
+# Shared store for src/LLM/semantic_cache.py
+semantic_cache_store = _build_store()
@@ -0,0 +1,63 @@
+import numpy as np
+from fastapi import HTTPException
+import pytest
+
+from src.mongoDB.indicator_snapshots import MemoryIndicatorSnapshotStore
+from src.mongoDB.price_bars import MemoryPriceBarStore
+from src.utils import batch_indicators, indicators
+from src.alphaVantage.services.batch_indicator_services import run_batch_indicators
+
+
+def bars(days, values):
+    return [{"date": day, "close": value} for day, value in zip(days, values)][::-1]
+
+
+DAYS = [f"2025-01-{day:02d}" for day in range(1, 31)]
+
+
+def test_columns_match_single_ticker_engine():
+    rng = np.random.default_rng(11)
+    series = {ticker: bars(DAYS, 100 + np.cumsum(rng.normal(0, 1, 30))) for ticker in ("AAA", "BBB", "CCC")}
+    dates, tickers, matrix = batch_indicators.align(series)
+    results = batch_indicators.compute(matrix, ["SMA_5", "EMA_5", "RSI_5"])
+    for column, ticker in enumerate(tickers):
+        closes = matrix[:, column]
+        np.testing.assert_allclose(results["SMA_5"][:, column], indicators.sma(closes, 5), equal_nan=True)
+        np.testing.assert_allclose(results["EMA_5"][:, column], indicators.ema(closes, 5), equal_nan=True)
+        np.testing.assert_allclose(results["RSI_5"][:, column], indicators.rsi(closes, 5), equal_nan=True)
+
+
+def test_ragged_histories_and_missing_bars():
+    late = bars(DAYS[10:], np.arange(20.0))       # listed later
+    gappy = bars(DAYS[:5] + DAYS[6:], np.arange(29.0))  # one missing bar
+    delisted = bars(DAYS[:20], np.arange(20.0))   # stopped trading
+    dates, tickers, matrix = batch_indicators.align({"LATE": late, "GAP": gappy, "GONE": delisted})
+    filled = batch_indicators.fill_gaps(matrix)
+    gap, gone, late_column = tickers.index("GAP"), tickers.index("GONE"), tickers.index("LATE")
+
+    assert filled[5, gap] == filled[4, gap] == 4.0
+    assert np.isnan(filled[20:, gone]).all()
+    assert np.isnan(filled[:10, late_column]).all()
+
+    ema = batch_indicators.ema(filled, 3)
+    # Each column warms up from its own first bar
+    assert np.isnan(ema[:12, late_column]).all()
+    assert ema[12, late_column] == pytest.approx(1.0)
+    assert np.isnan(ema[20:, gone]).all()
+
+
+@pytest.mark.asyncio
+async def test_batch_run_writes_latest_values_in_bulk():
+    store = MemoryPriceBarStore()
+    snapshots = MemoryIndicatorSnapshotStore()
+    for ticker, offset in (("AAA", 0.0), ("BBB", 100.0)):
+        await store.upsert_bars(ticker, "daily", [{"date": day, "close": offset + i} for i, day in enumerate(DAYS)])
+
+    result = await run_batch_indicators(["aaa", "BBB", "ZZZ"], "daily", ["sma_5", "RSI_14"], bars=store, snapshots=snapshots)
+    assert result["computed"] == 2
+    assert result["missing"] == ["ZZZ"]
+    assert result["values"]["BBB"] == {"date": "2025-01-30", "close": 129.0, "SMA_5": 127.0, "RSI_14": 100.0}
+    assert (await snapshots.load("AAA", "daily"))["SMA_5"] == 27.0
+
+    with pytest.raises(HTTPException):
+        await run_batch_indicators(["AAA"], "daily", ["VWAP_5"], bars=store, snapshots=snapshots)
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from src.utils.cache import TieredCache, MemoryBackend, CachePolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def counting_fetcher(values):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return values[len(calls) - 1]
+
+    return fetch, calls
+
+
+@pytest.mark.asyncio
+async def test_fresh_entries_are_served_from_l1():
+    cache = TieredCache(l2=MemoryBackend(), policies={"news": CachePolicy(ttl=60)}, clock=FakeClock())
+    fetch, calls = counting_fetcher(["first"])
+    assert await cache.get_or_fetch("news", "AAPL", fetch) == "first"
+    assert await cache.get_or_fetch("news", "AAPL", fetch) == "first"
+    assert len(calls) == 1
+    assert cache.stats["l1_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_l2_is_shared_between_caches():
+    l2 = MemoryBackend()
+    clock = FakeClock()
+    worker_a = TieredCache(l2=l2, policies={}, clock=clock)
+    worker_b = TieredCache(l2=l2, policies={}, clock=clock)
+    fetch, calls = counting_fetcher(["value"])
+    await worker_a.get_or_fetch("metadata", "AAPL", fetch)
+    assert await worker_b.get_or_fetch("metadata", "AAPL", fetch) == "value"
+    assert len(calls) == 1
+    assert worker_b.stats["l2_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_are_served_while_revalidating():
+    clock = FakeClock()
+    cache = TieredCache(policies={"sma": CachePolicy(ttl=60, stale_ttl=600)}, clock=clock)
+    fetch, calls = counting_fetcher(["old", "new"])
+    await cache.get_or_fetch("sma", "AAPL", fetch)
+
+    clock.now += 120
+    assert await cache.get_or_fetch("sma", "AAPL", fetch) == "old"
+    await asyncio.sleep(0.01)
+    assert len(calls) == 2
+    assert await cache.get_or_fetch("sma", "AAPL", fetch) == "new"
+
+    # Past the stale window the caller waits for a fresh fetch
+    clock.now += 10_000
+    fetch, calls = counting_fetcher(["newest"])
+    assert await cache.get_or_fetch("sma", "AAPL", fetch) == "newest"
+
+
+@pytest.mark.asyncio
+async def test_l1_is_bounded_by_bytes():
+    cache = TieredCache(max_bytes=100, policies={}, clock=FakeClock())
+    for i in range(10):
+        fetch, _ = counting_fetcher(["x" * 30])
+        await cache.get_or_fetch("news", str(i), fetch)
+    assert cache.l1.currsize <= 100
+    assert len(cache.l1) < 10
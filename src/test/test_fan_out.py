@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from src.utils.fan_out import fan_out
+
+
+async def value_after(value, delay):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def fail_after(delay):
+    await asyncio.sleep(delay)
+    raise RuntimeError("upstream down")
+
+
+@pytest.mark.asyncio
+async def test_fan_out_runs_sections_concurrently():
+    results, report = await fan_out(
+        {"a": value_after(1, 0.1), "b": value_after(2, 0.1), "c": value_after(3, 0.1)},
+        deadline=1,
+    )
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert all(section["status"] == "ok" for section in report["sections"].values())
+    # Three 100 ms sections should cost roughly one, not three
+    assert report["elapsed_ms"] < 250
+
+
+@pytest.mark.asyncio
+async def test_fan_out_returns_partial_results():
+    results, report = await fan_out(
+        {"fast": value_after("ok", 0), "broken": fail_after(0), "slow": value_after("late", 5)},
+        deadline=0.2,
+    )
+    assert results == {"fast": "ok", "broken": None, "slow": None}
+    assert report["sections"]["broken"]["status"] == "error"
+    assert report["sections"]["broken"]["error"] == "upstream down"
+    assert report["sections"]["slow"]["status"] == "timeout"
+    assert report["elapsed_ms"] < 1000
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.utils import indicators
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    close = 100 + np.cumsum(rng.normal(0, 1, 200))
+    high = close + rng.uniform(0, 2, 200)
+    low = close - rng.uniform(0, 2, 200)
+    return high, low, close
+
+
+def test_sma_matches_window_mean(prices):
+    _, _, close = prices
+    result = indicators.sma(close, 20)
+    assert np.isnan(result[:19]).all()
+    expected = [close[i - 19:i + 1].mean() for i in range(19, len(close))]
+    np.testing.assert_allclose(result[19:], expected)
+
+
+def test_ema_is_seeded_with_sma(prices):
+    _, _, close = prices
+    result = indicators.ema(close, 10)
+    assert np.isnan(result[:9]).all()
+    assert result[9] == pytest.approx(close[:10].mean())
+    assert result[10] == pytest.approx(result[9] + 2 / 11 * (close[10] - result[9]))
+
+
+def test_rsi_bounds_and_monotonic_series():
+    rising = np.arange(1.0, 40.0)
+    assert indicators.rsi(rising, 14)[-1] == 100.0
+    falling = rising[::-1]
+    assert indicators.rsi(falling, 14)[-1] == pytest.approx(0.0)
+
+
+def test_bollinger_uses_population_deviation(prices):
+    _, _, close = prices
+    upper, middle, lower = indicators.bollinger(close, 20, 2)
+    window = close[-20:]
+    assert middle[-1] == pytest.approx(window.mean())
+    assert upper[-1] - middle[-1] == pytest.approx(2 * window.std())
+    assert middle[-1] - lower[-1] == pytest.approx(2 * window.std())
+
+
+def test_macd_histogram_and_atr_shapes(prices):
+    high, low, close = prices
+    line, signal, histogram = indicators.macd(close)
+    np.testing.assert_allclose(histogram[~np.isnan(histogram)], (line - signal)[~np.isnan(histogram)])
+    assert np.isnan(signal[:33]).all() and not np.isnan(signal[33])
+
+    result = indicators.atr(high, low, close, 14)
+    assert np.isnan(result[:13]).all()
+    assert (result[13:] > 0).all()
+
+
+def test_compute_indicator_formats_like_alpha_vantage():
+    bars = [{"date": f"2025-01-{day:02d}", "open": 1, "high": 2, "low": 0, "close": day} for day in range(10, 0, -1)]
+    result = indicators.compute_indicator("SMA", bars, 3)
+    assert list(result) == [f"2025-01-{day:02d}" for day in range(10, 2, -1)]
+    assert result["2025-01-10"] == {"SMA": "9.0000"}
+    assert indicators.compute_indicator("SMA", [], 3) == {}
@@ -0,0 +1,57 @@
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+from src.utils.market_calendar import (
+    us_market_holidays,
+    is_market_open,
+    next_open,
+    freshness_ttl,
+    exchange_for,
+)
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def test_us_market_holidays():
+    holidays = us_market_holidays(2025)
+    assert date(2025, 1, 1) in holidays
+    assert date(2025, 4, 18) in holidays  # Good Friday
+    assert date(2025, 6, 19) in holidays  # Juneteenth
+    assert date(2025, 11, 27) in holidays  # Thanksgiving
+    assert date(2026, 7, 3) in us_market_holidays(2026)  # July 4th observed on the Friday
+
+
+def test_session_hours():
+    assert is_market_open(datetime(2025, 3, 12, 10, 0, tzinfo=NEW_YORK))
+    assert not is_market_open(datetime(2025, 3, 12, 17, 0, tzinfo=NEW_YORK))
+    assert not is_market_open(datetime(2025, 3, 15, 11, 0, tzinfo=NEW_YORK))  # Saturday
+    assert not is_market_open(datetime(2025, 12, 25, 11, 0, tzinfo=NEW_YORK))
+    assert not is_market_open(datetime(2025, 11, 28, 14, 0, tzinfo=NEW_YORK))  # early close
+    # Friday evening waits until Monday's open
+    assert next_open(datetime(2025, 3, 14, 18, 0, tzinfo=NEW_YORK)) == datetime(2025, 3, 17, 9, 30, tzinfo=NEW_YORK)
+
+
+def test_intraday_freshness_follows_the_session():
+    during = datetime(2025, 3, 12, 10, 0, tzinfo=NEW_YORK)
+    overnight = datetime(2025, 3, 12, 20, 0, tzinfo=NEW_YORK)
+    assert freshness_ttl("live_market_prices", "AAPL", now=during) == 60
+    assert freshness_ttl("live_market_prices", "AAPL", now=overnight) == 13.5 * 3600
+
+
+def test_end_of_day_freshness_waits_for_the_next_bar():
+    after_close = datetime(2025, 3, 12, 16, 10, tzinfo=NEW_YORK)
+    assert freshness_ttl("historical_data", "AAPL", now=after_close) == 20 * 60
+    after_publish = datetime(2025, 3, 12, 17, 0, tzinfo=NEW_YORK)
+    assert freshness_ttl("historical_data", "AAPL", now=after_publish) == timedelta(hours=23, minutes=30).total_seconds()
+
+
+def test_fundamentals_expire_at_the_next_filing():
+    now = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    recent = {"annual_reports": [{"fiscalDateEnding": "2024-12-31"}]}
+    overdue = {"annual_reports": [{"fiscalDateEnding": "2023-06-30"}]}
+    assert freshness_ttl("income_statement", "AAPL", recent, now) == timedelta(days=30).total_seconds()
+    assert freshness_ttl("income_statement", "AAPL", overdue, now) == timedelta(days=1).total_seconds()
+
+
+def test_exchange_suffixes():
+    assert exchange_for("AAPL").name == "NYSE"
+    assert exchange_for("TSCO.LON").name == "LSE"
@@ -0,0 +1,28 @@
+import pytest
+from src.mongoDB.price_bars import MemoryPriceBarStore
+
+
+def bar(date, close):
+    return {"date": date, "open": close, "high": close, "low": close, "close": close,
+            "adjusted_close": close, "volume": 100, "dividend_amount": 0.0}
+
+
+@pytest.mark.asyncio
+async def test_latest_and_range_queries():
+    store = MemoryPriceBarStore()
+    await store.upsert_bars("AAPL", "weekly", [bar(f"2025-01-{day:02d}", day) for day in (3, 10, 17, 24, 31)])
+
+    latest = await store.latest_bars("AAPL", "weekly", 2)
+    assert [b["date"] for b in latest] == ["2025-01-31", "2025-01-24"]
+
+    window = await store.bars_in_range("AAPL", "weekly", start="2025-01-10", end="2025-01-24")
+    assert [b["date"] for b in window] == ["2025-01-24", "2025-01-17", "2025-01-10"]
+    assert await store.latest_bars("AAPL", "daily", 5) == []
+
+
+@pytest.mark.asyncio
+async def test_upserts_are_idempotent():
+    store = MemoryPriceBarStore()
+    assert await store.upsert_bars("AAPL", "weekly", [bar("2025-01-03", 1), bar("2025-01-10", 2)]) == 2
+    assert await store.upsert_bars("AAPL", "weekly", [bar("2025-01-10", 2), bar("2025-01-17", 3)]) == 1
+    assert (await store.last_bar("AAPL", "weekly"))["close"] == 3
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+
+from src.utils.price_hub import PriceHub
+
+
+class FakeFeed:
+    def __init__(self, *rounds):
+        self.rounds = list(rounds)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.rounds[min(self.calls, len(self.rounds)) - 1]
+
+
+@pytest.mark.asyncio
+async def test_one_poller_feeds_every_client_with_deltas():
+    feed = FakeFeed(
+        {"AAPL": {"current_price": 1}, "MSFT": {"current_price": 2}},
+        {"AAPL": {"current_price": 1}, "MSFT": {"current_price": 3}},
+    )
+    hub = PriceHub(feed, interval=0.01)
+    everything = hub.subscribe()
+    apple_only = hub.subscribe(["aapl"])
+
+    assert await everything.queue.get() == {"type": "delta", "prices": {"AAPL": {"current_price": 1}, "MSFT": {"current_price": 2}}}
+    assert await everything.queue.get() == {"type": "delta", "prices": {"MSFT": {"current_price": 3}}}
+    assert await apple_only.queue.get() == {"type": "delta", "prices": {"AAPL": {"current_price": 1}}}
+    # AAPL never changed again, so the filtered client gets nothing more
+    await asyncio.sleep(0.05)
+    assert apple_only.queue.empty()
+
+    late = hub.subscribe(["MSFT"])
+    assert late.queue.get_nowait() == {"type": "snapshot", "prices": {"MSFT": {"current_price": 3}}}
+    # Polls depend on time, not on how many clients are connected
+    assert hub.status()["subscribers"] == 3
+
+    for subscription in (everything, apple_only, late):
+        hub.unsubscribe(subscription)
+    assert hub.status()["polling"] is False
+    await hub.stop()
+
+
+@pytest.mark.asyncio
+async def test_slow_client_is_resynced_instead_of_blocking():
+    hub = PriceHub(FakeFeed({}), interval=60, queue_size=2)
+    slow = hub.subscribe()
+    for price in range(5):
+        hub.publish({"AAPL": {"current_price": price}})
+    assert slow.queue.qsize() <= 2
+    assert slow.resyncs >= 1
+    messages = [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+    assert messages[-1]["prices"] == {"AAPL": {"current_price": 4}}
+    hub.unsubscribe(slow)
+    await hub.stop()
@@ -0,0 +1,55 @@
+from src.utils.quote_board import QuoteBoard
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def board_with_quotes(clock=None):
+    board = QuoteBoard(clock=clock or FakeClock())
+    board.update("AAA", 110, 100, volume=500)   # +10%
+    board.update("BBB", 95, 100, volume=2000)   # -5%
+    board.update("CCC", 102, 100, volume=100)   # +2%
+    board.update("DDD", 80, 100, volume=50)     # -20%
+    return board
+
+
+def test_rankings_read_from_both_ends():
+    board = board_with_quotes()
+    assert [row["ticker"] for row in board.gainers(5)] == ["AAA", "CCC"]
+    assert [row["ticker"] for row in board.losers(1)] == ["DDD"]
+    assert [row["ticker"] for row in board.most_active(2)] == ["BBB", "AAA"]
+    assert board.gainers(1)[0] == {"ticker": "AAA", "price": 110.0, "change_amount": 10.0, "change_percentage": 10.0, "volume": 500}
+
+
+def test_updates_move_symbols_between_lists():
+    board = board_with_quotes()
+    board.update("DDD", 130, 100, volume=5000)
+    assert [row["ticker"] for row in board.gainers(5)] == ["DDD", "AAA", "CCC"]
+    assert [row["ticker"] for row in board.losers(5)] == ["BBB"]
+    assert board.most_active(1)[0]["ticker"] == "DDD"
+    assert len(board) == 4
+
+
+def test_sector_and_market_cap_filters():
+    board = board_with_quotes()
+    board.set_profile("AAA", "TECHNOLOGY", "3000000000000")
+    board.set_profile("CCC", "TECHNOLOGY", "5000000000")
+    board.set_profile("BBB", "ENERGY", "N/A")
+    assert [row["ticker"] for row in board.gainers(5, sector="technology")] == ["AAA", "CCC"]
+    assert [row["ticker"] for row in board.gainers(5, max_market_cap=1e10)] == ["CCC"]
+    # Unknown profile data never matches a filter
+    assert board.losers(5, min_market_cap=1) == []
+
+
+def test_stale_quotes_drop_out():
+    clock = FakeClock()
+    board = board_with_quotes(clock)
+    board.max_age = 60
+    clock.now += 120
+    board.update("CCC", 103, 100)
+    assert [row["ticker"] for row in board.gainers(5)] == ["CCC"]
@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from src.utils.rate_limiter import RequestGovernor, PRIORITY_USER, PRIORITY_BACKGROUND, throttle_message
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_governor_grants_burst_then_queues():
+    clock = FakeClock()
+    governor = RequestGovernor(per_minute=2, per_day=0, clock=clock)
+    await governor.acquire()
+    await governor.acquire()
+
+    waiter = asyncio.create_task(governor.acquire())
+    await asyncio.sleep(0.02)
+    assert not waiter.done()
+
+    # Half a minute refills one token at 2 per minute
+    clock.now += 30
+    governor._dispatch()
+    await asyncio.wait_for(waiter, 1)
+    assert governor.stats["queued"] == 1
+
+
+@pytest.mark.asyncio
+async def test_governor_serves_user_requests_before_background():
+    clock = FakeClock()
+    governor = RequestGovernor(per_minute=1, per_day=0, clock=clock)
+    await governor.acquire()
+
+    order = []
+
+    async def request(name, priority):
+        await governor.acquire(priority)
+        order.append(name)
+
+    background = asyncio.create_task(request("background", PRIORITY_BACKGROUND))
+    await asyncio.sleep(0)
+    user = asyncio.create_task(request("user", PRIORITY_USER))
+    await asyncio.sleep(0.02)
+
+    clock.now += 60
+    governor._dispatch()
+    await asyncio.wait_for(user, 1)
+    clock.now += 60
+    governor._dispatch()
+    await asyncio.wait_for(background, 1)
+    assert order == ["user", "background"]
+
+
+@pytest.mark.asyncio
+async def test_governor_rejects_when_daily_budget_spent():
+    governor = RequestGovernor(per_minute=10, per_day=1, clock=FakeClock())
+    await governor.acquire()
+    with pytest.raises(HTTPException) as exc:
+        await governor.acquire()
+    assert exc.value.status_code == 429
+
+
+def test_throttle_message_detection():
+    assert throttle_message({"Note": "Our standard API call frequency is 5 calls per minute"})
+    assert throttle_message({"Information": "The standard API rate limit is 25 requests per day."})
+    assert throttle_message({"Information": "This is a premium endpoint."}) is None
+    assert throttle_message({"Symbol": "AAPL"}) is None
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.mongoDB.indicator_state import MemoryIndicatorStateStore
+from src.mongoDB.price_bars import MemoryPriceBarStore
+from src.utils import indicators
+from src.utils.rolling_indicators import IndicatorStates, RollingEMA, RollingSMA
+
+
+def closes(count):
+    return 100 + np.cumsum(np.random.default_rng(3).normal(0, 1, count))
+
+
+def days(count):
+    return [f"2025-{1 + i // 28:02d}-{1 + i % 28:02d}" for i in range(count)]
+
+
+@pytest.mark.parametrize("rolling, batch", [(RollingSMA, indicators.sma), (RollingEMA, indicators.ema)])
+def test_rolling_matches_batch_engine(rolling, batch):
+    values = closes(120)
+    state = rolling(10, history=200)
+    for day, value in zip(days(120), values):
+        state.update(day, value)
+    expected = batch(values, 10)
+    np.testing.assert_allclose([value for _, value in state.outputs], expected[9:])
+
+
+@pytest.mark.parametrize("rolling, batch", [(RollingSMA, indicators.sma), (RollingEMA, indicators.ema)])
+def test_revising_the_open_bar_matches_recomputing(rolling, batch):
+    values = closes(30)
+    state = rolling(5)
+    for day, value in zip(days(30), values):
+        state.update(day, value)
+    # Intraday ticks replace the newest bar instead of appending
+    state.update(days(30)[-1], 50.0, revise=True)
+    state.update(days(30)[-1], 60.0, revise=True)
+    values[-1] = 60.0
+    assert state.outputs[-1][1] == pytest.approx(batch(values, 5)[-1])
+    assert len(state.outputs) == 26
+
+    restored = rolling.from_state(state.to_state())
+    restored.update("2025-03-01", 70.0)
+    state.update("2025-03-01", 70.0)
+    assert restored.outputs[-1][1] == pytest.approx(state.outputs[-1][1])
+
+
+@pytest.mark.asyncio
+async def test_states_catch_up_checkpoint_and_rebuild():
+    bars = MemoryPriceBarStore()
+    checkpoints = MemoryIndicatorStateStore()
+    values = closes(40)
+    await bars.upsert_bars("AAPL", "daily", [{"date": day, "close": value} for day, value in zip(days(40), values)])
+
+    states = IndicatorStates(bars, checkpoints)
+    state = await states.get("AAPL", "SMA", "daily", 5)
+    assert states.stats["rebuilds"] == 1
+    assert await checkpoints.load(states.key("AAPL", "SMA", "daily", 5, "close")) is not None
+
+    # A new bar is applied incrementally, also by a fresh process starting from the checkpoint
+    await bars.upsert_bars("AAPL", "daily", [{"date": "2025-03-01", "close": 500.0}])
+    restarted = IndicatorStates(bars, checkpoints)
+    state = await restarted.get("AAPL", "SMA", "daily", 5)
+    assert restarted.stats == {"rebuilds": 0, "catch_ups": 1, "ticks": 0}
+    assert state.outputs[-1] == ("2025-03-01", pytest.approx((sum(values[-4:]) + 500) / 5))
+
+    # Ticks move the open bar; the stored bar for that day later lands as a revision
+    restarted.apply_tick("AAPL", "2025-03-02", 505.0)
+    assert state.last_date == "2025-03-02"
+    await bars.upsert_bars("AAPL", "daily", [{"date": "2025-03-02", "close": 510.0}])
+    state = await restarted.get("AAPL", "SMA", "daily", 5)
+    assert state.outputs[-1] == ("2025-03-02", pytest.approx((sum(values[-3:]) + 500 + 510) / 5))
+    assert restarted.stats["rebuilds"] == 0
+
+    # Rewritten history (a split re-based earlier closes) forces a rebuild
+    await bars.replace_bars("AAPL", "daily", [{"date": day, "close": value / 2} for day, value in zip(days(40), values)])
+    state = await restarted.get("AAPL", "SMA", "daily", 5)
+    assert restarted.stats["rebuilds"] == 1
+    assert state.outputs[-1][1] == pytest.approx(values[-5:].mean() / 2)
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from src.utils.single_flight import SingleFlight, normalize_url
+
+
+def test_normalize_url_ignores_order_case_and_key():
+    a = normalize_url("https://www.alphavantage.co/query?function=OVERVIEW&symbol=aapl&apikey=one")
+    b = normalize_url("https://www.alphavantage.co/query?symbol=AAPL&function=OVERVIEW&apikey=two")
+    c = normalize_url("https://www.alphavantage.co/query?function=OVERVIEW&symbol=MSFT")
+    assert a == b
+    assert a != c
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    calls = []
+
+    async def broken():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("key", broken) for _ in range(3)), return_exceptions=True)
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flight.stats == {"leaders": 1, "coalesced": 2}
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", slow))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("key", slow))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    assert await follower == "done"
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_shared_call_cancelled_when_all_callers_leave():
+    flight = SingleFlight()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(1)
+        finished.append(1)
+
+    caller = asyncio.create_task(flight.do("key", slow))
+    await asyncio.sleep(0.01)
+    caller.cancel()
+    await asyncio.sleep(0.01)
+    assert flight.in_flight() == 0
+    assert finished == []
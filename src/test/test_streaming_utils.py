@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from src.utils.streaming_utils import NDJSONDecoder, process_streaming_response
+
+
+class FakeResponse:
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    async def aiter_text(self):
+        for piece in self.pieces:
+            yield piece
+
+
+def stream_text(*contents, done=None):
+    lines = [json.dumps({"message": {"content": content}, "done": False}) for content in contents]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True, **(done or {})}))
+    return "\n".join(lines) + "\n"
+
+
+def test_decoder_joins_lines_split_across_chunks():
+    decoder = NDJSONDecoder()
+    assert decoder.feed('{"a": 1}\n{"b"') == [{"a": 1}]
+    assert decoder.feed(': ') == []
+    assert decoder.feed('2}\n\n{"c": 3}') == [{"b": 2}]
+    assert decoder.close() == [{"c": 3}]
+
+
+def test_decoder_joins_a_long_line_only_once_it_completes():
+    line = json.dumps({"message": {"content": "x" * 100_000}})
+    pieces = [line[start:start + 50] for start in range(0, len(line), 50)]
+    decoder = NDJSONDecoder()
+    for piece in pieces:
+        assert decoder.feed(piece) == []
+    # Pieces are kept as they arrived, not re-joined on every chunk
+    assert len(decoder._partial) == len(pieces)
+    assert decoder.feed("\n") == [{"message": {"content": "x" * 100_000}}]
+
+
+def test_decoder_skips_malformed_lines():
+    decoder = NDJSONDecoder()
+    assert decoder.feed('{"a": 1}\nnot json\n{"b": 2}\n') == [{"a": 1}, {"b": 2}]
+    assert decoder.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_process_streaming_response_yields_content_and_done_stats():
+    text = stream_text("Hel", "lo", " wörld", done={
+        "done_reason": "stop", "total_duration": 5_000_000_000, "eval_count": 30, "eval_duration": 2_000_000_000,
+    })
+    # Deliver the stream a few characters at a time so every line is split
+    pieces = [text[i:i + 7] for i in range(0, len(text), 7)]
+    stats = {}
+    chunks = [content async for content in process_streaming_response(FakeResponse(pieces), stats)]
+
+    assert "".join(chunks) == "Hello wörld"
+    assert stats == {
+        "done_reason": "stop",
+        "total_duration": 5_000_000_000,
+        "eval_count": 30,
+        "eval_duration": 2_000_000_000,
+        "tokens_per_second": 15.0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_process_streaming_response_reads_generate_chunks():
+    text = '{"response": "a", "done": false}\n{"response": "b", "done": true}'
+    chunks = [content async for content in process_streaming_response(FakeResponse([text]))]
+    assert chunks == ["a", "b"]
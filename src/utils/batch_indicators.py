@@ -0,0 +1,156 @@
+"""
+Indicators for many tickers at once over a dates-by-tickers matrix.
+
+Each column is one ticker. Columns may start late (listed later, or shorter stored
+history) and end early (delisted); missing bars between a ticker's first and last bar are
+carried forward from the previous close. Every indicator runs over all columns in one
+vectorized pass; each column warms up from its own first bar.
+"""
+
+import re
+
+import numpy as np
+
+# "SMA_20" -> ("SMA", 20)
+SPEC_PATTERN = re.compile(r"^(SMA|EMA|RSI)_(\d+)$")
+
+
+def parse_spec(spec: str):
+    match = SPEC_PATTERN.match(spec.upper())
+    if not match or int(match.group(2)) < 1:
+        raise ValueError(f"Unsupported indicator spec {spec}. Use SMA_<n>, EMA_<n> or RSI_<n>.")
+    return match.group(1), int(match.group(2))
+
+
+def align(series: dict, field: str = "close"):
+    """
+    {ticker: bars (newest first)} -> (dates, tickers, matrix) with one row per date in the
+    union of all dates, oldest first, and NaN where a ticker has no bar.
+    """
+    tickers = sorted(series)
+    dates = sorted({bar["date"] for bars in series.values() for bar in bars})
+    row = {day: i for i, day in enumerate(dates)}
+    matrix = np.full((len(dates), len(tickers)), np.nan)
+    for column, ticker in enumerate(tickers):
+        points = [(row[bar["date"]], bar[field]) for bar in series[ticker] if bar.get(field) is not None]
+        if points:
+            rows, values = zip(*points)
+            matrix[list(rows), column] = values
+    return dates, tickers, matrix
+
+
+def first_valid(matrix):
+    """
+    Row of each column's first value (len(matrix) for empty columns).
+    """
+    valid = ~np.isnan(matrix)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(matrix))
+
+
+def last_valid(matrix):
+    valid = ~np.isnan(matrix)
+    return np.where(valid.any(axis=0), len(matrix) - 1 - valid[::-1].argmax(axis=0), -1)
+
+
+def fill_gaps(matrix):
+    """
+    Carry the previous value forward over missing bars, only inside each column's own
+    history (nothing before its first bar or after its last).
+    """
+    rows = np.arange(len(matrix))[:, None]
+    index = np.where(~np.isnan(matrix), rows, 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    filled = matrix[index, np.arange(matrix.shape[1])]
+    inside = (rows >= first_valid(matrix)) & (rows <= last_valid(matrix))
+    return np.where(inside, filled, np.nan)
+
+
+def _window_mean(matrix, period: int):
+    """
+    Rolling mean per column; NaN unless the whole window has values.
+    """
+    out = np.full(matrix.shape, np.nan)
+    if period > len(matrix):
+        return out
+    valid = ~np.isnan(matrix)
+    sums = np.vstack([np.zeros(matrix.shape[1]), np.cumsum(np.where(valid, matrix, 0.0), axis=0)])
+    counts = np.vstack([np.zeros(matrix.shape[1]), np.cumsum(valid, axis=0)])
+    window_sums = sums[period:] - sums[:-period]
+    window_counts = counts[period:] - counts[:-period]
+    out[period - 1:] = np.where(window_counts == period, window_sums / period, np.nan)
+    return out
+
+
+def _smooth(matrix, alpha: float, period: int, start):
+    """
+    Exponential smoothing per column, seeded with the mean of the first `period` values
+    from each column's `start` row. The recursion walks the rows once, updating every
+    column per step.
+    """
+    out = np.full(matrix.shape, np.nan)
+    seeds = _window_mean(matrix, period)
+    seed_row = start + period - 1
+    columns = np.arange(matrix.shape[1])
+    seeded = seed_row < len(matrix)
+    out[seed_row[seeded], columns[seeded]] = seeds[seed_row[seeded], columns[seeded]]
+    for t in range(1, len(matrix)):
+        active = (t > seed_row) & ~np.isnan(matrix[t])
+        previous = out[t - 1, active]
+        out[t, active] = previous + alpha * (matrix[t, active] - previous)
+    return out
+
+
+def sma(matrix, period: int):
+    return _window_mean(matrix, period)
+
+
+def ema(matrix, period: int):
+    return _smooth(matrix, 2.0 / (period + 1), period, first_valid(matrix))
+
+
+def rsi(matrix, period: int = 14):
+    change = np.vstack([np.full(matrix.shape[1], np.nan), np.diff(matrix, axis=0)])
+    gains = np.where(np.isnan(change), np.nan, np.maximum(change, 0.0))
+    losses = np.where(np.isnan(change), np.nan, np.maximum(-change, 0.0))
+    start = first_valid(change)
+    average_gain = _smooth(gains, 1.0 / period, period, start)
+    average_loss = _smooth(losses, 1.0 / period, period, start)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + average_gain / average_loss)
+    return np.where((average_loss == 0) & ~np.isnan(average_gain), 100.0, out)
+
+
+BATCH_INDICATORS = {"SMA": sma, "EMA": ema, "RSI": rsi}
+
+
+def compute(matrix, specs):
+    """
+    {spec: matrix} for specs like ["SMA_50", "EMA_20", "RSI_14"], over gap-filled closes.
+    """
+    filled = fill_gaps(matrix)
+    results = {}
+    for spec in specs:
+        name, period = parse_spec(spec)
+        results[f"{name}_{period}"] = BATCH_INDICATORS[name](filled, period)
+    return results
+
+
+def latest_values(dates, tickers, matrix, results: dict):
+    """
+    Per ticker: the date of its last bar and each indicator's value on that bar.
+    """
+    last = last_valid(matrix)
+    snapshot = {}
+    for column, ticker in enumerate(tickers):
+        if last[column] < 0:
+            continue
+        row = last[column]
+        snapshot[ticker] = {
+            "date": dates[row],
+            "close": float(matrix[row, column]),
+            **{
+                name: None if np.isnan(values[row, column]) else round(float(values[row, column]), 4)
+                for name, values in results.items()
+            },
+        }
+    return snapshot
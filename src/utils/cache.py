@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from cachetools import LRUCache
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.utils.single_flight import SingleFlight
+from src.utils.market_calendar import freshness_ttl
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# L1 is bounded by the approximate serialized size of its entries, not their count
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))
+# "mongo" shares L2 between workers and restarts, "memory" is a local stand-in, "none" disables L2
+CACHE_L2_BACKEND = os.getenv("CACHE_L2_BACKEND", "mongo")
+# Never let a slow or missing L2 hold up a request for longer than this
+CACHE_L2_TIMEOUT_SECONDS = float(os.getenv("CACHE_L2_TIMEOUT_SECONDS", "0.5"))
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    ttl: seconds an entry is served as fresh, or a callable
+        (dataset, ticker, value, now) -> seconds computed when the value is stored
+    stale_ttl: further seconds it may be served while a background refresh runs
+    """
+    ttl: object
+    stale_ttl: float = 0
+
+    def fresh_for(self, dataset: str, ticker, value, now: float) -> float:
+        if callable(self.ttl):
+            return self.ttl(dataset, ticker, value, datetime.fromtimestamp(now, tz=timezone.utc))
+        return self.ttl
+
+
+DEFAULT_POLICY = CachePolicy(ttl=3600, stale_ttl=3600)
+
+# Freshness follows the exchange calendar and reporting cadence (src/utils/market_calendar.py)
+DATASET_POLICIES = {
+    "metadata": CachePolicy(ttl=freshness_ttl, stale_ttl=24 * 3600),
+    "historical_data": CachePolicy(ttl=freshness_ttl, stale_ttl=24 * 3600),
+    "price_bars": CachePolicy(ttl=freshness_ttl, stale_ttl=24 * 3600),
+    "news": CachePolicy(ttl=freshness_ttl, stale_ttl=3600),
+    "live_news": CachePolicy(ttl=freshness_ttl, stale_ttl=3600),
+    "income_statement": CachePolicy(ttl=freshness_ttl, stale_ttl=7 * 24 * 3600),
+    "balance_sheet": CachePolicy(ttl=freshness_ttl, stale_ttl=7 * 24 * 3600),
+    "cash_flow": CachePolicy(ttl=freshness_ttl, stale_ttl=7 * 24 * 3600),
+    "earnings": CachePolicy(ttl=freshness_ttl, stale_ttl=7 * 24 * 3600),
+    "indicators": CachePolicy(ttl=freshness_ttl, stale_ttl=24 * 3600),
+    "quote_reference": CachePolicy(ttl=freshness_ttl, stale_ttl=24 * 3600),
+    "live_market_prices": CachePolicy(ttl=freshness_ttl, stale_ttl=300),
+    "top_gainers_losers": CachePolicy(ttl=freshness_ttl, stale_ttl=300),
+}
+
+
+@dataclass
+class CacheEntry:
+    value: object
+    fresh_until: float
+    stale_until: float
+    size: int = 0
+
+
+def estimate_size(value) -> int:
+    """
+    Approximate the memory cost of a cached value by its JSON size.
+    """
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class MemoryBackend:
+    """
+    Process-local stand-in for the shared L2, for tests and single-worker setups.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    async def get(self, key):
+        return self._entries.get(key)
+
+    async def set(self, key, entry: CacheEntry):
+        self._entries[key] = entry
+
+    async def delete(self, key):
+        self._entries.pop(key, None)
+
+    async def start(self):
+        pass
+
+
+class MongoBackend:
+    """
+    Shared L2 stored in the `cache` collection, expired by a MongoDB TTL index.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, key):
+        doc = await self.collection.find_one({"_id": key})
+        if not doc:
+            return None
+        return CacheEntry(doc["value"], doc["fresh_until"], doc["stale_until"])
+
+    async def set(self, key, entry: CacheEntry):
+        await self.collection.replace_one(
+            {"_id": key},
+            {
+                "value": entry.value,
+                "fresh_until": entry.fresh_until,
+                "stale_until": entry.stale_until,
+                # TTL indexes need a date field
+                "expires_at": _utc_datetime(entry.stale_until),
+            },
+            upsert=True,
+        )
+
+    async def delete(self, key):
+        await self.collection.delete_one({"_id": key})
+
+    async def start(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+
+def _utc_datetime(timestamp: float):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class TieredCache:
+    """
+    In-process L1 (LRU bounded by bytes) in front of a shared L2.
+
+    get_or_fetch() serves fresh entries directly, serves stale entries while refreshing
+    them in the background, and fetches on a miss. Concurrent refreshes of one key share
+    a single fetch.
+    """
+
+    def __init__(self, l2=None, max_bytes: int = CACHE_L1_MAX_BYTES, policies=None, clock=time.time):
+        self.l1 = LRUCache(maxsize=max_bytes, getsizeof=lambda entry: entry.size)
+        self.l2 = l2
+        self.policies = DATASET_POLICIES if policies is None else policies
+        self._clock = clock
+        self._flight = SingleFlight()
+        self._background = set()
+        self.stats = {"l1_hits": 0, "l2_hits": 0, "stale_hits": 0, "misses": 0}
+
+    def policy(self, dataset: str) -> CachePolicy:
+        return self.policies.get(dataset, DEFAULT_POLICY)
+
+    async def start(self):
+        if self.l2 is not None:
+            try:
+                await asyncio.wait_for(self.l2.start(), CACHE_L2_TIMEOUT_SECONDS * 10)
+            except Exception as e:
+                logger.warning(f"Cache L2 unavailable on startup: {e}")
+
+    async def _lookup(self, key):
+        entry = self.l1.get(key)
+        if entry is not None:
+            self.stats["l1_hits"] += 1
+            return entry
+        if self.l2 is None:
+            return None
+        try:
+            entry = await asyncio.wait_for(self.l2.get(key), CACHE_L2_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Cache L2 read failed for {key}: {e}")
+            return None
+        if entry is not None:
+            self.stats["l2_hits"] += 1
+            self._store_l1(key, entry)
+        return entry
+
+    def _store_l1(self, key, entry: CacheEntry):
+        if not entry.size:
+            entry.size = estimate_size(entry.value)
+        if entry.size <= self.l1.maxsize:
+            self.l1[key] = entry
+
+    async def _store(self, key, entry: CacheEntry):
+        self._store_l1(key, entry)
+        if self.l2 is None:
+            return
+        try:
+            await asyncio.wait_for(self.l2.set(key, entry), CACHE_L2_TIMEOUT_SECONDS)
+        except Exception as e:
+            logger.warning(f"Cache L2 write failed for {key}: {e}")
+
+    async def _refresh(self, dataset: str, key: str, fetcher, ticker=None):
+        async def fetch_and_store():
+            value = await fetcher()
+            now = self._clock()
+            policy = self.policy(dataset)
+            ttl = policy.fresh_for(dataset, ticker, value, now)
+            await self._store(key, CacheEntry(value, now + ttl, now + ttl + policy.stale_ttl))
+            return value
+
+        return await self._flight.do(key, fetch_and_store)
+
+    def _refresh_in_background(self, dataset: str, key: str, fetcher, ticker=None):
+        async def refresh():
+            try:
+                await self._refresh(dataset, key, fetcher, ticker)
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {key}: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get_or_fetch(self, dataset: str, key: str, fetcher, ticker: str = None):
+        """
+        Return the cached value for (dataset, key), calling `fetcher()` when needed.
+        `ticker` selects the exchange calendar used by calendar-aware policies.
+        """
+        full_key = f"{dataset}:{key}"
+        entry = await self._lookup(full_key)
+        now = self._clock()
+        if entry is not None and now < entry.fresh_until:
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            self.stats["stale_hits"] += 1
+            self._refresh_in_background(dataset, full_key, fetcher, ticker)
+            return entry.value
+
+        self.stats["misses"] += 1
+        return await self._refresh(dataset, full_key, fetcher, ticker)
+
+    async def invalidate(self, dataset: str, key: str):
+        full_key = f"{dataset}:{key}"
+        self.l1.pop(full_key, None)
+        if self.l2 is not None:
+            try:
+                await asyncio.wait_for(self.l2.delete(full_key), CACHE_L2_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.warning(f"Cache L2 delete failed for {full_key}: {e}")
+
+    def status(self) -> dict:
+        return {
+            "l1_entries": len(self.l1),
+            "l1_bytes": self.l1.currsize,
+            "l1_max_bytes": self.l1.maxsize,
+            "l2_backend": type(self.l2).__name__ if self.l2 is not None else None,
+            **self.stats,
+        }
+
+
+def _build_l2():
+    if CACHE_L2_BACKEND == "mongo":
+        return MongoBackend(AsyncIOMotorClient(os.getenv("MONGODB_URI")).tradely.cache)
+    if CACHE_L2_BACKEND == "memory":
+        return MemoryBackend()
+    return None
+
+
+# Shared cache used by every fetch function
+cache = TieredCache(l2=_build_l2())
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+async def _timed(coro):
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        # Stash the elapsed time on the running task so the caller can report it
+        asyncio.current_task().elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+
+
+async def fan_out(sections: dict, deadline: float):
+    """
+    Run independent section coroutines concurrently under one overall deadline.
+
+    Returns (results, report):
+        results: {section: value, or None when the section failed or timed out}
+        report: {"elapsed_ms": total, "sections": {section: {"status", "elapsed_ms", "error"?}}}
+    Sections still running when the deadline passes are cancelled and marked "timeout".
+    """
+    start = time.perf_counter()
+    tasks = {name: asyncio.create_task(_timed(coro)) for name, coro in sections.items()}
+
+    if tasks:
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    results = {}
+    report = {}
+    for name, task in tasks.items():
+        elapsed_ms = getattr(task, "elapsed_ms", None)
+        if task.cancelled():
+            results[name] = None
+            report[name] = {"status": "timeout", "elapsed_ms": round(deadline * 1000, 1)}
+            logger.warning(f"Section {name} exceeded the {deadline}s deadline")
+        elif task.exception() is not None:
+            error = task.exception()
+            results[name] = None
+            report[name] = {"status": "error", "elapsed_ms": elapsed_ms, "error": getattr(error, "detail", None) or str(error)}
+            logger.error(f"Section {name} failed: {error}")
+        else:
+            results[name] = task.result()
+            report[name] = {"status": "ok", "elapsed_ms": elapsed_ms}
+
+    return results, {
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "sections": report,
+    }
@@ -0,0 +1,153 @@
+"""
+Technical indicators computed locally from stored price bars.
+
+Every function takes oldest-first float arrays and returns arrays of the same length,
+with NaN for the warm-up bars where the indicator is not defined yet.
+"""
+
+import numpy as np
+
+SERIES_TYPES = ("open", "high", "low", "close")
+
+
+def sma(values, period: int):
+    """
+    Simple moving average as a difference of cumulative sums: one pass, no window loop.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    if period <= 0 or len(values) < period:
+        return out
+    sums = np.cumsum(np.insert(values, 0, 0.0))
+    out[period - 1:] = (sums[period:] - sums[:-period]) / period
+    return out
+
+
+def _smooth(values, alpha: float, start: int, seed: float):
+    """
+    Recursive exponential smoothing from `start`, seeded with `seed`. Each value depends on
+    the previous one, so this stays a loop; everything around it is vectorized.
+    """
+    out = np.full(values.shape, np.nan)
+    if start >= len(values):
+        return out
+    out[start] = seed
+    previous = seed
+    for i in range(start + 1, len(values)):
+        previous = previous + alpha * (values[i] - previous)
+        out[i] = previous
+    return out
+
+
+def ema(values, period: int):
+    """
+    Exponential moving average seeded with the SMA of the first `period` values,
+    the same convention Alpha Vantage uses.
+    """
+    values = np.asarray(values, dtype=float)
+    if period <= 0 or len(values) < period:
+        return np.full(values.shape, np.nan)
+    return _smooth(values, 2.0 / (period + 1), period - 1, values[:period].mean())
+
+
+def _wilder(values, period: int, start: int):
+    """
+    Wilder's smoothing (alpha = 1 / period) seeded with the mean of the first `period`
+    values from `start`.
+    """
+    if len(values) < start + period:
+        return np.full(values.shape, np.nan)
+    return _smooth(values, 1.0 / period, start + period - 1, values[start:start + period].mean())
+
+
+def rsi(close, period: int = 14):
+    close = np.asarray(close, dtype=float)
+    change = np.diff(close, prepend=np.nan)
+    gains = _wilder(np.where(change > 0, change, 0.0), period, 1)
+    losses = _wilder(np.where(change < 0, -change, 0.0), period, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + gains / losses)
+    # No losses over the window means RSI is pinned at 100
+    return np.where((losses == 0) & ~np.isnan(gains), 100.0, out)
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9):
+    """
+    (macd, signal, histogram).
+    """
+    close = np.asarray(close, dtype=float)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = np.full(close.shape, np.nan)
+    first = slow - 1
+    if len(close) > first:
+        signal_line[first:] = ema(line[first:], signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(values, period: int = 20, deviations: float = 2.0):
+    """
+    (upper, middle, lower) bands using the population standard deviation of the window.
+    """
+    values = np.asarray(values, dtype=float)
+    middle = sma(values, period)
+    # Var = E[x^2] - E[x]^2, from the same cumulative-sum trick as the SMA
+    variance = np.maximum(sma(values ** 2, period) - middle ** 2, 0.0)
+    spread = deviations * np.sqrt(variance)
+    return middle + spread, middle, middle - spread
+
+
+def atr(high, low, close, period: int = 14):
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    return _wilder(true_range, period, 0)
+
+
+def bar_columns(bars):
+    """
+    Oldest-first dates and OHLC arrays from stored bars (which are read newest first).
+    """
+    ordered = list(reversed(bars))
+    dates = [bar["date"] for bar in ordered]
+    columns = {field: np.array([bar.get(field, np.nan) for bar in ordered], dtype=float) for field in SERIES_TYPES}
+    return dates, columns
+
+
+def to_alpha_vantage(dates, outputs: dict, decimals: int = 4):
+    """
+    Format indicator arrays like Alpha Vantage's "Technical Analysis" payload:
+    {date: {name: "value"}}, newest first, skipping warm-up bars.
+    """
+    names = list(outputs)
+    stacked = np.column_stack([outputs[name] for name in names])
+    defined = ~np.isnan(stacked).any(axis=1)
+    return {
+        dates[i]: {name: f"{stacked[i, j]:.{decimals}f}" for j, name in enumerate(names)}
+        for i in np.flatnonzero(defined)[::-1]
+    }
+
+
+# name -> (columns, time_period, series_type) -> {output name: array}, output names as in Alpha Vantage
+INDICATORS = {
+    "SMA": lambda columns, period, series: {"SMA": sma(columns[series], period)},
+    "EMA": lambda columns, period, series: {"EMA": ema(columns[series], period)},
+    "RSI": lambda columns, period, series: {"RSI": rsi(columns[series], period)},
+    # MACD uses the standard 12/26/9 spans rather than time_period
+    "MACD": lambda columns, period, series: dict(zip(("MACD", "MACD_Signal", "MACD_Hist"), macd(columns[series]))),
+    "BBANDS": lambda columns, period, series: dict(
+        zip(("Real Upper Band", "Real Middle Band", "Real Lower Band"), bollinger(columns[series], period))
+    ),
+    "ATR": lambda columns, period, series: {"ATR": atr(columns["high"], columns["low"], columns["close"], period)},
+}
+
+
+def compute_indicator(indicator: str, bars, time_period: int, series_type: str = "close"):
+    """
+    Indicator values for stored bars (newest first), in Alpha Vantage's payload format.
+    """
+    dates, columns = bar_columns(bars)
+    if not dates:
+        return {}
+    return to_alpha_vantage(dates, INDICATORS[indicator](columns, time_period, series_type))
@@ -0,0 +1,248 @@
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# How often intraday data is refreshed while its exchange is open
+INTRADAY_TTL_SECONDS = float(os.getenv("INTRADAY_TTL_SECONDS", "60"))
+# How often news is refreshed in and out of trading hours
+NEWS_TTL_SECONDS = float(os.getenv("NEWS_TTL_SECONDS", "900"))
+NEWS_OFF_HOURS_TTL_SECONDS = float(os.getenv("NEWS_OFF_HOURS_TTL_SECONDS", "3600"))
+# Alpha Vantage publishes end-of-day bars a little after the close
+END_OF_DAY_DELAY = timedelta(minutes=int(os.getenv("END_OF_DAY_DELAY_MINUTES", "30")))
+
+# Fundamentals: quarterly reports are filed within ~45 days of the quarter end,
+# annual reports within ~90 days of the fiscal year end
+QUARTERLY_CADENCE = (timedelta(days=91), timedelta(days=45))
+ANNUAL_CADENCE = (timedelta(days=365), timedelta(days=90))
+FUNDAMENTALS_MIN_TTL = timedelta(days=1)
+FUNDAMENTALS_MAX_TTL = timedelta(days=30)
+
+MIN_TTL_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class Exchange:
+    name: str
+    tz: ZoneInfo
+    open: time
+    close: time
+    # Only the US calendar has holiday rules; other exchanges close on weekends only
+    us_holidays: bool = False
+
+
+NYSE = Exchange("NYSE", ZoneInfo("America/New_York"), time(9, 30), time(16, 0), us_holidays=True)
+
+# Alpha Vantage ticker suffixes for non-US listings
+EXCHANGE_SUFFIXES = {
+    ".LON": Exchange("LSE", ZoneInfo("Europe/London"), time(8, 0), time(16, 30)),
+    ".TRT": Exchange("TSX", ZoneInfo("America/Toronto"), time(9, 30), time(16, 0)),
+    ".TRV": Exchange("TSXV", ZoneInfo("America/Toronto"), time(9, 30), time(16, 0)),
+    ".DEX": Exchange("XETRA", ZoneInfo("Europe/Berlin"), time(9, 0), time(17, 30)),
+    ".BSE": Exchange("BSE", ZoneInfo("Asia/Kolkata"), time(9, 15), time(15, 30)),
+    ".SHH": Exchange("SSE", ZoneInfo("Asia/Shanghai"), time(9, 30), time(15, 0)),
+    ".SHZ": Exchange("SZSE", ZoneInfo("Asia/Shanghai"), time(9, 30), time(15, 0)),
+}
+
+# Datasets grouped by how quickly their upstream values change
+INTRADAY_DATASETS = {"live_market_prices", "top_gainers_losers", "bulk_quotes"}
+END_OF_DAY_DATASETS = {"historical_data", "price_bars", "sma", "ema", "indicators", "metadata", "quote_reference"}
+NEWS_DATASETS = {"news", "live_news"}
+FUNDAMENTAL_DATASETS = {"income_statement", "balance_sheet", "cash_flow", "earnings"}
+
+
+def exchange_for(ticker: str = None) -> Exchange:
+    if ticker:
+        for suffix, exchange in EXCHANGE_SUFFIXES.items():
+            if ticker.upper().endswith(suffix):
+                return exchange
+    return NYSE
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    last = (date(year, month + 1, 1) if month < 12 else date(year + 1, 1, 1)) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day: date) -> date:
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=32)
+def us_market_holidays(year: int) -> frozenset:
+    """
+    NYSE full-day holidays for a year.
+    """
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),   # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),   # Washington's Birthday
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _last_weekday(year, 5, 0),     # Memorial Day
+        _observed(date(year, 7, 4)),   # Independence Day
+        _nth_weekday(year, 9, 0, 1),   # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(date(year, 12, 25)), # Christmas
+    }
+    # New Year's Day is not moved back into the previous year when it falls on a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    return frozenset(holidays)
+
+
+def _early_close(day: date) -> bool:
+    # 1 pm closes: day before Independence Day, day after Thanksgiving, Christmas Eve
+    return day in (
+        date(day.year, 7, 3),
+        _nth_weekday(day.year, 11, 3, 4) + timedelta(days=1),
+        date(day.year, 12, 24),
+    )
+
+
+def is_trading_day(day: date, exchange: Exchange = NYSE) -> bool:
+    if day.weekday() >= 5:
+        return False
+    return not (exchange.us_holidays and day in us_market_holidays(day.year))
+
+
+def session_bounds(day: date, exchange: Exchange = NYSE):
+    """
+    (open, close) as aware datetimes for a trading day.
+    """
+    close = exchange.close
+    if exchange.us_holidays and _early_close(day):
+        close = time(13, 0)
+    return (
+        datetime.combine(day, exchange.open, tzinfo=exchange.tz),
+        datetime.combine(day, close, tzinfo=exchange.tz),
+    )
+
+
+def is_market_open(now: datetime, exchange: Exchange = NYSE) -> bool:
+    local = now.astimezone(exchange.tz)
+    if not is_trading_day(local.date(), exchange):
+        return False
+    opens, closes = session_bounds(local.date(), exchange)
+    return opens <= local < closes
+
+
+def next_open(now: datetime, exchange: Exchange = NYSE) -> datetime:
+    local = now.astimezone(exchange.tz)
+    day = local.date()
+    while True:
+        if is_trading_day(day, exchange):
+            opens, _ = session_bounds(day, exchange)
+            if opens > local:
+                return opens
+        day += timedelta(days=1)
+
+
+def next_close(now: datetime, exchange: Exchange = NYSE) -> datetime:
+    local = now.astimezone(exchange.tz)
+    day = local.date()
+    while True:
+        if is_trading_day(day, exchange):
+            _, closes = session_bounds(day, exchange)
+            if closes > local:
+                return closes
+        day += timedelta(days=1)
+
+
+def next_end_of_day(now: datetime, exchange: Exchange = NYSE) -> datetime:
+    """
+    When the next end-of-day bar is published: the first session close (plus the
+    publishing delay) that is still ahead of `now`.
+    """
+    local = now.astimezone(exchange.tz)
+    day = local.date() - timedelta(days=1)
+    while True:
+        if is_trading_day(day, exchange):
+            _, closes = session_bounds(day, exchange)
+            if closes + END_OF_DAY_DELAY > local:
+                return closes + END_OF_DAY_DELAY
+        day += timedelta(days=1)
+
+
+def _next_expected_filing(value):
+    """
+    When the next report should appear, from the latest fiscalDateEnding in a
+    financial statement payload. None when the payload has no dated reports.
+    """
+    if not isinstance(value, dict):
+        return None
+    latest = None
+    for key, cadence in (("annual_reports", ANNUAL_CADENCE), ("quarterly_reports", QUARTERLY_CADENCE)):
+        for report in value.get(key) or []:
+            try:
+                fiscal_end = date.fromisoformat(report.get("fiscalDateEnding", ""))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            expected = fiscal_end + cadence[0] + cadence[1]
+            if latest is None or expected > latest:
+                latest = expected
+    if latest is None:
+        return None
+    return datetime.combine(latest, time(0), tzinfo=timezone.utc)
+
+
+def freshness_ttl(dataset: str, ticker: str = None, value=None, now: datetime = None) -> float:
+    """
+    Seconds a freshly fetched `value` of `dataset` stays current, based on the ticker's
+    exchange session and the dataset's update cadence.
+    """
+    now = now or datetime.now(timezone.utc)
+    exchange = exchange_for(ticker)
+
+    if dataset in INTRADAY_DATASETS:
+        if is_market_open(now, exchange):
+            ttl = INTRADAY_TTL_SECONDS
+        else:
+            # Nothing moves until the next session opens
+            ttl = (next_open(now, exchange) - now).total_seconds()
+    elif dataset in NEWS_DATASETS:
+        ttl = NEWS_TTL_SECONDS if is_market_open(now, exchange) else NEWS_OFF_HOURS_TTL_SECONDS
+    elif dataset in FUNDAMENTAL_DATASETS:
+        expected = _next_expected_filing(value)
+        if expected is None:
+            ttl = FUNDAMENTALS_MIN_TTL.total_seconds()
+        else:
+            # Sleep until the next filing is due, then check daily until it shows up
+            ttl = min(max(expected - now, FUNDAMENTALS_MIN_TTL), FUNDAMENTALS_MAX_TTL).total_seconds()
+    elif dataset in END_OF_DAY_DATASETS:
+        # Daily values only change once the next session's bar is published
+        ttl = (next_end_of_day(now, exchange) - now).total_seconds()
+    else:
+        ttl = 3600
+    return max(ttl, MIN_TTL_SECONDS)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# How often the hub polls for prices while anyone is subscribed
+PRICE_HUB_INTERVAL_SECONDS = float(os.getenv("PRICE_HUB_INTERVAL_SECONDS", "15"))
+# Messages buffered per client before it is treated as slow
+PRICE_HUB_QUEUE_SIZE = int(os.getenv("PRICE_HUB_QUEUE_SIZE", "16"))
+
+
+class Subscription:
+    """
+    One connected client: a bounded queue of outgoing messages and an optional symbol filter.
+    """
+
+    def __init__(self, symbols=None, queue_size: int = PRICE_HUB_QUEUE_SIZE):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.symbols = None
+        self.set_symbols(symbols)
+        self.resyncs = 0
+
+    def set_symbols(self, symbols=None):
+        self.symbols = {symbol.upper() for symbol in symbols} if symbols else None
+
+    def select(self, prices: dict) -> dict:
+        if self.symbols is None:
+            return dict(prices)
+        return {symbol: value for symbol, value in prices.items() if symbol in self.symbols}
+
+
+class PriceHub:
+    """
+    Fan-out of live prices to every connected client from a single poller.
+
+    The poller runs only while someone is subscribed and calls `fetch()` once per interval,
+    however many clients are connected. Clients get a filtered snapshot when they join and
+    then only the symbols whose prices changed. A client that falls behind never blocks the
+    poller: its backlog is dropped and replaced by a fresh snapshot.
+    """
+
+    def __init__(self, fetch, interval: float = PRICE_HUB_INTERVAL_SECONDS, queue_size: int = PRICE_HUB_QUEUE_SIZE):
+        self.fetch = fetch
+        self.interval = interval
+        self.queue_size = queue_size
+        self.snapshot = {}
+        self._subscribers = set()
+        self._poller = None
+        self.stats = {"polls": 0, "failed_polls": 0, "deltas": 0, "resyncs": 0}
+
+    def subscribe(self, symbols=None) -> Subscription:
+        subscription = Subscription(symbols, self.queue_size)
+        self._subscribers.add(subscription)
+        if self.snapshot:
+            self._offer(subscription, {"type": "snapshot", "prices": subscription.select(self.snapshot)})
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def resubscribe(self, subscription: Subscription, symbols=None):
+        """
+        Change a client's filter; it gets a snapshot of its new selection.
+        """
+        subscription.set_symbols(symbols)
+        self._offer(subscription, {"type": "snapshot", "prices": subscription.select(self.snapshot)})
+
+    def _offer(self, subscription: Subscription, message: dict):
+        try:
+            subscription.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog and send the current state instead
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.resyncs += 1
+            self.stats["resyncs"] += 1
+            subscription.queue.put_nowait({"type": "snapshot", "prices": subscription.select(self.snapshot)})
+
+    def publish(self, prices: dict):
+        """
+        Diff `prices` against the last snapshot and send each client the changes it selected.
+        """
+        changed = {symbol: value for symbol, value in prices.items() if self.snapshot.get(symbol) != value}
+        self.snapshot.update(prices)
+        if not changed:
+            return
+        self.stats["deltas"] += 1
+        for subscription in list(self._subscribers):
+            selected = subscription.select(changed)
+            if selected:
+                self._offer(subscription, {"type": "delta", "prices": selected})
+
+    async def _poll(self):
+        while self._subscribers:
+            try:
+                self.publish(await self.fetch())
+                self.stats["polls"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failed_polls"] += 1
+                logger.warning(f"Price hub poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._poller = None
+
+    def status(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "polling": self._poller is not None and not self._poller.done(),
+            "symbols": len(self.snapshot),
+            **self.stats,
+        }
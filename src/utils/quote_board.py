@@ -0,0 +1,169 @@
+"""
+Gainers, losers and most-active rankings over the latest quotes we ingest.
+
+Quotes are kept in dicts plus two sorted indexes (by percent change and by volume).
+An update moves one symbol within each index (binary search), and a ranking query reads
+from the ends of an index, so serving the route never sorts the universe.
+"""
+
+import bisect
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Quotes older than this drop out of the rankings (a symbol we stopped tracking)
+QUOTE_MAX_AGE_SECONDS = float(os.getenv("QUOTE_MAX_AGE_SECONDS", str(4 * 24 * 3600)))
+
+
+@dataclass
+class Quote:
+    symbol: str
+    price: float
+    previous_close: float
+    volume: int = 0
+    updated_at: float = 0
+
+    @property
+    def change_amount(self) -> float:
+        return self.price - self.previous_close
+
+    @property
+    def change_percentage(self) -> float:
+        return self.change_amount / self.previous_close * 100 if self.previous_close else 0.0
+
+
+@dataclass
+class Profile:
+    sector: str = None
+    market_cap: float = None
+
+
+class QuoteBoard:
+    def __init__(self, max_age: float = QUOTE_MAX_AGE_SECONDS, clock=time.time):
+        self.max_age = max_age
+        self._clock = clock
+        self._quotes = {}
+        self._profiles = {}
+        # Sorted (key, symbol) pairs
+        self._by_change = []
+        self._by_volume = []
+        self.last_updated = None
+
+    def __len__(self):
+        # Quotes past max_age are kept until updated but no longer count
+        oldest = self._clock() - self.max_age
+        return sum(1 for quote in self._quotes.values() if quote.updated_at >= oldest)
+
+    def __contains__(self, symbol: str):
+        return symbol.upper() in self._quotes
+
+    @staticmethod
+    def _move(index, old_key, new_key):
+        if old_key is not None:
+            del index[bisect.bisect_left(index, old_key)]
+        bisect.insort(index, new_key)
+
+    def update(self, symbol: str, price: float, previous_close: float, volume: int = 0, timestamp: float = None):
+        """
+        Record the latest quote for `symbol`. O(log n) search plus one list shift per index.
+        """
+        if price is None or previous_close is None:
+            return
+        symbol = symbol.upper()
+        timestamp = timestamp or self._clock()
+        old = self._quotes.get(symbol)
+        quote = Quote(symbol, float(price), float(previous_close), int(volume or 0), timestamp)
+        self._move(self._by_change, old and (old.change_percentage, symbol), (quote.change_percentage, symbol))
+        self._move(self._by_volume, old and (old.volume, symbol), (quote.volume, symbol))
+        self._quotes[symbol] = quote
+        self.last_updated = max(self.last_updated or 0, timestamp)
+
+    def set_profile(self, symbol: str, sector: str = None, market_cap=None):
+        """
+        Sector and market cap used by the ranking filters; unknown values are ignored.
+        """
+        try:
+            market_cap = float(market_cap)
+        except (TypeError, ValueError):
+            market_cap = None
+        if sector in (None, "", "N/A", "None"):
+            sector = None
+        self._profiles[symbol.upper()] = Profile(sector, market_cap)
+
+    def _matches(self, symbol: str, sector, min_market_cap, max_market_cap) -> bool:
+        if sector is None and min_market_cap is None and max_market_cap is None:
+            return True
+        profile = self._profiles.get(symbol)
+        if profile is None:
+            return False
+        if sector is not None and (profile.sector or "").lower() != sector.lower():
+            return False
+        if min_market_cap is not None and (profile.market_cap is None or profile.market_cap < min_market_cap):
+            return False
+        if max_market_cap is not None and (profile.market_cap is None or profile.market_cap > max_market_cap):
+            return False
+        return True
+
+    def _select(self, entries, limit: int, keep, filters):
+        """
+        Walk an index from its best end, stopping after `limit` matches.
+        """
+        selected = []
+        oldest = self._clock() - self.max_age
+        for key, symbol in entries:
+            if len(selected) >= limit or not keep(key):
+                break
+            quote = self._quotes[symbol]
+            if quote.updated_at >= oldest and self._matches(symbol, *filters):
+                selected.append(self._row(quote))
+        return selected
+
+    @staticmethod
+    def _row(quote: Quote) -> dict:
+        return {
+            "ticker": quote.symbol,
+            "price": round(quote.price, 4),
+            "change_amount": round(quote.change_amount, 4),
+            "change_percentage": round(quote.change_percentage, 2),
+            "volume": quote.volume,
+        }
+
+    def gainers(self, limit: int, sector: str = None, min_market_cap: float = None, max_market_cap: float = None):
+        filters = (sector, min_market_cap, max_market_cap)
+        return self._select(reversed(self._by_change), limit, lambda change: change > 0, filters)
+
+    def losers(self, limit: int, sector: str = None, min_market_cap: float = None, max_market_cap: float = None):
+        filters = (sector, min_market_cap, max_market_cap)
+        return self._select(iter(self._by_change), limit, lambda change: change < 0, filters)
+
+    def most_active(self, limit: int, sector: str = None, min_market_cap: float = None, max_market_cap: float = None):
+        filters = (sector, min_market_cap, max_market_cap)
+        return self._select(reversed(self._by_volume), limit, lambda volume: volume > 0, filters)
+
+    def rankings(self, limit: int, **filters) -> dict:
+        return {
+            "metadata": f"Ranked locally from the latest quotes of {len(self)} tracked symbols",
+            "last_updated": _format_timestamp(self.last_updated),
+            "gainers": self.gainers(limit, **filters),
+            "losers": self.losers(limit, **filters),
+            "most_actively_traded": self.most_active(limit, **filters),
+        }
+
+    def status(self) -> dict:
+        return {"symbols": len(self._quotes), "profiles": len(self._profiles), "last_updated": _format_timestamp(self.last_updated)}
+
+
+def _format_timestamp(timestamp):
+    if timestamp is None:
+        return "Unknown"
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+# Shared board fed by every quote ingestion path
+quote_board = QuoteBoard()
@@ -0,0 +1,204 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, lower runs first
+PRIORITY_USER = 0
+PRIORITY_BACKGROUND = 1
+
+# Alpha Vantage budgets (free tier by default)
+AV_REQUESTS_PER_MINUTE = float(os.getenv("AV_REQUESTS_PER_MINUTE", "5"))
+AV_REQUESTS_PER_DAY = int(os.getenv("AV_REQUESTS_PER_DAY", "25"))
+
+# Phrases Alpha Vantage uses in "Note"/"Information" bodies when it throttles a 200 response
+THROTTLE_PHRASES = ("call frequency", "rate limit", "requests per minute", "requests per day", "api call volume")
+# The daily quota notice ("...API rate limit is 25 requests per day..."). The per-minute
+# notice also mentions a daily figure ("5 calls per minute and 500 calls per day"), so
+# "per day" alone does not mean the day's budget is gone.
+DAILY_LIMIT_PATTERN = re.compile(r"rate limit is \d+ (?:requests|calls) per day")
+
+
+def _utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+class RequestGovernor:
+    """
+    Token bucket enforcing a per-minute rate and a per-day budget for upstream requests.
+
+    Callers that cannot go immediately are queued by priority class (then arrival order)
+    instead of failing. Only an exhausted daily budget fails fast, with a 429.
+    """
+
+    def __init__(self, per_minute: float, per_day: int, clock=time.monotonic, today=_utc_today):
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self._clock = clock
+        self._today = today
+        self._tokens = float(per_minute)
+        self._last_refill = clock()
+        self._paused_until = 0.0
+        self._day = today()
+        self._used_today = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._timer = None
+        self.stats = {"granted": 0, "queued": 0, "rejected": 0, "soft_throttled": 0}
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.per_minute, self._tokens + (now - self._last_refill) * self.per_minute / 60)
+        self._last_refill = now
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._used_today = 0
+
+    def _daily_exhausted(self) -> bool:
+        return self.per_day > 0 and self._used_today >= self.per_day
+
+    def _can_take(self) -> bool:
+        return self._tokens >= 1 and self._clock() >= self._paused_until
+
+    def _take(self):
+        self._tokens -= 1
+        self._used_today += 1
+        self.stats["granted"] += 1
+
+    def _refund(self):
+        self._tokens = min(self.per_minute, self._tokens + 1)
+        self._used_today = max(0, self._used_today - 1)
+        self.stats["granted"] -= 1
+
+    def _reject(self):
+        self.stats["rejected"] += 1
+        return HTTPException(status_code=429, detail="Daily Alpha Vantage request budget exhausted. Please try again tomorrow.")
+
+    async def acquire(self, priority: int = PRIORITY_USER):
+        """
+        Wait for permission to send one upstream request.
+        """
+        self._refill()
+        if self._daily_exhausted():
+            raise self._reject()
+        if not self._waiters and self._can_take():
+            self._take()
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self.stats["queued"] += 1
+        self._schedule(loop, 0)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled, hand the token back
+                self._refund()
+            self._schedule(loop, 0)
+            raise
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._daily_exhausted():
+                heapq.heappop(self._waiters)
+                future.set_exception(self._reject())
+                continue
+            if not self._can_take():
+                break
+            heapq.heappop(self._waiters)
+            self._take()
+            future.set_result(None)
+
+        if self._waiters:
+            wait_for_token = max(0.0, (1 - self._tokens) * 60 / self.per_minute)
+            wait_for_pause = max(0.0, self._paused_until - self._clock())
+            self._schedule(asyncio.get_running_loop(), max(wait_for_token, wait_for_pause, 0.01))
+
+    def _schedule(self, loop, delay: float):
+        if self._timer is not None:
+            if delay > 0:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_later(delay, self._dispatch)
+
+    def has_headroom(self, requests: int, share: float = 1.0) -> bool:
+        """
+        Whether `requests` optional requests can go without holding anyone up: nothing is
+        queued or paused, and today's usage stays within `share` of the daily budget.
+        """
+        self._refill()
+        if self._waiters or self._clock() < self._paused_until:
+            return False
+        return self.per_day <= 0 or self._used_today + requests <= self.per_day * share
+
+    def penalize(self, seconds: float):
+        """
+        Upstream told us to slow down: stop granting requests for a while.
+        """
+        self.stats["soft_throttled"] += 1
+        self._tokens = 0.0
+        self._last_refill = self._clock()
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    def exhaust_day(self):
+        """
+        Upstream reported the daily quota as used up.
+        """
+        self._used_today = max(self._used_today, self.per_day)
+
+    def status(self) -> dict:
+        self._refill()
+        return {
+            "tokens": round(self._tokens, 2),
+            "used_today": self._used_today,
+            "per_minute": self.per_minute,
+            "per_day": self.per_day,
+            "queued": len(self._waiters),
+            **self.stats,
+        }
+
+
+def throttle_message(data):
+    """
+    Return the throttle message when a 200 payload is really an Alpha Vantage soft throttle.
+    """
+    if not isinstance(data, dict):
+        return None
+    for key in ("Note", "Information"):
+        message = data.get(key)
+        if isinstance(message, str) and any(phrase in message.lower() for phrase in THROTTLE_PHRASES):
+            return message
+    return None
+
+
+def is_daily_limit(message: str) -> bool:
+    """
+    True when a throttle message says the daily quota is spent, not the per-minute one.
+    """
+    message = message.lower()
+    return bool(DAILY_LIMIT_PATTERN.search(message)) and "per minute" not in message
+
+
+# Shared governor for every Alpha Vantage request in the process
+governor = RequestGovernor(AV_REQUESTS_PER_MINUTE, AV_REQUESTS_PER_DAY)
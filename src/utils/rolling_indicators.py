@@ -0,0 +1,303 @@
+"""
+Rolling SMA/EMA state that advances in constant time per bar or tick.
+
+A state holds only what the next update needs (the SMA window, the previous EMA) plus a
+short history of recent outputs for the routes. States are checkpointed to MongoDB and
+rebuilt from the stored price bars when missing or when the stored history changed.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import date
+
+from dotenv import load_dotenv
+
+from src.mongoDB.indicator_state import indicator_state_store
+from src.mongoDB.price_bars import price_bar_store
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Recent outputs kept per state; requests for longer histories use the batch engine
+INDICATOR_STATE_HISTORY = int(os.getenv("INDICATOR_STATE_HISTORY", "100"))
+
+
+def same_period(interval: str, a: str, b: str) -> bool:
+    """
+    Whether two bar dates belong to the same bar (the same week for weekly bars).
+    """
+    if a is None or b is None:
+        return False
+    if interval == "weekly":
+        return date.fromisoformat(a).isocalendar()[:2] == date.fromisoformat(b).isocalendar()[:2]
+    return a == b
+
+
+class RollingIndicator:
+    """
+    Base class. update() appends a bar, or revises the newest bar when `revise` is set
+    (a tick for the period that is still open). Both are O(1).
+    """
+    name = None
+
+    def __init__(self, period: int, history: int = INDICATOR_STATE_HISTORY):
+        self.period = period
+        self.count = 0
+        # The two newest inputs, used to detect when the stored history was rewritten
+        self.last_date = None
+        self.last_value = None
+        self.prev_date = None
+        self.prev_value = None
+        self.outputs = deque(maxlen=history)
+
+    def update(self, day: str, value: float, revise: bool = False):
+        if revise and self.count:
+            result = self._revise(value)
+            if self.outputs and self.outputs[-1][0] == self.last_date:
+                self.outputs.pop()
+        else:
+            result = self._push(value)
+            self.count += 1
+            self.prev_date, self.prev_value = self.last_date, self.last_value
+        self.last_date, self.last_value = day, value
+        if result is not None:
+            self.outputs.append((day, result))
+        return result
+
+    def _push(self, value: float):
+        raise NotImplementedError
+
+    def _revise(self, value: float):
+        raise NotImplementedError
+
+    def to_alpha_vantage(self, limit: int, decimals: int = 4):
+        """
+        The newest `limit` outputs as {date: {name: "value"}}, newest first.
+        """
+        recent = list(self.outputs)[-limit:] if limit > 0 else []
+        return {day: {self.name: f"{result:.{decimals}f}"} for day, result in reversed(recent)}
+
+    def to_state(self) -> dict:
+        return {
+            "name": self.name,
+            "period": self.period,
+            "count": self.count,
+            "last_date": self.last_date,
+            "last_value": self.last_value,
+            "prev_date": self.prev_date,
+            "prev_value": self.prev_value,
+            "outputs": [list(output) for output in self.outputs],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict, history: int = INDICATOR_STATE_HISTORY):
+        indicator = cls(state["period"], history)
+        indicator.count = state["count"]
+        indicator.last_date = state["last_date"]
+        indicator.last_value = state["last_value"]
+        indicator.prev_date = state["prev_date"]
+        indicator.prev_value = state["prev_value"]
+        indicator.outputs.extend(tuple(output) for output in state["outputs"])
+        return indicator
+
+
+class RollingSMA(RollingIndicator):
+    name = "SMA"
+
+    def __init__(self, period: int, history: int = INDICATOR_STATE_HISTORY):
+        super().__init__(period, history)
+        self.window = deque()
+        self.total = 0.0
+
+    def _current(self):
+        return self.total / self.period if len(self.window) == self.period else None
+
+    def _push(self, value: float):
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        # Re-sum once per window so floating point drift cannot build up (amortized O(1))
+        if self.count % self.period == 0:
+            self.total = sum(self.window)
+        return self._current()
+
+    def _revise(self, value: float):
+        self.total += value - self.window[-1]
+        self.window[-1] = value
+        return self._current()
+
+    def to_state(self) -> dict:
+        return {**super().to_state(), "window": list(self.window), "total": self.total}
+
+    @classmethod
+    def from_state(cls, state: dict, history: int = INDICATOR_STATE_HISTORY):
+        indicator = super().from_state(state, history)
+        indicator.window.extend(state["window"])
+        indicator.total = state["total"]
+        return indicator
+
+
+class RollingEMA(RollingIndicator):
+    """
+    Seeded with the SMA of the first `period` values, like src/utils/indicators.ema.
+    """
+    name = "EMA"
+
+    def __init__(self, period: int, history: int = INDICATOR_STATE_HISTORY):
+        super().__init__(period, history)
+        self.alpha = 2.0 / (period + 1)
+        self.seed_total = 0.0
+        # EMA before and after the newest bar; revising the newest bar restarts from `previous`
+        self.previous = None
+        self.current = None
+
+    def _push(self, value: float):
+        if self.count < self.period:
+            self.seed_total += value
+            if self.count + 1 == self.period:
+                self.current = self.seed_total / self.period
+            return self.current
+        self.previous = self.current
+        self.current = self.previous + self.alpha * (value - self.previous)
+        return self.current
+
+    def _revise(self, value: float):
+        if self.count <= self.period:
+            # The newest bar is still part of the seed window
+            self.seed_total += value - self.last_value
+            if self.count == self.period:
+                self.current = self.seed_total / self.period
+            return self.current
+        self.current = self.previous + self.alpha * (value - self.previous)
+        return self.current
+
+    def to_state(self) -> dict:
+        return {**super().to_state(), "seed_total": self.seed_total, "previous": self.previous, "current": self.current}
+
+    @classmethod
+    def from_state(cls, state: dict, history: int = INDICATOR_STATE_HISTORY):
+        indicator = super().from_state(state, history)
+        indicator.seed_total = state["seed_total"]
+        indicator.previous = state["previous"]
+        indicator.current = state["current"]
+        return indicator
+
+
+ROLLING_INDICATORS = {"SMA": RollingSMA, "EMA": RollingEMA}
+
+
+class IndicatorStates:
+    """
+    Rolling states per (ticker, indicator, interval, period, series type), kept in memory,
+    checkpointed to `checkpoints` and caught up from `bars` on access.
+    """
+
+    def __init__(self, bars, checkpoints, history: int = INDICATOR_STATE_HISTORY):
+        self.bars = bars
+        self.checkpoints = checkpoints
+        self.history = history
+        self._states = {}
+        self._locks = {}
+        self.stats = {"rebuilds": 0, "catch_ups": 0, "ticks": 0}
+
+    @staticmethod
+    def key(ticker: str, indicator: str, interval: str, period: int, series_type: str) -> str:
+        return f"{ticker}:{indicator}:{interval}:{period}:{series_type}"
+
+    async def get(self, ticker: str, indicator: str, interval: str, period: int, series_type: str = "close"):
+        """
+        The up-to-date state. Only bars newer than the state's last update are read.
+        """
+        key = self.key(ticker, indicator, interval, period, series_type)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            state = self._states.get(key)
+            if state is None:
+                saved = await self._load(key)
+                if saved is not None:
+                    state = ROLLING_INDICATORS[indicator].from_state(saved, self.history)
+
+            changed = False
+            if state is not None:
+                caught_up = await self._catch_up(state, ticker, interval, series_type)
+                if caught_up is None:
+                    state = None
+                else:
+                    changed = caught_up
+            if state is None:
+                state = await self._rebuild(ticker, indicator, interval, period, series_type)
+                changed = True
+
+            self._states[key] = state
+            if changed:
+                await self._save(key, state)
+            return state
+
+    async def _catch_up(self, state: RollingIndicator, ticker: str, interval: str, series_type: str):
+        """
+        Apply stored bars newer than the state. Returns whether anything changed, or None
+        when the stored history no longer matches the state and it must be rebuilt.
+        """
+        anchor_date = state.prev_date or state.last_date
+        anchor_value = state.prev_value if state.prev_date else state.last_value
+        bars = list(reversed(await self.bars.bars_in_range(ticker, interval, start=anchor_date)))
+        if not bars or bars[0]["date"] != anchor_date or bars[0].get(series_type) != anchor_value:
+            return None
+
+        changed = False
+        # The anchor is the bar before the newest one, so the newest (possibly provisional)
+        # bar comes back as a revision of the same period
+        for bar in bars[1:]:
+            value = bar.get(series_type)
+            if value is None or (bar["date"] == state.last_date and value == state.last_value):
+                continue
+            state.update(bar["date"], value, revise=same_period(interval, state.last_date, bar["date"]))
+            changed = True
+        if changed:
+            self.stats["catch_ups"] += 1
+        return changed
+
+    async def _rebuild(self, ticker: str, indicator: str, interval: str, period: int, series_type: str):
+        self.stats["rebuilds"] += 1
+        state = ROLLING_INDICATORS[indicator](period, self.history)
+        for bar in reversed(await self.bars.bars_in_range(ticker, interval)):
+            if bar.get(series_type) is not None:
+                state.update(bar["date"], bar[series_type])
+        logger.info(f"Rebuilt {indicator}({period}) {interval} state for {ticker} from {state.count} bars")
+        return state
+
+    def apply_tick(self, ticker: str, day: str, price: float):
+        """
+        Feed a live closing price into every in-memory close-based state for `ticker`.
+        The tick revises the open bar, or starts a new one for a new period.
+        """
+        for key, state in self._states.items():
+            state_ticker, _, interval, _, series_type = key.split(":")
+            if state_ticker != ticker or series_type != "close" or state.last_date is None or day < state.last_date:
+                continue
+            state.update(day, price, revise=same_period(interval, state.last_date, day))
+            self.stats["ticks"] += 1
+
+    async def _load(self, key: str):
+        try:
+            return await self.checkpoints.load(key)
+        except Exception as e:
+            logger.warning(f"Failed to load indicator state {key}: {e}")
+            return None
+
+    async def _save(self, key: str, state: RollingIndicator):
+        try:
+            await self.checkpoints.save(key, state.to_state())
+        except Exception as e:
+            logger.warning(f"Failed to checkpoint indicator state {key}: {e}")
+
+    def status(self) -> dict:
+        return {"states": len(self._states), **self.stats}
+
+
+# Shared rolling indicator states
+indicator_states = IndicatorStates(price_bar_store, indicator_state_store)
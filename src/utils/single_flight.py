@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that do not change what the upstream returns
+IGNORED_QUERY_PARAMS = {"apikey"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Build a coalescing key for an upstream URL: parameter order, parameter-name case
+    and the API key do not matter, so "symbol=aapl&function=OVERVIEW" matches
+    "function=OVERVIEW&symbol=AAPL".
+    """
+    parts = urlsplit(url)
+    params = sorted(
+        (key.lower(), value.upper() if key.lower() in ("symbol", "tickers") else value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in IGNORED_QUERY_PARAMS
+    )
+    return f"{parts.netloc}{parts.path}?{urlencode(params)}"
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one shared in-flight task.
+
+    The first caller (the leader) starts the work; later callers await the same task.
+    Results and exceptions are delivered to every caller. A caller being cancelled only
+    detaches that caller; the shared task is cancelled once nobody is waiting on it.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key, fn):
+        call = self._calls.get(key)
+        if call is None:
+            call = {"task": asyncio.ensure_future(fn()), "waiters": 0}
+            self._calls[key] = call
+            call["task"].add_done_callback(lambda _: self._forget(key, call))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["coalesced"] += 1
+            logger.debug(f"Coalesced request for {key}")
+
+        call["waiters"] += 1
+        try:
+            return await asyncio.shield(call["task"])
+        finally:
+            call["waiters"] -= 1
+            if call["waiters"] == 0 and not call["task"].done():
+                # Every caller gave up, so nobody needs the result any more
+                call["task"].cancel()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def status(self) -> dict:
+        return {"in_flight": self.in_flight(), **self.stats}
+
+
+# Shared coalescing layer for upstream Alpha Vantage requests
+upstream_flight = SingleFlight()
@@ -1,67 +1,135 @@
 import json
+import logging
 
-async def process_streaming_response(response):
+logger = logging.getLogger(__name__)
+
+# Fields of Ollama's final chunk ("done": true) worth keeping: timings are in nanoseconds
+DONE_FIELDS = (
+    "done_reason", "total_duration", "load_duration",
+    "prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+)
+
+
+class NDJSONDecoder:
     """
-    Process a streaming HTTP response asynchronously and yield parsed JSON content.
+    Incremental newline-delimited JSON decoder.
+
+    Text arrives in arbitrary chunks; each complete line is parsed exactly once, and a line
+    split across chunks is kept as a list of pieces that is joined once when it completes,
+    so the work is linear in the stream length.
     """
-    buffer = ""
-    async for line in response.aiter_lines():
+
+    def __init__(self):
+        self._partial = []
+        self.errors = 0
+
+    def _parse(self, line: str):
         if not line.strip():
-            continue  # Skip empty lines
-        
-        # Add line to buffer
-        buffer += line + "\n"
-        
-        # Try to parse complete JSON objects from buffer
-        while buffer:
-            try:
-                # Find the end of a complete JSON object
-                json_data = json.loads(buffer.strip())
-                buffer = ""  # Reset buffer on successful parse
-                
-                # Extract content from the response
-                if "message" in json_data and "content" in json_data["message"]:
-                    content = json_data["message"]["content"]
-                    if content:  # Only yield non-empty content
-                        yield content
-                elif "response" in json_data:  # Alternative response format
-                    content = json_data["response"]
-                    if content:
-                        yield content
-                break
-                
-            except json.JSONDecodeError as e:
-                # If JSON is incomplete, try to find a complete object
-                lines = buffer.strip().split('\n')
-                parsed_any = False
-                
-                for i, line in enumerate(lines):
-                    if line.strip():
-                        try:
-                            json_data = json.loads(line.strip())
-                            # Extract content
-                            if "message" in json_data and "content" in json_data["message"]:
-                                content = json_data["message"]["content"]
-                                if content:
-                                    yield content
-                            elif "response" in json_data:
-                                content = json_data["response"]
-                                if content:
-                                    yield content
-                            parsed_any = True
-                        except json.JSONDecodeError:
-                            continue
-                
-                # Keep remaining unparsed lines in buffer
-                if parsed_any:
-                    # Remove parsed lines, keep the rest
-                    remaining_lines = []
-                    for line in lines:
-                        try:
-                            json.loads(line.strip())
-                        except:
-                            remaining_lines.append(line)
-                    buffer = '\n'.join(remaining_lines)
-                else:
-                    # Wait for more data
-                    break
\ No newline at end of file
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            logger.warning(f"Skipping malformed stream line: {e}")
+            return None
+
+    def feed(self, text: str):
+        """
+        Parsed objects for every line completed by `text`.
+        """
+        lines = text.split("\n")
+        if len(lines) == 1:
+            # No line completed yet: keep the piece without joining
+            if text:
+                self._partial.append(text)
+            return []
+        if self._partial:
+            self._partial.append(lines[0])
+            lines[0] = "".join(self._partial)
+            self._partial = []
+        # The last piece is an unfinished line (empty when `text` ends with a newline)
+        tail = lines.pop()
+        if tail:
+            self._partial.append(tail)
+        objects = []
+        for line in lines:
+            parsed = self._parse(line)
+            if parsed is not None:
+                objects.append(parsed)
+        return objects
+
+    def close(self):
+        """
+        Parse whatever is left once the stream ends without a trailing newline.
+        """
+        if not self._partial:
+            return []
+        line = "".join(self._partial)
+        self._partial = []
+        parsed = self._parse(line)
+        return [parsed] if parsed is not None else []
+
+
+def chunk_content(chunk: dict) -> str:
+    """
+    The generated text in one chat ("message") or generate ("response") chunk.
+    """
+    message = chunk.get("message")
+    if isinstance(message, dict):
+        return message.get("content") or ""
+    return chunk.get("response") or ""
+
+
+def done_stats(chunk: dict) -> dict:
+    """
+    Timing and token counts from the final chunk, plus tokens per second.
+    """
+    stats = {field: chunk[field] for field in DONE_FIELDS if field in chunk}
+    if stats.get("eval_count") and stats.get("eval_duration"):
+        stats["tokens_per_second"] = round(stats["eval_count"] / (stats["eval_duration"] / 1e9), 2)
+    return stats
+
+
+async def iter_stream_chunks(response):
+    """
+    Every parsed chunk of a streaming HTTP response.
+    """
+    decoder = NDJSONDecoder()
+    async for text in response.aiter_text():
+        for chunk in decoder.feed(text):
+            yield chunk
+    for chunk in decoder.close():
+        yield chunk
+
+
+async def process_streaming_response(response, stats: dict = None):
+    """
+    Process a streaming HTTP response asynchronously and yield the generated content.
+    When `stats` is given it is filled from the final "done" chunk (see done_stats).
+    """
+    async for chunk in iter_stream_chunks(response):
+        content = chunk_content(chunk)
+        if content:  # Only yield non-empty content
+            yield content
+        if chunk.get("done") and stats is not None:
+            stats.update(done_stats(chunk))
+
+
+# Response formats for streamed event dicts (see src/LLM/LLM_service.py)
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+async def to_ndjson(events):
+    """
+    One JSON object per line.
+    """
+    async for event in events:
+        yield json.dumps(event, default=str) + "\n"
+
+
+async def to_sse(events):
+    """
+    Server-Sent Events, named after each event's "event" field.
+    """
+    async for event in events:
+        yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
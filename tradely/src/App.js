@@ -7,7 +7,7 @@ import News from './Components/News';
 import LiveMarketData from './Components/LiveMarketPrices';
 import Footer from './Components/footer';
 import TopGainersLosers from './Components/TopGainersLosers';
-import { fetchLiveMarketPrices, fetchLiveNewsHeadlines, fetchTopGainersLosers, analyzeStock, askQuestion } from './Services/api';
+import { fetchLiveMarketPrices, subscribeLiveMarketPrices, fetchLiveNewsHeadlines, fetchTopGainersLosers, analyzeStock, streamAskQuestion } from './Services/api';
 import AnalysisSection from './Components/AnalysisSection';
 import ChartSection from './Components/ChartSection';
 import QuestionSection from './Components/QuestionSection';
@@ -51,6 +51,13 @@ function App() {
     };
 
     fetchLiveData();
+
+    // Live prices are pushed by the server after the first load
+    const unsubscribe = subscribeLiveMarketPrices(
+      (prices) => setLiveMarketPrices(prices),
+      (error) => console.warn('Live market price stream interrupted:', error)
+    );
+    return unsubscribe;
   }, []);
 
   const handleInputChange = (event) => {
@@ -92,11 +99,16 @@ function App() {
       // Use a simple string as the context
       const context = 'stock analysis';
   
-      const response = await askQuestion(question, context);
-  
-      if (response && response.answer) {
-        setAnswer(response.answer);
-      } else {
+      // Show the answer as it is generated
+      let streamed = '';
+      const result = await streamAskQuestion(question, context, (event) => {
+        if (event.event === 'token') {
+          streamed += event.content;
+          setAnswer(streamed);
+        }
+      });
+
+      if (!result || !result.answer) {
         setAnswer('No answer received from the backend.');
       }
     } catch (err) {
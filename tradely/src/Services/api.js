@@ -45,6 +45,31 @@ export const fetchLiveMarketPrices = async () => {
   }
 };
 
+// Subscribe to pushed live market prices (Server-Sent Events)
+// The server sends a snapshot first and then only the symbols whose prices changed,
+// so updates are merged into the last known prices. Returns an unsubscribe function.
+export const subscribeLiveMarketPrices = (onUpdate, onError, symbols = null) => {
+  const baseURL = api.defaults.baseURL;
+  const query = symbols ? `?symbols=${encodeURIComponent(symbols.join(','))}` : '';
+  const source = new EventSource(`${baseURL}/stream/live-market-prices${query}`);
+  let prices = {};
+
+  source.addEventListener('snapshot', (event) => {
+    prices = JSON.parse(event.data);
+    onUpdate(prices);
+  });
+  source.addEventListener('delta', (event) => {
+    prices = { ...prices, ...JSON.parse(event.data) };
+    onUpdate(prices);
+  });
+  source.onerror = (error) => {
+    // EventSource reconnects by itself; the server resends a snapshot on reconnect
+    if (onError) onError(error);
+  };
+
+  return () => source.close();
+};
+
 // Fetch Live News Headlines
 export const fetchLiveNewsHeadlines = async (limit = 3) => {
   try {
@@ -91,4 +116,44 @@ export const askQuestion = async (question, context) => {
     console.error('Debug: Error in askQuestion API:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+
+// Read an NDJSON event stream (?stream=ndjson) and hand each event to onEvent as it arrives
+const streamEvents = async (path, options, onEvent) => {
+  const response = await fetch(`${api.defaults.baseURL}${path}`, options);
+  if (!response.ok || !response.body) {
+    throw new Error(`Streaming request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let pending = '';
+  let last = null;
+
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    pending += decoder.decode(value, { stream: true });
+    const lines = pending.split('\n');
+    pending = lines.pop(); // keep a partial line for the next read
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      last = JSON.parse(line);
+      if (last.event === 'error') throw new Error(last.detail);
+      onEvent(last);
+    }
+  }
+  return last;
+};
+
+// Stream the analysis: stage markers for each model, then tokens, then the full result
+export const streamAnalyzeStock = (ticker, onEvent) =>
+  streamEvents(`/analyze_all/${encodeURIComponent(ticker)}?stream=ndjson`, { method: 'GET' }, onEvent);
+
+// Stream the answer to a question token by token
+export const streamAskQuestion = (question, context, onEvent) =>
+  streamEvents('/ask-question?stream=ndjson', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ question, context }),
+  }, onEvent);